@@ -6,12 +6,12 @@ Machine learning-powered product recommendations and personalization
 import asyncio
 import json
 import logging
-import numpy as np
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Any, Tuple
 from collections import defaultdict, Counter
 import uuid
 import math
+import statistics
 
 logger = logging.getLogger(__name__)
 
@@ -449,8 +449,8 @@ class AIRecommendationService:
             
             # Calculate preferred price range
             if price_ranges:
-                avg_price = np.mean(price_ranges)
-                std_price = np.std(price_ranges)
+                avg_price = statistics.fmean(price_ranges)
+                std_price = statistics.pstdev(price_ranges)
                 preferred_price_range = {
                     "min": max(0, avg_price - std_price),
                     "max": avg_price + std_price,
@@ -568,7 +568,7 @@ class AIRecommendationService:
                 return 0.0
             
             # Return average similarity
-            return np.mean(similarity_scores)
+            return statistics.fmean(similarity_scores)
             
         except Exception as e:
             logger.error(f"Failed to calculate collaborative score: {e}")
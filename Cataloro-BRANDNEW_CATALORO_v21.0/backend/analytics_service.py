@@ -6,7 +6,6 @@ Implements comprehensive business intelligence, analytics, and reporting feature
 import asyncio
 import json
 import logging
-import numpy as np
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Any, Tuple
 from collections import defaultdict, Counter
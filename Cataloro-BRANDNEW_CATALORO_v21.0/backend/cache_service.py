@@ -101,6 +101,22 @@ class CacheService:
             logger.error(f"Cache delete error for key {key}: {e}")
             return False
     
+    async def delete_many(self, keys: List[str]) -> bool:
+        """Delete several keys in one round trip"""
+        if not self.redis_client or not keys:
+            return False
+            
+        try:
+            await self.redis_client.delete(*keys)
+            return True
+        except Exception as e:
+            logger.error(f"Cache delete error for {len(keys)} keys: {e}")
+            return False
+    
+    async def invalidate_users(self, user_ids: List[str], *prefixes: str) -> bool:
+        """Invalidate per-user entries (e.g. "seller_dashboard", "favorites") for many users at once"""
+        return await self.delete_many([self._get_key(prefix, user_id) for prefix in prefixes for user_id in user_ids])
+    
     async def delete_pattern(self, pattern: str) -> int:
         """Delete all keys matching pattern"""
         if not self.redis_client:
@@ -179,6 +195,22 @@ class CacheService:
         key = self._get_key("dashboard", "admin")
         return await self.delete(key)
     
+    # Seller Dashboard Caching
+    async def cache_seller_dashboard(self, seller_id: str, summary: Dict) -> bool:
+        """Cache a seller's listing counts and recent tenders"""
+        key = self._get_key("seller_dashboard", seller_id)
+        return await self.set(key, summary, self.TTL_SHORT)
+    
+    async def get_cached_seller_dashboard(self, seller_id: str) -> Optional[Dict]:
+        """Get cached seller dashboard summary"""
+        key = self._get_key("seller_dashboard", seller_id)
+        return await self.get(key)
+    
+    async def invalidate_seller_dashboard(self, seller_id: str) -> bool:
+        """Invalidate a seller's dashboard summary"""
+        key = self._get_key("seller_dashboard", seller_id)
+        return await self.delete(key)
+    
     # Search Results Caching
     async def cache_search_results(self, search_params: str, results: List[Dict]) -> bool:
         """Cache search results"""
@@ -206,6 +238,22 @@ class CacheService:
         key = self._get_key("baskets", user_id)
         return await self.delete(key)
     
+    # Favorites Caching
+    async def cache_user_favorites(self, user_id: str, item_ids: List[str]) -> bool:
+        """Cache the ids of a user's favorited listings"""
+        key = self._get_key("favorites", user_id)
+        return await self.set(key, item_ids, self.TTL_MEDIUM)
+    
+    async def get_cached_user_favorites(self, user_id: str) -> Optional[List[str]]:
+        """Get cached favorite listing ids"""
+        key = self._get_key("favorites", user_id)
+        return await self.get(key)
+    
+    async def invalidate_user_favorites(self, user_id: str) -> bool:
+        """Invalidate user favorites cache"""
+        key = self._get_key("favorites", user_id)
+        return await self.delete(key)
+    
     # Notification Caching
     async def cache_user_notifications(self, user_id: str, notifications: List[Dict]) -> bool:
         """Cache user notifications"""
@@ -251,7 +299,7 @@ cache_service = CacheService()
 
 async def init_cache():
     """Initialize cache service"""
-    await cache_service.connect()
+    return await cache_service.connect()
 
 async def cleanup_cache():
     """Cleanup cache service"""
@@ -0,0 +1,89 @@
+"""
+Catalyst Excel Import for Cataloro Marketplace
+Workbook parsing for the Cat Database upload, run in the executor process pool
+"""
+
+import io
+import uuid
+from datetime import datetime
+from typing import Any, Dict
+
+import pytz
+
+REQUIRED_COLUMNS = ['cat_id', 'name', 'ceramic_weight', 'pt_ppm', 'pd_ppm', 'rh_ppm']
+OPTIONAL_COLUMNS = ['add_info']
+NUMERIC_COLUMNS = ['ceramic_weight', 'pt_ppm', 'pd_ppm', 'rh_ppm']
+
+
+def parse_catalyst_workbook(contents: bytes) -> Dict[str, Any]:
+    """
+    Parse an uploaded workbook into catalyst documents.
+    Only plain data crosses the process boundary: the caller gets the valid rows,
+    per-row errors, the column list and any missing required columns.
+    """
+    # pandas is only needed by the worker process that runs the import
+    import pandas as pd
+    
+    df = pd.read_excel(io.BytesIO(contents))
+
+    missing_columns = [col for col in REQUIRED_COLUMNS if col not in df.columns]
+    if missing_columns:
+        return {"missing_columns": missing_columns, "columns": [str(col) for col in df.columns]}
+
+    catalysts = []
+    errors = []
+
+    def safe_float(value, field_name, row_num):
+        if pd.isna(value) or value == '' or value is None:
+            return 0.0
+        try:
+            result = float(value)
+            # Check for valid range (avoid infinity and very large numbers)
+            if not (-1e10 <= result <= 1e10):
+                errors.append(f"Row {row_num}: {field_name} value {result} is out of valid range")
+                return 0.0
+            return result
+        except (ValueError, TypeError):
+            errors.append(f"Row {row_num}: Invalid {field_name} value '{value}'")
+            return 0.0
+
+    columns = REQUIRED_COLUMNS + [col for col in OPTIONAL_COLUMNS if col in df.columns]
+    timestamp = datetime.now(pytz.timezone('Europe/Berlin')).isoformat()
+
+    # itertuples avoids building a Series per row
+    for position, row in enumerate(df[columns].itertuples(index=False)):
+        row_num = position + 2  # +2 because Excel rows start at 1 and we have header
+        try:
+            values = row._asdict()
+            catalyst_data = {
+                "cat_id": str(values.get('cat_id', '')).strip(),
+                "name": str(values.get('name', '')).strip(),
+                **{field: safe_float(values.get(field), field, row_num) for field in NUMERIC_COLUMNS},
+                "add_info": str(values.get('add_info', '')).strip(),
+                "created_at": timestamp,
+                "updated_at": timestamp,
+                "id": str(uuid.uuid4())
+            }
+
+            # Validate required fields
+            if not catalyst_data["cat_id"]:
+                errors.append(f"Row {row_num}: cat_id is required")
+                continue
+
+            if not catalyst_data["name"]:
+                errors.append(f"Row {row_num}: name is required")
+                continue
+
+            catalysts.append(catalyst_data)
+
+        except Exception as row_error:
+            errors.append(f"Row {row_num}: {str(row_error)}")
+            continue
+
+    return {
+        "catalysts": catalysts,
+        "errors": errors,
+        "columns": [str(col) for col in df.columns],
+        "total_rows": len(df),
+        "missing_columns": []
+    }
@@ -0,0 +1,184 @@
+"""
+Cluster Bus Service for Cataloro Marketplace
+Cross-worker pub/sub used to fan out WebSocket emits, presence and stats
+"""
+
+import asyncio
+import json
+import logging
+import os
+import uuid
+from collections import defaultdict
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+BusHandler = Callable[[Dict[str, Any]], Awaitable[None]]
+
+DEFAULT_CHANNEL = "cataloro:ws:cluster"
+
+
+class InProcessBus:
+    """
+    In-process stand-in for the Redis bus. Every bus created on the same
+    channel behaves like a separate worker, so multi-worker fan-out can be
+    exercised in tests without a broker.
+    """
+
+    backend = "memory"
+    _channels: Dict[str, Set["InProcessBus"]] = defaultdict(set)
+
+    def __init__(self, channel: str = DEFAULT_CHANNEL, worker_id: str = None):
+        self.channel = channel
+        self.worker_id = worker_id or uuid.uuid4().hex[:12]
+        self.connected = False
+        self.stats = {"disconnects": 0, "reconnects": 0}
+        self._handler: Optional[BusHandler] = None
+
+    async def start(self, handler: BusHandler) -> bool:
+        self._handler = handler
+        self._channels[self.channel].add(self)
+        self.connected = True
+        return True
+
+    async def publish(self, message: Dict[str, Any]):
+        message = {**message, "worker": self.worker_id}
+        # Round-trip through JSON so payloads match what Redis would deliver
+        encoded = json.dumps(message, default=str)
+        for bus in list(self._channels[self.channel]):
+            if bus is not self and bus._handler:
+                try:
+                    await bus._handler(json.loads(encoded))
+                except Exception as e:
+                    logger.error(f"In-process bus handler error: {e}")
+
+    async def stop(self):
+        self._channels[self.channel].discard(self)
+        self.connected = False
+
+
+class RedisBus:
+    """Redis pub/sub bus shared by all API workers"""
+
+    backend = "redis"
+    # Backoff (seconds) between resubscribe attempts after the subscription drops
+    RECONNECT_MIN_DELAY = 0.5
+    RECONNECT_MAX_DELAY = 30
+
+    def __init__(self, url: str = None, channel: str = DEFAULT_CHANNEL, worker_id: str = None):
+        self.url = url or os.environ.get('WEBSOCKET_BUS_URL') or "redis://{host}:{port}/{db}".format(
+            host=os.environ.get('REDIS_HOST', 'localhost'),
+            port=os.environ.get('REDIS_PORT', 6379),
+            db=os.environ.get('REDIS_DB', 0)
+        )
+        self.channel = channel
+        self.worker_id = worker_id or uuid.uuid4().hex[:12]
+        self.connected = False
+        self.stats = {"disconnects": 0, "reconnects": 0}
+        self._redis = None
+        self._pubsub = None
+        self._listener: Optional[asyncio.Task] = None
+        self._handler: Optional[BusHandler] = None
+
+    async def start(self, handler: BusHandler) -> bool:
+        import redis.asyncio as redis
+
+        try:
+            self._redis = redis.from_url(
+                self.url,
+                password=os.environ.get('REDIS_PASSWORD', None),
+                decode_responses=True
+            )
+            await self._redis.ping()
+            self._pubsub = self._redis.pubsub()
+            await self._pubsub.subscribe(self.channel)
+        except Exception as e:
+            logger.warning(f"⚠️ WebSocket bus (Redis) unavailable: {e}")
+            self._redis = None
+            return False
+
+        self._handler = handler
+        self._listener = asyncio.create_task(self._listen())
+        self.connected = True
+        logger.info(f"✅ WebSocket bus connected (worker {self.worker_id})")
+        return True
+
+    async def _listen(self):
+        """Consume the channel, resubscribing with backoff whenever the subscription drops"""
+        while True:
+            try:
+                async for message in self._pubsub.listen():
+                    if message.get("type") != "message":
+                        continue
+                    try:
+                        payload = json.loads(message["data"])
+                        if payload.get("worker") != self.worker_id:
+                            await self._handler(payload)
+                    except Exception as e:
+                        logger.error(f"WebSocket bus handler error: {e}")
+                error = "subscription closed"
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                error = str(e)
+
+            # Publishing is paused while this worker cannot hear the other workers
+            self.connected = False
+            self.stats["disconnects"] += 1
+            logger.warning(f"⚠️ WebSocket bus subscription lost: {error}")
+            await self._resubscribe()
+            self.connected = True
+            self.stats["reconnects"] += 1
+            logger.info(f"✅ WebSocket bus resubscribed (worker {self.worker_id})")
+
+    async def _resubscribe(self):
+        delay = self.RECONNECT_MIN_DELAY
+        while True:
+            await asyncio.sleep(delay)
+            try:
+                try:
+                    await self._pubsub.close()
+                except Exception:
+                    pass
+                await self._redis.ping()
+                self._pubsub = self._redis.pubsub()
+                await self._pubsub.subscribe(self.channel)
+                return
+            except Exception as e:
+                delay = min(delay * 2, self.RECONNECT_MAX_DELAY)
+                logger.warning(f"⚠️ WebSocket bus resubscribe failed: {e}; retrying in {delay}s")
+
+    async def publish(self, message: Dict[str, Any]):
+        if not self.connected:
+            return
+        try:
+            await self._redis.publish(
+                self.channel,
+                json.dumps({**message, "worker": self.worker_id}, default=str)
+            )
+        except Exception as e:
+            logger.error(f"WebSocket bus publish error: {e}")
+
+    async def stop(self):
+        if self._listener:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except (asyncio.CancelledError, Exception):
+                pass
+        if self._pubsub:
+            try:
+                await self._pubsub.unsubscribe(self.channel)
+                await self._pubsub.close()
+            except Exception as e:
+                logger.warning(f"WebSocket bus unsubscribe failed: {e}")
+        if self._redis:
+            await self._redis.close()
+        self.connected = False
+
+
+def create_cluster_bus():
+    """Build the bus selected by WEBSOCKET_BUS (redis or memory)"""
+    if os.environ.get('WEBSOCKET_BUS', 'redis').lower() == 'memory':
+        return InProcessBus()
+    return RedisBus()
@@ -0,0 +1,263 @@
+"""
+Conversation Service for Cataloro Marketplace
+Conversation-threaded message store: per-pair conversation documents and keyset-paginated reads
+"""
+
+import logging
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from pymongo import UpdateOne
+
+from index_registry import ensure_collection_indexes
+
+logger = logging.getLogger(__name__)
+
+PREVIEW_LENGTH = 120
+MIGRATION_NAME = "conversations_v1"
+
+
+def conversation_id_for(user_a: str, user_b: str) -> str:
+    """Deterministic conversation id for a pair of users"""
+    return ":".join(sorted((user_a, user_b)))
+
+
+def _message_preview(message: Dict[str, Any]) -> Dict[str, Any]:
+    text = message.get("content") or message.get("message") or ""
+    return {
+        "id": message.get("id"),
+        "sender_id": message.get("sender_id"),
+        "subject": message.get("subject", ""),
+        "preview": text[:PREVIEW_LENGTH],
+        "created_at": message.get("created_at")
+    }
+
+
+class ConversationService:
+    """
+    Each conversation document holds both participants, the last message and an
+    `unread` map of participant -> unread count, so the inbox is one indexed read
+    over conversations instead of a scan over every message the user ever sent.
+    """
+
+    def __init__(self, db):
+        self.db = db
+
+    async def ensure_indexes(self):
+        await ensure_collection_indexes(self.db, "user_messages", "conversations")
+
+    async def record_message(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        """Insert a message and atomically update its conversation"""
+        sender_id = message["sender_id"]
+        recipient_id = message["recipient_id"]
+        conversation_id = conversation_id_for(sender_id, recipient_id)
+        message["conversation_id"] = conversation_id
+
+        await self.db.user_messages.insert_one(message)
+
+        update = {
+            "$set": {
+                "last_message": _message_preview(message),
+                "updated_at": message.get("created_at")
+            },
+            "$setOnInsert": {
+                "id": conversation_id,
+                "participants": sorted((sender_id, recipient_id)),
+                "created_at": message.get("created_at")
+            }
+        }
+        if recipient_id != sender_id:
+            update["$inc"] = {f"unread.{recipient_id}": 1}
+
+        await self.db.conversations.update_one({"id": conversation_id}, update, upsert=True)
+        return message
+
+    async def list_conversations(self, user_id: str, limit: int = 20, before: str = None) -> Dict[str, Any]:
+        """Inbox page for a user, most recently active first (keyset on updated_at)"""
+        query = {"participants": user_id}
+        if before:
+            query["updated_at"] = {"$lt": before}
+
+        conversations = await self.db.conversations.find(query, {"_id": 0}).sort(
+            "updated_at", -1
+        ).limit(limit + 1).to_list(length=limit + 1)
+        has_more = len(conversations) > limit
+        conversations = conversations[:limit]
+
+        # One query for every counterpart on the page
+        partner_ids = {
+            participant
+            for conversation in conversations
+            for participant in conversation["participants"]
+            if participant != user_id
+        }
+        users = await self.db.users.find(
+            {"id": {"$in": list(partner_ids)}},
+            {"_id": 0, "id": 1, "username": 1, "full_name": 1}
+        ).to_list(length=None)
+        names = {user["id"]: user.get("full_name") or user.get("username", "Unknown") for user in users}
+
+        items = []
+        for conversation in conversations:
+            partner_id = next((p for p in conversation["participants"] if p != user_id), user_id)
+            items.append({
+                "conversation_id": conversation["id"],
+                "partner_id": partner_id,
+                "partner_name": names.get(partner_id, "Unknown"),
+                "last_message": conversation.get("last_message"),
+                "unread_count": conversation.get("unread", {}).get(user_id, 0),
+                "updated_at": conversation.get("updated_at")
+            })
+
+        return {
+            "conversations": items,
+            "next_cursor": items[-1]["updated_at"] if has_more and items else None
+        }
+
+    async def get_conversation(self, conversation_id: str, user_id: str) -> Optional[Dict[str, Any]]:
+        """Conversation document if the user participates in it"""
+        return await self.db.conversations.find_one(
+            {"id": conversation_id, "participants": user_id}, {"_id": 0}
+        )
+
+    async def get_messages(
+        self, conversation_id: str, limit: int = 50, before: str = None, before_id: str = None
+    ) -> Dict[str, Any]:
+        """
+        One page of a conversation, returned oldest first. Paginates backwards with a
+        (created_at, id) keyset cursor on the (conversation_id, created_at) index.
+        """
+        query: Dict[str, Any] = {"conversation_id": conversation_id}
+        if before:
+            if before_id:
+                query["$or"] = [
+                    {"created_at": {"$lt": before}},
+                    {"created_at": before, "id": {"$lt": before_id}}
+                ]
+            else:
+                query["created_at"] = {"$lt": before}
+
+        messages = await self.db.user_messages.find(query, {"_id": 0}).sort(
+            [("created_at", -1), ("id", -1)]
+        ).limit(limit + 1).to_list(length=limit + 1)
+        has_more = len(messages) > limit
+        messages = messages[:limit]
+
+        oldest = messages[-1] if messages else None
+        messages.reverse()
+        return {
+            "messages": messages,
+            "next_cursor": {"before": oldest["created_at"], "before_id": oldest["id"]} if has_more else None
+        }
+
+    async def mark_read(self, conversation_id: str, user_id: str) -> int:
+        """Mark every message addressed to the user in a conversation as read"""
+        result = await self.db.user_messages.update_many(
+            {"conversation_id": conversation_id, "recipient_id": user_id, "is_read": {"$ne": True}},
+            {"$set": {"read": True, "is_read": True, "read_at": datetime.utcnow().isoformat()}}
+        )
+        await self.db.conversations.update_one(
+            {"id": conversation_id},
+            {"$set": {f"unread.{user_id}": 0}}
+        )
+        return result.modified_count
+
+    async def message_read(self, message: Dict[str, Any], user_id: str):
+        """Decrement the unread count after a single message addressed to the user was read"""
+        if message.get("recipient_id") != user_id or not message.get("conversation_id"):
+            return
+        await self.db.conversations.update_one(
+            {"id": message["conversation_id"], f"unread.{user_id}": {"$gt": 0}},
+            {"$inc": {f"unread.{user_id}": -1}}
+        )
+
+    async def backfill(self, batch_size: int = 500) -> Dict[str, int]:
+        """
+        Assign conversation ids to legacy messages and merge them into the conversations
+        collection. Safe while record_message runs: documents are merged in one atomic
+        pipeline update instead of overwritten, so a newer last_message is kept and unread
+        counts only grow by the legacy (pre-threading) messages not yet counted.
+        """
+        updated = 0
+        operations = []
+        legacy_unread: Dict[str, Dict[str, int]] = {}  # conversation_id -> recipient -> unread
+        async for message in self.db.user_messages.find(
+            {"conversation_id": {"$exists": False}},
+            {"sender_id": 1, "recipient_id": 1, "is_read": 1, "read": 1}
+        ):
+            sender_id, recipient_id = message.get("sender_id"), message.get("recipient_id")
+            if not sender_id or not recipient_id:
+                continue
+            conversation_id = conversation_id_for(sender_id, recipient_id)
+            operations.append(UpdateOne(
+                {"_id": message["_id"], "conversation_id": {"$exists": False}},
+                {"$set": {"conversation_id": conversation_id}}
+            ))
+            if recipient_id != sender_id and not (message.get("is_read") or message.get("read")):
+                per_user = legacy_unread.setdefault(conversation_id, {})
+                per_user[recipient_id] = per_user.get(recipient_id, 0) + 1
+            if len(operations) >= batch_size:
+                await self.db.user_messages.bulk_write(operations, ordered=False)
+                updated += len(operations)
+                operations = []
+        if operations:
+            await self.db.user_messages.bulk_write(operations, ordered=False)
+            updated += len(operations)
+
+        merged = 0
+        summaries = self.db.user_messages.aggregate([
+            {"$match": {"conversation_id": {"$exists": True}}},
+            {"$sort": {"created_at": 1}},
+            {"$group": {
+                "_id": "$conversation_id",
+                "participants": {"$addToSet": "$sender_id"},
+                "recipients": {"$addToSet": "$recipient_id"},
+                "first_at": {"$first": "$created_at"},
+                "last": {"$last": "$$ROOT"}
+            }}
+        ], allowDiskUse=True)
+        async for summary in summaries:
+            participants = sorted(set(summary["participants"]) | set(summary["recipients"]))
+            last_at = summary["last"].get("created_at")
+            merge = {
+                "id": summary["_id"],
+                "participants": {"$ifNull": ["$participants", {"$literal": participants}]},
+                "created_at": {"$ifNull": ["$created_at", {"$literal": summary["first_at"]}]},
+                # Keep a last_message written concurrently by record_message if it is newer
+                "last_message": {"$cond": [
+                    {"$lt": [{"$ifNull": ["$updated_at", None]}, {"$literal": last_at}]},
+                    {"$literal": _message_preview(summary["last"])},
+                    "$last_message"
+                ]},
+                "updated_at": {"$max": [{"$ifNull": ["$updated_at", None]}, {"$literal": last_at}]}
+            }
+            for recipient_id, count in legacy_unread.get(summary["_id"], {}).items():
+                merge[f"unread.{recipient_id}"] = {"$add": [{"$ifNull": [f"$unread.{recipient_id}", 0]}, count]}
+
+            await self.db.conversations.update_one({"id": summary["_id"]}, [{"$set": merge}], upsert=True)
+            merged += 1
+
+        logger.info(f"💬 Conversation backfill threaded {updated} messages into {merged} conversations")
+        return {"messages_threaded": updated, "conversations": merged}
+
+    async def migrate(self) -> Optional[Dict[str, int]]:
+        """One-time backfill so messages sent before conversations existed are threaded"""
+        if await self.db.migrations.find_one({"name": MIGRATION_NAME}):
+            return None
+        result = await self.backfill()
+        await self.db.migrations.insert_one({"name": MIGRATION_NAME, "completed_at": datetime.utcnow(), **result})
+        return result
+
+
+# Global conversation service instance
+conversation_service = None
+
+async def init_conversation_service(db):
+    """Initialize conversation service"""
+    global conversation_service
+    conversation_service = ConversationService(db)
+    return conversation_service
+
+def get_conversation_service():
+    """Get conversation service instance"""
+    return conversation_service
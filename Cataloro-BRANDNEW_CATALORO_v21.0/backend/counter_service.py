@@ -0,0 +1,165 @@
+"""
+Counter Service for Cataloro Marketplace
+Write-behind aggregation of hot counters (views, impressions, clicks) flushed as one bulk_write per collection
+"""
+
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict, defaultdict
+from typing import Dict, Optional, Tuple
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+logger = logging.getLogger(__name__)
+
+# (collection, key field, document id) -> {counter field: pending increment}
+CounterKey = Tuple[str, str, str]
+
+
+class CounterAggregator:
+    """
+    Accumulates $inc deltas in memory and writes them every `flush_interval`
+    seconds, so the write rate follows the number of distinct documents touched
+    rather than the request rate. Counters read back from Mongo lag by at most
+    one interval; pending deltas are lost only if the process dies without
+    running stop().
+    """
+
+    def __init__(self, db, flush_interval: float = None, view_dedup_window: float = None, max_pending: int = None):
+        self.db = db
+        self.flush_interval = flush_interval or float(os.environ.get('COUNTER_FLUSH_INTERVAL', 5))
+        # 0 disables view dedup
+        self.view_dedup_window = view_dedup_window if view_dedup_window is not None else float(
+            os.environ.get('VIEW_DEDUP_WINDOW', 1800)
+        )
+        self.max_pending = max_pending or int(os.environ.get('COUNTER_MAX_PENDING', 5000))
+        self.max_tracked_views = int(os.environ.get('VIEW_DEDUP_MAX_ENTRIES', 100000))
+
+        self._pending: Dict[CounterKey, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        self._recent_views: "OrderedDict[Tuple[str, str, str], float]" = OrderedDict()
+        self._flush_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._early_flush: Optional[asyncio.Task] = None
+        self.stats = {"increments": 0, "deduplicated_views": 0, "flushes": 0, "documents_written": 0, "flush_errors": 0}
+
+    def increment(self, collection: str, doc_id: str, field: str, amount: int = 1, key_field: str = "id"):
+        """Queue `$inc {field: amount}` on the document whose key_field equals doc_id"""
+        if not doc_id:
+            return
+        self._pending[(collection, key_field, doc_id)][field] += amount
+        self.stats["increments"] += 1
+        if len(self._pending) >= self.max_pending and (self._early_flush is None or self._early_flush.done()):
+            self._early_flush = asyncio.create_task(self.flush())
+
+    def record_view(self, collection: str, doc_id: str, viewer: str = None, field: str = "views") -> bool:
+        """Count a view unless the same viewer already viewed the document within the dedup window"""
+        if viewer and self.view_dedup_window > 0:
+            now = time.monotonic()
+            # Entries are appended in expiry order, so expired ones sit at the front
+            while self._recent_views:
+                expires = next(iter(self._recent_views.values()))
+                if expires > now and len(self._recent_views) < self.max_tracked_views:
+                    break
+                self._recent_views.popitem(last=False)
+
+            view_key = (collection, doc_id, viewer)
+            if view_key in self._recent_views:
+                self.stats["deduplicated_views"] += 1
+                return False
+            self._recent_views[view_key] = now + self.view_dedup_window
+
+        self.increment(collection, doc_id, field)
+        return True
+
+    async def flush(self) -> int:
+        """Write every pending delta; returns the number of documents updated"""
+        async with self._flush_lock:
+            if not self._pending:
+                return 0
+            pending, self._pending = self._pending, defaultdict(lambda: defaultdict(int))
+
+            by_collection: Dict[str, list] = defaultdict(list)
+            for (collection, key_field, doc_id), fields in pending.items():
+                by_collection[collection].append(((key_field, doc_id), dict(fields)))
+
+            written = 0
+            for collection, entries in by_collection.items():
+                operations = [
+                    UpdateOne({key_field: doc_id}, {"$inc": fields})
+                    for (key_field, doc_id), fields in entries
+                ]
+                try:
+                    result = await self.db[collection].bulk_write(operations, ordered=False)
+                    written += result.matched_count
+                except BulkWriteError as bwe:
+                    # Only the failed operations are retried on the next flush
+                    self.stats["flush_errors"] += 1
+                    failed = {error["index"] for error in bwe.details.get("writeErrors", [])}
+                    written += bwe.details.get("nMatched", 0)
+                    for index in failed:
+                        (key_field, doc_id), fields = entries[index]
+                        self._requeue(collection, key_field, doc_id, fields)
+                    logger.warning(f"Counter flush for {collection} had {len(failed)} failed writes")
+                except Exception as e:
+                    self.stats["flush_errors"] += 1
+                    for (key_field, doc_id), fields in entries:
+                        self._requeue(collection, key_field, doc_id, fields)
+                    logger.error(f"Counter flush for {collection} failed, will retry: {e}")
+
+            self.stats["flushes"] += 1
+            self.stats["documents_written"] += written
+            return written
+
+    def _requeue(self, collection: str, key_field: str, doc_id: str, fields: Dict[str, int]):
+        for field, amount in fields.items():
+            self._pending[(collection, key_field, doc_id)][field] += amount
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Counter flush loop error: {e}")
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._flush_loop())
+            logger.info(f"✅ Counter aggregator started (flush every {self.flush_interval}s)")
+
+    async def stop(self):
+        """Stop the flush loop and write whatever is still pending"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        written = await self.flush()
+        logger.info(f"🛑 Counter aggregator stopped, final flush wrote {written} documents")
+
+    def get_stats(self) -> Dict[str, int]:
+        return {
+            **self.stats,
+            "pending_documents": len(self._pending),
+            "tracked_views": len(self._recent_views)
+        }
+
+
+# Global counter aggregator instance
+counter_aggregator = None
+
+async def init_counter_service(db):
+    """Initialize counter aggregator and start its flush loop"""
+    global counter_aggregator
+    counter_aggregator = CounterAggregator(db)
+    counter_aggregator.start()
+    return counter_aggregator
+
+def get_counter_aggregator():
+    """Get counter aggregator instance"""
+    return counter_aggregator
@@ -1,90 +1,121 @@
 """
 Database Optimization Script for Cataloro Marketplace
-Adds critical indexes and optimizes database performance
+Builds missing registry indexes, reports index usage and checks query plans
+
+    python database_optimization.py                 # diff + build missing indexes
+    python database_optimization.py --dry-run       # diff only
+    python database_optimization.py --usage         # unused indexes per $indexStats
+    python database_optimization.py --check-plans   # explain() harness, exits 1 on COLLSCAN / in-memory SORT
 """
 
+import argparse
 import asyncio
 import motor.motor_asyncio
 import os
+import sys
 from dotenv import load_dotenv
 
+from index_registry import IndexRegistry
+
 # Load environment variables
 load_dotenv()
 
-async def optimize_database():
-    """Add critical indexes to improve database performance"""
-    
-    # Connect to MongoDB
-    MONGO_URL = os.environ.get('MONGO_URL', 'mongodb://localhost:27017')
+MONGO_URL = os.environ.get('MONGO_URL', 'mongodb://localhost:27017')
+
+
+async def optimize_database(dry_run: bool = False):
+    """Build the indexes the registry has and the database lacks"""
     client = motor.motor_asyncio.AsyncIOMotorClient(MONGO_URL)
-    db = client.cataloro_marketplace
-    
+    registry = IndexRegistry(client.cataloro_marketplace)
+
     print("🔧 Starting database optimization...")
-    
     try:
-        # Test connection
         await client.admin.command('ping')
         print("✅ Connected to MongoDB successfully")
-        
-        # Add indexes for listings collection
-        print("📊 Adding indexes for listings collection...")
-        await db.listings.create_index("seller_id")
-        await db.listings.create_index("status") 
-        await db.listings.create_index("created_at")
-        await db.listings.create_index([("seller_id", 1), ("status", 1)])
-        await db.listings.create_index([("status", 1), ("created_at", -1)])
-        print("✅ Listings indexes created")
-        
-        # Add indexes for tenders collection
-        print("📊 Adding indexes for tenders collection...")
-        await db.tenders.create_index("listing_id")
-        await db.tenders.create_index("bidder_id")
-        await db.tenders.create_index("status")
-        await db.tenders.create_index("created_at")
-        await db.tenders.create_index([("listing_id", 1), ("status", 1)])
-        print("✅ Tenders indexes created")
-        
-        # Add indexes for user_messages collection
-        print("📊 Adding indexes for user_messages collection...")
-        await db.user_messages.create_index("sender_id")
-        await db.user_messages.create_index("recipient_id")
-        await db.user_messages.create_index("created_at")
-        await db.user_messages.create_index([("sender_id", 1), ("created_at", -1)])
-        await db.user_messages.create_index([("recipient_id", 1), ("created_at", -1)])
-        print("✅ User messages indexes created")
-        
-        # Add indexes for ads collection
-        print("📊 Adding indexes for ads collection...")
-        await db.ads.create_index("is_active")
-        await db.ads.create_index("expires_at")
-        await db.ads.create_index("created_at")
-        print("✅ Ads indexes created")
-        
-        # Add indexes for deals collection
-        print("📊 Adding indexes for deals collection...")
-        await db.deals.create_index("buyer_id")
-        await db.deals.create_index("seller_id")
-        await db.deals.create_index("status")
-        await db.deals.create_index("created_at")
-        print("✅ Deals indexes created")
-        
-        # Show existing indexes
-        print("\n📋 Current indexes:")
-        collections = ['listings', 'tenders', 'user_messages', 'ads', 'deals']
-        for collection_name in collections:
-            collection = getattr(db, collection_name)
-            indexes = await collection.list_indexes().to_list(length=None)
-            print(f"\n{collection_name}:")
-            for index in indexes:
-                print(f"  - {index.get('name', 'unnamed')}: {index.get('key', {})}")
-        
+
+        if dry_run:
+            report = await registry.diff()
+            for collection, result in report.items():
+                for spec in result["missing"]:
+                    print(f"  ➕ {collection}: {spec}")
+                for conflict in result["conflicting"]:
+                    print(f"  ⚠️ {collection}.{conflict['name']}: expected {conflict['expected']}, found {conflict['actual']}")
+                for name in result["unregistered"]:
+                    print(f"  ❔ {collection}.{name} is not in the registry")
+            return
+
+        report = await registry.sync()
+        for collection, result in report.items():
+            if result.get("error"):
+                print(f"  ❌ {collection}: {result['error']}")
+                continue
+            for name in result["created"]:
+                print(f"  ✅ {collection}.{name} built")
+            for failure in result["failed"]:
+                print(f"  ❌ {collection}({failure['index']}): {failure['error']}")
+            for conflict in result["conflicting"]:
+                print(f"  ⚠️ {collection}.{conflict['name']} differs from the registry")
+            for name in result["unregistered"]:
+                print(f"  ❔ {collection}.{name} is not in the registry")
+
         print("\n✅ Database optimization completed successfully!")
-        
-    except Exception as e:
-        print(f"❌ Database optimization failed: {e}")
-        raise
     finally:
         client.close()
 
+
+async def report_index_usage(min_age_hours: int):
+    """Print indexes without recorded accesses"""
+    client = motor.motor_asyncio.AsyncIOMotorClient(MONGO_URL)
+    try:
+        report = await IndexRegistry(client.cataloro_marketplace).usage_report(min_age_hours)
+        if not report["unused"]:
+            print("✅ Every index has been used")
+        for entry in report["unused"]:
+            print(f"  🗑️ {entry['collection']}.{entry['name']} unused since {entry['since']}")
+    finally:
+        client.close()
+
+
+async def check_query_plans(database: str) -> bool:
+    """
+    Build the registry in a scratch database, explain() every canonical query
+    shape and report the ones that scan the collection or sort in memory.
+    """
+    client = motor.motor_asyncio.AsyncIOMotorClient(MONGO_URL)
+    db = client[database]
+    try:
+        registry = IndexRegistry(db)
+        await registry.sync()
+        results = await registry.check_query_plans()
+
+        for result in results:
+            marker = "✅" if result["ok"] else "❌"
+            detail = ", ".join(result["problems"]) or ", ".join(result["stages"])
+            print(f"  {marker} {result['collection']}: {result['name']} ({detail})")
+
+        failures = [result for result in results if not result["ok"]]
+        print(f"\n{len(results) - len(failures)}/{len(results)} query shapes are index-backed")
+        return not failures
+    finally:
+        await client.drop_database(database)
+        client.close()
+
+
 if __name__ == "__main__":
-    asyncio.run(optimize_database())
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Cataloro index maintenance")
+    parser.add_argument("--dry-run", action="store_true", help="only show what would be built")
+    parser.add_argument("--usage", action="store_true", help="report unused indexes")
+    parser.add_argument("--min-age-hours", type=int, default=24, help="minimum $indexStats age for --usage")
+    parser.add_argument("--check-plans", action="store_true", help="explain() the canonical query shapes")
+    parser.add_argument("--plan-db", default=os.environ.get('PLAN_CHECK_DB', 'cataloro_plan_check'),
+                        help="scratch database for --check-plans (dropped afterwards)")
+    args = parser.parse_args()
+
+    if args.check_plans:
+        if args.plan_db == "cataloro_marketplace":
+            parser.error("--plan-db is dropped after the check; use a scratch database")
+        sys.exit(0 if asyncio.run(check_query_plans(args.plan_db)) else 1)
+    elif args.usage:
+        asyncio.run(report_index_usage(args.min_age_hours))
+    else:
+        asyncio.run(optimize_database(args.dry_run))
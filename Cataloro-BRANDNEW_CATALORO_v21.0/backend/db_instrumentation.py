@@ -0,0 +1,202 @@
+"""
+Database Instrumentation for Cataloro Marketplace
+Thin wrappers around the motor database, collections and cursors that time every operation
+and report it with its query shape (literals stripped)
+"""
+
+import functools
+import json
+import time
+from typing import Any, Callable, Dict
+
+from motor.motor_asyncio import AsyncIOMotorCollection
+
+# recorder(collection, operation, shape, duration_ms)
+Recorder = Callable[[str, str, str, float], None]
+
+MAX_SHAPE_LENGTH = 500
+
+# Collection methods that return an awaitable result
+AWAITABLE_OPERATIONS = frozenset({
+    "find_one", "insert_one", "insert_many", "update_one", "update_many", "replace_one",
+    "delete_one", "delete_many", "count_documents", "estimated_document_count", "distinct",
+    "find_one_and_update", "find_one_and_delete", "find_one_and_replace", "bulk_write",
+    "create_index", "create_indexes", "drop_index"
+})
+# Collection methods that return a cursor; timed across to_list() / async iteration
+CURSOR_OPERATIONS = frozenset({"find", "aggregate", "list_indexes"})
+# Operations whose arguments are documents to write rather than a query
+UNSHAPED_OPERATIONS = frozenset({
+    "insert_one", "insert_many", "bulk_write", "create_index", "create_indexes", "drop_index",
+    "list_indexes", "estimated_document_count"
+})
+
+
+def _strip(value: Any) -> Any:
+    """Replace literals with '?', keeping keys, operators and $field paths"""
+    if isinstance(value, dict):
+        return {key: _strip(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        stripped = [_strip(item) for item in value]
+        # A list of literals ($in ids, $all tokens) collapses so its length does not split shapes
+        if stripped and all(item == "?" for item in stripped):
+            return ["?"]
+        return stripped
+    if isinstance(value, str) and value.startswith("$"):
+        return value
+    return "?"
+
+
+def query_shape(operation: str, args: tuple, kwargs: Dict[str, Any], sort: Any = None) -> str:
+    """Normalized, literal-free description of an operation's query"""
+    if operation in UNSHAPED_OPERATIONS:
+        return "-"
+
+    if operation == "aggregate":
+        shape: Dict[str, Any] = {"pipeline": _strip(args[0] if args else kwargs.get("pipeline", []))}
+    elif operation == "distinct":
+        shape = {
+            "key": args[0] if args else kwargs.get("key"),
+            "filter": _strip(args[1] if len(args) > 1 else kwargs.get("filter") or {})
+        }
+    else:
+        shape = {"filter": _strip(args[0] if args else kwargs.get("filter") or {})}
+        sort = sort if sort is not None else kwargs.get("sort")
+
+    if sort:
+        shape["sort"] = sort
+    return json.dumps(shape, separators=(",", ":"), default=str)[:MAX_SHAPE_LENGTH]
+
+
+class InstrumentedCursor:
+    """Proxies a motor cursor, remembers its sort and records once it is drained"""
+
+    def __init__(self, cursor, recorder: Recorder, collection: str, operation: str, args: tuple, kwargs: Dict[str, Any]):
+        self._cursor = cursor
+        self._recorder = recorder
+        self._collection = collection
+        self._operation = operation
+        self._args = args
+        self._kwargs = kwargs
+        self._sort = None
+        self._elapsed_ms = 0.0
+        self._recorded = False
+
+    def sort(self, key_or_list, direction=None):
+        if direction is None:
+            self._sort = key_or_list
+            self._cursor.sort(key_or_list)
+        else:
+            self._sort = [(key_or_list, direction)]
+            self._cursor.sort(key_or_list, direction)
+        return self
+
+    def __getattr__(self, name):
+        attr = getattr(self._cursor, name)
+        if not callable(attr):
+            return attr
+
+        @functools.wraps(attr)
+        def chained(*args, **kwargs):
+            result = attr(*args, **kwargs)
+            # Keep chaining through the wrapper (skip, limit, batch_size, ...)
+            return self if result is self._cursor else result
+        return chained
+
+    def _record(self):
+        if not self._recorded:
+            self._recorded = True
+            shape = query_shape(self._operation, self._args, self._kwargs, self._sort)
+            self._recorder(self._collection, self._operation, shape, self._elapsed_ms)
+
+    async def to_list(self, length=None):
+        started = time.perf_counter()
+        try:
+            return await self._cursor.to_list(length)
+        finally:
+            self._elapsed_ms += (time.perf_counter() - started) * 1000
+            self._record()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        started = time.perf_counter()
+        try:
+            document = await self._cursor.__anext__()
+        except StopAsyncIteration:
+            self._elapsed_ms += (time.perf_counter() - started) * 1000
+            self._record()
+            raise
+        self._elapsed_ms += (time.perf_counter() - started) * 1000
+        return document
+
+
+class InstrumentedCollection:
+    """Times the collection's query/write methods; everything else passes straight through"""
+
+    def __init__(self, collection, recorder: Recorder):
+        self._collection = collection
+        self._recorder = recorder
+        self.name = collection.name
+
+    def __getattr__(self, name):
+        attr = getattr(self._collection, name)
+        if name in AWAITABLE_OPERATIONS:
+            wrapped = self._timed(name, attr)
+        elif name in CURSOR_OPERATIONS:
+            wrapped = self._cursor(name, attr)
+        else:
+            return attr
+        # Cache the wrapper so later lookups skip __getattr__
+        self.__dict__[name] = wrapped
+        return wrapped
+
+    def _timed(self, operation: str, method):
+        @functools.wraps(method)
+        async def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return await method(*args, **kwargs)
+            finally:
+                self._recorder(
+                    self.name, operation, query_shape(operation, args, kwargs),
+                    (time.perf_counter() - started) * 1000
+                )
+        return timed
+
+    def _cursor(self, operation: str, method):
+        @functools.wraps(method)
+        def cursor(*args, **kwargs):
+            return InstrumentedCursor(method(*args, **kwargs), self._recorder, self.name, operation, args, kwargs)
+        return cursor
+
+
+class InstrumentedDatabase:
+    """Drop-in for the motor database: db.<name> and db[name] return instrumented collections"""
+
+    def __init__(self, database, recorder: Recorder):
+        self._database = database
+        self._recorder = recorder
+        self._collections: Dict[str, InstrumentedCollection] = {}
+
+    def __getitem__(self, name: str) -> InstrumentedCollection:
+        collection = self._collections.get(name)
+        if collection is None:
+            collection = self._collections[name] = InstrumentedCollection(self._database[name], self._recorder)
+        return collection
+
+    def __getattr__(self, name: str):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        if name in self._collections:
+            return self._collections[name]
+        attr = getattr(self._database, name)
+        if isinstance(attr, AsyncIOMotorCollection):
+            return self[name]
+        return attr
+
+
+def instrument_database(database, recorder: Recorder, enabled: bool = True):
+    """Wrap a motor database for timing, or return it unchanged when disabled"""
+    return InstrumentedDatabase(database, recorder) if enabled else database
@@ -0,0 +1,252 @@
+"""
+Executor Service for Cataloro Marketplace
+Bounded thread/process pools for blocking and CPU-bound work, plus event loop lag monitoring
+"""
+
+import asyncio
+import functools
+import logging
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import BrokenExecutor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ExecutorSaturated(Exception):
+    """Raised when a pool's wait queue is full; callers should answer 503"""
+
+
+def _percentile(samples, fraction: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+class BoundedPool:
+    """
+    A thread or process pool with a concurrency cap and a bounded wait queue.
+    At most `max_workers` jobs are handed to the executor at a time; up to
+    `max_queue` more wait on the semaphore, anything beyond that is rejected.
+    """
+
+    def __init__(self, name: str, kind: str, max_workers: int, max_queue: int):
+        self.name = name
+        self.kind = kind
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+        self.active = 0
+        self.waiting = 0
+        self.stats = {"submitted": 0, "completed": 0, "failed": 0, "rejected": 0}
+        self.wait_times = deque(maxlen=500)  # ms spent queued before a worker was free
+        self.run_times = deque(maxlen=500)   # ms spent executing
+
+    def _get_executor(self):
+        if self._executor is None:
+            if self.kind == "process":
+                # spawn: workers must not inherit the parent's sockets and client threads
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context(os.environ.get('EXECUTOR_PROCESS_START_METHOD', 'spawn'))
+                )
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix=f"cataloro-{self.name}"
+                )
+        return self._executor
+
+    async def run(self, fn: Callable, *args, **kwargs) -> Any:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_workers)
+
+        if self.waiting >= self.max_queue and self._semaphore.locked():
+            self.stats["rejected"] += 1
+            raise ExecutorSaturated(f"{self.name} pool saturated ({self.waiting} jobs waiting)")
+
+        self.stats["submitted"] += 1
+        queued_at = time.perf_counter()
+        self.waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+
+        started_at = time.perf_counter()
+        self.wait_times.append((started_at - queued_at) * 1000)
+        self.active += 1
+        try:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(self._get_executor(), functools.partial(fn, *args, **kwargs))
+            self.stats["completed"] += 1
+            return result
+        except BrokenExecutor:
+            # A crashed worker poisons the executor; start a fresh one on the next call
+            self.stats["failed"] += 1
+            self.shutdown()
+            raise
+        except Exception:
+            self.stats["failed"] += 1
+            raise
+        finally:
+            self.active -= 1
+            self.run_times.append((time.perf_counter() - started_at) * 1000)
+            self._semaphore.release()
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "kind": self.kind,
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "active": self.active,
+            "queue_depth": self.waiting,
+            **self.stats,
+            "wait_ms": {
+                "p50": round(_percentile(self.wait_times, 0.5), 2),
+                "p95": round(_percentile(self.wait_times, 0.95), 2),
+                "max": round(max(self.wait_times, default=0.0), 2)
+            },
+            "run_ms": {
+                "p50": round(_percentile(self.run_times, 0.5), 2),
+                "p95": round(_percentile(self.run_times, 0.95), 2),
+                "max": round(max(self.run_times, default=0.0), 2)
+            }
+        }
+
+
+class LoopLagMonitor:
+    """Samples how late a periodic sleep wakes up, i.e. how long the loop was blocked"""
+
+    def __init__(self, interval: float = None, warn_ms: float = None):
+        self.interval = interval or float(os.environ.get('LOOP_LAG_INTERVAL', 0.5))
+        self.warn_ms = warn_ms or float(os.environ.get('LOOP_LAG_WARN_MS', 200))
+        self.samples = deque(maxlen=240)
+        self.max_lag_ms = 0.0
+        self.slow_ticks = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _loop(self):
+        while True:
+            expected = time.perf_counter() + self.interval
+            await asyncio.sleep(self.interval)
+            lag_ms = max(0.0, (time.perf_counter() - expected) * 1000)
+            self.samples.append(lag_ms)
+            self.max_lag_ms = max(self.max_lag_ms, lag_ms)
+            if lag_ms >= self.warn_ms:
+                self.slow_ticks += 1
+                logger.warning(f"🐢 Event loop blocked for {lag_ms:.0f}ms")
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "current_ms": round(self.samples[-1], 2) if self.samples else 0.0,
+            "avg_ms": round(sum(self.samples) / len(self.samples), 2) if self.samples else 0.0,
+            "p95_ms": round(_percentile(self.samples, 0.95), 2),
+            "max_ms": round(self.max_lag_ms, 2),
+            "slow_ticks": self.slow_ticks,
+            "warn_threshold_ms": self.warn_ms
+        }
+
+
+class ExecutorService:
+    """
+    Named pools that request handlers offload to:
+    - "threads": blocking calls and work that releases the GIL (bcrypt, decoding, file IO)
+    - "processes": pure-Python CPU work with picklable inputs/outputs (spreadsheet parsing)
+    - "reports": document rendering, kept small so exports cannot starve the other pools
+    """
+
+    def __init__(self):
+        cpu_count = os.cpu_count() or 2
+        self.pools: Dict[str, BoundedPool] = {}
+        self.register_pool(
+            "threads", "thread",
+            int(os.environ.get('EXECUTOR_THREAD_WORKERS', min(32, cpu_count + 4))),
+            int(os.environ.get('EXECUTOR_THREAD_QUEUE', 200))
+        )
+        self.register_pool(
+            "processes", "process",
+            int(os.environ.get('EXECUTOR_PROCESS_WORKERS', max(1, cpu_count - 1))),
+            int(os.environ.get('EXECUTOR_PROCESS_QUEUE', 20))
+        )
+        self.register_pool(
+            "reports", "thread",
+            int(os.environ.get('EXECUTOR_REPORT_WORKERS', 2)),
+            int(os.environ.get('EXECUTOR_REPORT_QUEUE', 10))
+        )
+        self.loop_lag = LoopLagMonitor()
+
+    def register_pool(self, name: str, kind: str, max_workers: int, max_queue: int) -> BoundedPool:
+        self.pools[name] = BoundedPool(name, kind, max_workers, max_queue)
+        return self.pools[name]
+
+    async def run(self, pool: str, fn: Callable, *args, **kwargs) -> Any:
+        """Run fn(*args, **kwargs) on the named pool and await its result"""
+        return await self.pools[pool].run(fn, *args, **kwargs)
+
+    async def run_in_thread(self, fn: Callable, *args, **kwargs) -> Any:
+        return await self.run("threads", fn, *args, **kwargs)
+
+    async def run_in_process(self, fn: Callable, *args, **kwargs) -> Any:
+        return await self.run("processes", fn, *args, **kwargs)
+
+    def start(self):
+        self.loop_lag.start()
+        logger.info(f"✅ Executor pools ready: {', '.join(f'{n}={p.max_workers}' for n, p in self.pools.items())}")
+
+    async def shutdown(self):
+        await self.loop_lag.stop()
+        for pool in self.pools.values():
+            pool.shutdown()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "loop_lag": self.loop_lag.get_stats(),
+            "pools": {name: pool.get_stats() for name, pool in self.pools.items()}
+        }
+
+
+def offload(pool: str = "threads"):
+    """Decorator turning a blocking function into a coroutine that runs on the named pool"""
+    def decorator(fn: Callable):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            return await executor_service.run(pool, fn, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# Global executor service instance
+executor_service = ExecutorService()
+
+def init_executor_service():
+    """Start loop lag monitoring"""
+    executor_service.start()
+    return executor_service
+
+async def cleanup_executor_service():
+    """Stop loop lag monitoring and shut the pools down"""
+    await executor_service.shutdown()
@@ -0,0 +1,276 @@
+"""
+Export Job Service for Cataloro Marketplace
+Queued report generation with content-addressed, TTL-bound artifacts
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from executor_service import executor_service
+from index_registry import ensure_collection_indexes
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ReportType:
+    collect: Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]]  # async: params -> data
+    render: Callable[[Dict[str, Any], str], None]                   # sync: (data, path) -> writes file
+    filename: Callable[[Dict[str, Any]], str]                       # params -> download filename
+    media_type: str = "application/pdf"
+    extension: str = "pdf"
+
+
+def _digest(value: Any) -> str:
+    return hashlib.sha256(json.dumps(value, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+class ExportJobService:
+    """
+    Submitting an export stores a job in `export_jobs` and queues it for a small
+    set of in-process workers. A worker collects the report data, derives the
+    artifact key from (report type, params, data version) and only renders on
+    the executor's report pool when no live artifact with that key exists.
+    Artifacts live in one directory as <key>.<ext>, tracked in `export_artifacts`,
+    and are swept once their TTL has passed.
+    """
+
+    def __init__(self, db, artifact_dir: str = None):
+        self.db = db
+        # Not under uploads/, which is served as static files
+        self.artifact_dir = Path(artifact_dir or os.environ.get(
+            'EXPORT_ARTIFACT_DIR', str(Path(__file__).parent / "exports")
+        ))
+        self.artifact_ttl = int(os.environ.get('EXPORT_ARTIFACT_TTL', 3600))
+        self.job_ttl = int(os.environ.get('EXPORT_JOB_TTL', 86400))
+        self.worker_count = int(os.environ.get('EXPORT_WORKERS', 2))
+        self.sweep_interval = int(os.environ.get('EXPORT_SWEEP_INTERVAL', 600))
+        # Queued/running jobs older than this were lost with a restarted or cancelled worker
+        self.stale_after = int(os.environ.get('EXPORT_JOB_STALE_AFTER', 900))
+
+        self.reports: Dict[str, ReportType] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks = []
+        self._waiters: Dict[str, asyncio.Future] = {}
+        self.stats = {"submitted": 0, "cache_hits": 0, "rendered": 0, "failed": 0, "swept": 0, "stale": 0}
+
+    def register_report(self, report_type: str, report: ReportType):
+        self.reports[report_type] = report
+
+    async def ensure_indexes(self):
+        await ensure_collection_indexes(self.db, "export_jobs", "export_artifacts")
+
+    def start(self):
+        self.artifact_dir.mkdir(parents=True, exist_ok=True)
+        self._queue = asyncio.Queue()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.worker_count)]
+        self._tasks.append(asyncio.create_task(self._sweep_loop()))
+        logger.info(f"📄 Export workers started ({self.worker_count}), artifacts in {self.artifact_dir}")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def submit(self, report_type: str, params: Dict[str, Any], user_id: str = None) -> Dict[str, Any]:
+        """Queue an export and return its job document"""
+        if report_type not in self.reports:
+            raise ValueError(f"Unknown report type: {report_type}")
+
+        now = datetime.utcnow()
+        job = {
+            "id": str(uuid.uuid4()),
+            "type": report_type,
+            "params": params,
+            "user_id": user_id,
+            "status": "queued",
+            "created_at": now,
+            "expires_at": now + timedelta(seconds=self.job_ttl)
+        }
+        await self.db.export_jobs.insert_one(job)
+        job.pop("_id", None)
+
+        self._waiters[job["id"]] = asyncio.get_running_loop().create_future()
+        await self._queue.put(job)
+        self.stats["submitted"] += 1
+        return job
+
+    async def wait(self, job_id: str, timeout: float = 120) -> Dict[str, Any]:
+        """Wait for a job submitted by this process to finish"""
+        waiter = self._waiters.get(job_id)
+        if waiter is not None:
+            await asyncio.wait_for(asyncio.shield(waiter), timeout)
+        return await self.get_job(job_id)
+
+    async def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return await self.db.export_jobs.find_one({"id": job_id}, {"_id": 0})
+
+    def artifact_path(self, job: Dict[str, Any]) -> Optional[Path]:
+        """Path of a completed job's artifact, None if it was already swept"""
+        if job.get("status") != "completed":
+            return None
+        path = self.artifact_dir / job["artifact"]
+        return path if path.exists() else None
+
+    async def _worker(self):
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._process(job)
+            finally:
+                self._queue.task_done()
+                waiter = self._waiters.pop(job["id"], None)
+                if waiter and not waiter.done():
+                    waiter.set_result(None)
+
+    async def _process(self, job: Dict[str, Any]):
+        report = self.reports[job["type"]]
+        await self.db.export_jobs.update_one(
+            {"id": job["id"]}, {"$set": {"status": "running", "started_at": datetime.utcnow()}}
+        )
+        try:
+            data = await report.collect(job["params"])
+            key = _digest({"type": job["type"], "params": job["params"], "data_version": _digest(data)})
+
+            artifact = await self._live_artifact(key)
+            cached = artifact is not None
+            if cached:
+                self.stats["cache_hits"] += 1
+            else:
+                artifact = await self._render(report, key, data)
+
+            await self.db.export_jobs.update_one({"id": job["id"]}, {"$set": {
+                "status": "completed",
+                "artifact": artifact["file"],
+                "size": artifact["size"],
+                "filename": report.filename(job["params"]),
+                "media_type": report.media_type,
+                "cached": cached,
+                "completed_at": datetime.utcnow()
+            }})
+        except Exception as e:
+            self.stats["failed"] += 1
+            logger.error(f"Export job {job['id']} ({job['type']}) failed: {e}")
+            await self.db.export_jobs.update_one(
+                {"id": job["id"]},
+                {"$set": {"status": "failed", "error": str(e), "completed_at": datetime.utcnow()}}
+            )
+
+    async def _live_artifact(self, key: str) -> Optional[Dict[str, Any]]:
+        artifact = await self.db.export_artifacts.find_one(
+            {"key": key, "expires_at": {"$gt": datetime.utcnow()}}, {"_id": 0}
+        )
+        if artifact and (self.artifact_dir / artifact["file"]).exists():
+            return artifact
+        return None
+
+    async def _render(self, report: ReportType, key: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        file_name = f"{key}.{report.extension}"
+        final_path = self.artifact_dir / file_name
+        tmp_path = self.artifact_dir / f"{file_name}.{uuid.uuid4().hex}.tmp"
+        try:
+            await executor_service.run("reports", report.render, data, str(tmp_path))
+            os.replace(tmp_path, final_path)
+        finally:
+            if tmp_path.exists():
+                tmp_path.unlink()
+
+        now = datetime.utcnow()
+        artifact = {
+            "key": key,
+            "file": file_name,
+            "size": final_path.stat().st_size,
+            "created_at": now,
+            "expires_at": now + timedelta(seconds=self.artifact_ttl)
+        }
+        await self.db.export_artifacts.replace_one({"key": key}, artifact, upsert=True)
+        artifact.pop("_id", None)
+        self.stats["rendered"] += 1
+        return artifact
+
+    async def _sweep_loop(self):
+        while True:
+            # Runs on start as well, so jobs lost in a restart are failed right away
+            try:
+                await self.fail_stale_jobs()
+            except Exception as e:
+                logger.error(f"Export stale job check failed: {e}")
+            await asyncio.sleep(self.sweep_interval)
+            try:
+                await self.sweep()
+            except Exception as e:
+                logger.error(f"Export artifact sweep failed: {e}")
+
+    async def fail_stale_jobs(self) -> int:
+        """
+        Mark queued/running jobs as failed once they are older than stale_after.
+        The queue is in-memory, so such jobs belong to a worker that is gone;
+        jobs still waiting in this process's queue are left alone.
+        """
+        cutoff = datetime.utcnow() - timedelta(seconds=self.stale_after)
+        result = await self.db.export_jobs.update_many(
+            {
+                "id": {"$nin": list(self._waiters)},
+                "$or": [
+                    {"status": "queued", "created_at": {"$lt": cutoff}},
+                    {"status": "running", "started_at": {"$lt": cutoff}}
+                ]
+            },
+            {"$set": {
+                "status": "failed",
+                "error": "Export was interrupted, please try again",
+                "completed_at": datetime.utcnow()
+            }}
+        )
+        if result.modified_count:
+            self.stats["stale"] += result.modified_count
+            logger.warning(f"⚠️ Marked {result.modified_count} interrupted export jobs as failed")
+        return result.modified_count
+
+    async def sweep(self) -> int:
+        """Delete expired artifacts and any file in the artifact dir older than the TTL"""
+        await self.db.export_artifacts.delete_many({"expires_at": {"$lte": datetime.utcnow()}})
+
+        # Artifacts are never extended, so anything older than the TTL is dead
+        # (this also reclaims temp files left behind by a crashed render)
+        cutoff = time.time() - self.artifact_ttl - 60
+        removed = 0
+        for path in self.artifact_dir.iterdir():
+            try:
+                if path.is_file() and path.stat().st_mtime < cutoff:
+                    path.unlink()
+                    removed += 1
+            except FileNotFoundError:
+                continue
+
+        self.stats["swept"] += removed
+        if removed:
+            logger.info(f"🧹 Swept {removed} expired export artifacts")
+        return removed
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self.stats, "queue_depth": self._queue.qsize() if self._queue else 0}
+
+
+# Global export job service instance
+export_job_service = None
+
+async def init_export_job_service(db):
+    """Initialize export job service"""
+    global export_job_service
+    export_job_service = ExportJobService(db)
+    return export_job_service
+
+def get_export_job_service():
+    """Get export job service instance"""
+    return export_job_service
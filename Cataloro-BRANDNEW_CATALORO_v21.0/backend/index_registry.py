@@ -0,0 +1,403 @@
+"""
+Index Registry for Cataloro Marketplace
+Declarative index specs per collection, diffed against the live indexes so only missing ones are built,
+plus $indexStats usage reporting and explain() checks for the canonical query shapes
+"""
+
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from pymongo import IndexModel
+
+logger = logging.getLogger(__name__)
+
+IndexKey = Tuple[Tuple[str, Any], ...]
+
+
+@dataclass(frozen=True)
+class IndexSpec:
+    keys: IndexKey
+    unique: bool = False
+    sparse: bool = False
+    expire_after_seconds: Optional[int] = None
+
+    @property
+    def is_text(self) -> bool:
+        return any(direction == "text" for _, direction in self.keys)
+
+    def normalized_keys(self) -> IndexKey:
+        # Mongo reports text indexes as {_fts, _ftsx} plus weights; compare on the text fields instead
+        if self.is_text:
+            return tuple(sorted((name, "text") for name, direction in self.keys if direction == "text"))
+        return self.keys
+
+    def options(self) -> Dict[str, Any]:
+        return {"unique": self.unique, "sparse": self.sparse, "expire_after_seconds": self.expire_after_seconds}
+
+    def model(self) -> IndexModel:
+        kwargs: Dict[str, Any] = {}
+        if self.unique:
+            kwargs["unique"] = True
+        if self.sparse:
+            kwargs["sparse"] = True
+        if self.expire_after_seconds is not None:
+            kwargs["expireAfterSeconds"] = self.expire_after_seconds
+        return IndexModel(list(self.keys), **kwargs)
+
+    def describe(self) -> str:
+        return ", ".join(f"{name}:{direction}" for name, direction in self.keys)
+
+
+def index(*keys, unique: bool = False, sparse: bool = False, ttl: Optional[int] = None) -> IndexSpec:
+    """index("a", ("b", -1)) -> IndexSpec; bare field names are ascending"""
+    return IndexSpec(
+        keys=tuple(key if isinstance(key, tuple) else (key, 1) for key in keys),
+        unique=unique, sparse=sparse, expire_after_seconds=ttl
+    )
+
+
+# Every index the application relies on. Unique `id` indexes are sparse because
+# legacy documents may predate the field.
+INDEXES: Dict[str, List[IndexSpec]] = {
+    "users": [
+        index("id", unique=True, sparse=True),
+        index("email"),
+        index("username"),
+        index("user_role"),
+        index("created_at"),
+    ],
+    "listings": [
+        index("id", unique=True, sparse=True),
+        index(("created_at", -1)),
+        index("status", ("created_at", -1)),
+        index("status", ("views", -1)),
+        index("status", "price"),
+        index("category", "status"),
+        index("seller_id", ("created_at", -1)),
+        index("seller_id", "status", ("created_at", -1)),
+        index("search_tokens"),
+        index("status", "search_tokens"),
+        index(("title", "text"), ("description", "text")),
+    ],
+    "tenders": [
+        index("id", unique=True, sparse=True),
+        index("listing_id", "status", ("offer_amount", -1)),
+        index("seller_id", ("created_at", -1)),
+        index("buyer_id", "status"),
+        index("status"),
+    ],
+    "orders": [
+        index("id", unique=True, sparse=True),
+        index("buyer_id", "status"),
+        index("seller_id", "status"),
+        index("listing_id"),
+        index("status"),
+    ],
+    "reviews": [
+        index("id", unique=True),
+        # One index per REVIEW_SORTS family; ascending orders walk them in reverse
+        index("listing_id", ("created_at", -1), ("id", -1)),
+        index("listing_id", ("rating", -1), ("created_at", -1), ("id", -1)),
+        index("listing_id", ("helpful_count", -1), ("created_at", -1), ("id", -1)),
+    ],
+    "review_helpful": [
+        index("review_id", "user_id"),
+    ],
+    "user_favorites": [
+        index("user_id", ("created_at", -1)),
+        index("item_id"),
+    ],
+    "user_cart": [
+        index("user_id", "item_id"),
+    ],
+    "baskets": [
+        index("id", unique=True, sparse=True),
+        index("user_id", ("created_at", -1)),
+    ],
+    "item_assignments": [
+        index("item_id"),
+        index("basket_id"),
+    ],
+    "user_notifications": [
+        index("user_id", ("created_at", -1)),
+    ],
+    "notifications": [
+        index("user_id", ("created_at", -1)),
+    ],
+    "notification_counters": [
+        index("user_id", unique=True),
+    ],
+    "notification_views": [
+        index("user_id", "notification_id", unique=True),
+    ],
+    "system_notifications": [
+        index(("created_at", -1)),
+    ],
+    "user_messages": [
+        index("conversation_id", ("created_at", -1)),
+        index("sender_id", ("created_at", -1)),
+        index("recipient_id", ("created_at", -1)),
+    ],
+    "conversations": [
+        index("participants", ("updated_at", -1)),
+    ],
+    "offline_messages": [
+        index("expires_at", ttl=0),
+        index("user_id", "created_at"),
+    ],
+    "ads": [
+        index("id", unique=True, sparse=True),
+        index("is_active", ("created_at", -1)),
+    ],
+    "catalyst_data": [
+        index("cat_id"),
+    ],
+    "catalyst_price_overrides": [
+        index("catalyst_id"),
+    ],
+    "user_id_aliases": [
+        index("alias", unique=True),
+        index("user_id"),
+    ],
+    "export_jobs": [
+        index("id", unique=True),
+        index("expires_at", ttl=0),
+    ],
+    "export_artifacts": [
+        index("key", unique=True),
+        index("expires_at"),
+    ],
+    "migrations": [
+        index("name"),
+    ],
+}
+
+
+@dataclass
+class QueryShape:
+    """A query an endpoint issues, in the form explain() takes it"""
+    name: str
+    collection: str
+    filter: Dict[str, Any]
+    sort: List[Tuple[str, Any]] = field(default_factory=list)
+    limit: int = 50
+
+
+# Canonical shapes of the hot endpoint queries; each must be served by an index
+QUERY_SHAPES: List[QueryShape] = [
+    QueryShape("browse listings", "listings", {"status": "active"}, [("created_at", -1)]),
+    QueryShape("browse all listings", "listings", {}, [("created_at", -1)]),
+    QueryShape("popular listings", "listings", {"status": "active"}, [("views", -1)]),
+    QueryShape("listing by id", "listings", {"id": "listing-1"}, limit=1),
+    QueryShape("listings page by ids", "listings", {"id": {"$in": ["listing-1", "listing-2"]}}),
+    QueryShape("seller listings", "listings", {"seller_id": {"$in": ["user-1", "legacy-1"]}}, [("created_at", -1)]),
+    QueryShape(
+        "seller listings by status", "listings",
+        {"seller_id": {"$in": ["user-1", "legacy-1"]}, "status": "active"}, [("created_at", -1)]
+    ),
+    QueryShape("token search", "listings", {"status": "active", "search_tokens": {"$all": ["bmw"]}}),
+    QueryShape("highest bid", "tenders", {"listing_id": "listing-1", "status": "active"}, [("offer_amount", -1)], 1),
+    QueryShape("seller recent tenders", "tenders", {"seller_id": {"$in": ["user-1", "legacy-1"]}}, [("created_at", -1)], 10),
+    QueryShape("buyer active tenders", "tenders", {"buyer_id": "user-1", "status": "active"}),
+    QueryShape("tender by id", "tenders", {"id": "tender-1"}, limit=1),
+    QueryShape("user by id", "users", {"id": "user-1"}, limit=1),
+    QueryShape("user by email", "users", {"email": "user@example.com"}, limit=1),
+    QueryShape("order by id", "orders", {"id": "order-1"}, limit=1),
+    QueryShape("buyer orders", "orders", {"buyer_id": "user-1"}),
+    QueryShape("seller orders by status", "orders", {"seller_id": "user-1", "status": "pending"}),
+    QueryShape("listing reviews newest", "reviews", {"listing_id": "listing-1"}, [("created_at", -1), ("id", -1)], 21),
+    QueryShape("listing reviews highest", "reviews", {"listing_id": "listing-1"}, [("rating", -1), ("created_at", -1), ("id", -1)], 21),
+    QueryShape("user favorites", "user_favorites", {"user_id": "user-1"}, [("created_at", -1)], 200),
+    QueryShape("favorites of listing", "user_favorites", {"item_id": "listing-1"}),
+    QueryShape("user notifications", "user_notifications", {"user_id": "user-1"}, [("created_at", -1)]),
+    QueryShape("conversation messages", "user_messages", {"conversation_id": "c-1"}, [("created_at", -1)]),
+    QueryShape(
+        "user messages", "user_messages",
+        {"$or": [{"sender_id": "user-1"}, {"recipient_id": "user-1"}]}, [("created_at", 1)]
+    ),
+    QueryShape("user conversations", "conversations", {"participants": "user-1"}, [("updated_at", -1)]),
+    QueryShape("user baskets", "baskets", {"user_id": "user-1"}, [("created_at", -1)]),
+    QueryShape("active ads", "ads", {"is_active": True}, [("created_at", -1)]),
+    QueryShape("system notifications", "system_notifications", {}, [("created_at", -1)]),
+]
+
+# Plan stages that mean the query is not index-backed
+BAD_STAGES = {"COLLSCAN": "collection scan", "SORT": "in-memory sort"}
+
+
+def _live_keys(index_info: Dict[str, Any]) -> IndexKey:
+    key = dict(index_info["key"])
+    if "_fts" in key:
+        return tuple(sorted((name, "text") for name in index_info.get("weights", {})))
+    return tuple((name, direction if isinstance(direction, str) else int(direction)) for name, direction in key.items())
+
+
+def _live_options(index_info: Dict[str, Any]) -> Dict[str, Any]:
+    ttl = index_info.get("expireAfterSeconds")
+    return {
+        "unique": bool(index_info.get("unique", False)),
+        "sparse": bool(index_info.get("sparse", False)),
+        "expire_after_seconds": int(ttl) if ttl is not None else None
+    }
+
+
+def _plan_stages(plan: Any) -> Iterable[str]:
+    """Every stage name in an explain() plan tree, whichever engine produced it"""
+    if isinstance(plan, dict):
+        if isinstance(plan.get("stage"), str):
+            yield plan["stage"]
+        for value in plan.values():
+            yield from _plan_stages(value)
+    elif isinstance(plan, list):
+        for item in plan:
+            yield from _plan_stages(item)
+
+
+class IndexRegistry:
+    """
+    Reconciles INDEXES with the database. A sync lists each collection's
+    indexes once and builds only the specs that are missing; indexes whose key
+    matches but whose options differ are reported, never dropped, and live
+    indexes that are not registered are reported as unregistered.
+    """
+
+    def __init__(self, db, specs: Dict[str, List[IndexSpec]] = None):
+        self.db = db
+        self.specs = specs or INDEXES
+        self.last_sync: Optional[Dict[str, Any]] = None
+
+    async def diff_collection(self, collection: str) -> Dict[str, Any]:
+        live = await self.db[collection].list_indexes().to_list(length=None)
+        live_by_key = {_live_keys(info): info for info in live if info["name"] != "_id_"}
+
+        missing, conflicting = [], []
+        registered_keys = set()
+        for spec in self.specs.get(collection, []):
+            keys = spec.normalized_keys()
+            registered_keys.add(keys)
+            info = live_by_key.get(keys)
+            if info is None:
+                missing.append(spec)
+            elif _live_options(info) != spec.options():
+                conflicting.append({"name": info["name"], "expected": spec.options(), "actual": _live_options(info)})
+
+        unregistered = [info["name"] for keys, info in live_by_key.items() if keys not in registered_keys]
+        return {"missing": missing, "conflicting": conflicting, "unregistered": unregistered}
+
+    async def sync_collection(self, collection: str) -> Dict[str, Any]:
+        diff = await self.diff_collection(collection)
+        created, failed = [], []
+        # One build at a time per collection so a failing unique index cannot take the others with it
+        for spec in diff["missing"]:
+            try:
+                names = await self.db[collection].create_indexes([spec.model()])
+                created.extend(names)
+            except Exception as e:
+                failed.append({"index": spec.describe(), "error": str(e)})
+                logger.warning(f"⚠️ Index {collection}({spec.describe()}) not built: {e}")
+
+        for conflict in diff["conflicting"]:
+            logger.warning(f"⚠️ Index {collection}.{conflict['name']} differs from the registry: {conflict}")
+
+        return {
+            "created": created,
+            "failed": failed,
+            "conflicting": diff["conflicting"],
+            "unregistered": diff["unregistered"]
+        }
+
+    async def sync(self, collections: Iterable[str] = None) -> Dict[str, Any]:
+        """Build the missing indexes of the given (default: all) collections concurrently"""
+        names = list(collections or self.specs)
+        results = await asyncio.gather(*(self.sync_collection(name) for name in names), return_exceptions=True)
+
+        report = {}
+        for name, result in zip(names, results):
+            report[name] = {"error": str(result)} if isinstance(result, Exception) else result
+
+        created = sum(len(r.get("created", [])) for r in report.values())
+        if collections is None:
+            self.last_sync = {"completed_at": datetime.utcnow().isoformat(), "collections": report}
+        logger.info(f"🗂️ Index sync: {created} built across {len(names)} collections")
+        return report
+
+    async def diff(self) -> Dict[str, Any]:
+        """Dry run: what a sync would build, plus conflicts and unregistered indexes"""
+        report = {}
+        for name in self.specs:
+            result = await self.diff_collection(name)
+            report[name] = {**result, "missing": [spec.describe() for spec in result["missing"]]}
+        return report
+
+    async def usage_report(self, min_age_hours: int = 24) -> Dict[str, Any]:
+        """
+        Indexes with no recorded accesses per $indexStats. Counters reset on
+        restart, so an index is only flagged once its stats are older than
+        min_age_hours. Unique and TTL indexes are kept out of the unused list
+        since they serve writes and expiry rather than reads.
+        """
+        cutoff = datetime.utcnow() - timedelta(hours=min_age_hours)
+        collections = await self.db.list_collection_names()
+        report: Dict[str, Any] = {"unused": [], "collections": {}}
+
+        for collection in sorted(collections):
+            try:
+                stats = await self.db[collection].aggregate([{"$indexStats": {}}]).to_list(length=None)
+            except Exception as e:
+                report["collections"][collection] = {"error": str(e)}
+                continue
+
+            entries = []
+            for stat in stats:
+                spec = stat.get("spec", {})
+                ops = int(stat.get("accesses", {}).get("ops", 0))
+                since = stat.get("accesses", {}).get("since")
+                entries.append({"name": stat["name"], "ops": ops, "since": since.isoformat() if since else None})
+
+                exempt = stat["name"] == "_id_" or spec.get("unique") or "expireAfterSeconds" in spec
+                if not exempt and ops == 0 and since and since.replace(tzinfo=None) < cutoff:
+                    report["unused"].append({"collection": collection, "name": stat["name"], "since": since.isoformat()})
+            report["collections"][collection] = sorted(entries, key=lambda entry: entry["ops"])
+
+        return report
+
+    async def check_query_plans(self, shapes: List[QueryShape] = None) -> List[Dict[str, Any]]:
+        """explain() every canonical query shape; a shape fails on COLLSCAN or an in-memory SORT"""
+        results = []
+        for shape in shapes or QUERY_SHAPES:
+            command = {"find": shape.collection, "filter": shape.filter, "limit": shape.limit}
+            if shape.sort:
+                command["sort"] = dict(shape.sort)
+            explain = await self.db.command("explain", command, verbosity="queryPlanner")
+            stages = set(_plan_stages(explain.get("queryPlanner", {}).get("winningPlan", {})))
+            problems = [description for stage, description in BAD_STAGES.items() if stage in stages]
+            results.append({
+                "name": shape.name,
+                "collection": shape.collection,
+                "ok": not problems,
+                "problems": problems,
+                "stages": sorted(stages)
+            })
+        return results
+
+
+async def ensure_collection_indexes(db, *collections: str) -> Dict[str, Any]:
+    """Build the registry's missing indexes for the given collections"""
+    return await IndexRegistry(db).sync(collections)
+
+
+# Global index registry instance
+index_registry = None
+
+async def init_index_registry(db):
+    """Initialize index registry"""
+    global index_registry
+    index_registry = IndexRegistry(db)
+    return index_registry
+
+def get_index_registry():
+    """Get index registry instance"""
+    return index_registry
@@ -0,0 +1,277 @@
+"""
+LLM Gateway Service for Cataloro Marketplace
+Response caching, request coalescing and concurrency limiting for LLM-backed endpoints
+"""
+
+import asyncio
+import logging
+import os
+import re
+import time
+import uuid
+from collections import OrderedDict, deque
+from typing import Any, Awaitable, Callable, Dict, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SYSTEM_MESSAGE = (
+    "You are an AI assistant specialized in catalyst marketplace search. Help users find chemical "
+    "catalysts by understanding their chemical needs, reaction types, and process requirements. "
+    "Focus on catalyst properties like selectivity, activity, stability, and application areas. "
+    "Be precise and technically relevant."
+)
+
+PromptSource = Union[str, Callable[[], Awaitable[str]]]
+
+
+class ResponseCache:
+    """In-process LRU cache with a per-entry TTL"""
+
+    def __init__(self, max_entries: int = 512, ttl: float = 900):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: str):
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> int:
+        count = len(self._entries)
+        self._entries.clear()
+        return count
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class EmergentLLMClient:
+    """Adapter around emergentintegrations LlmChat"""
+
+    def __init__(self, system_message: str = DEFAULT_SYSTEM_MESSAGE, session_id: str = "catalyst_search"):
+        # Imported lazily so the gateway can run offline with the stub client
+        from emergentintegrations.llm.chat import LlmChat, UserMessage
+
+        api_key = os.environ.get('EMERGENT_LLM_KEY')
+        if not api_key:
+            raise RuntimeError("AI service not configured")
+
+        self._message_class = UserMessage
+        self._chat = LlmChat(
+            api_key=api_key,
+            session_id=session_id,
+            system_message=system_message
+        ).with_model("openai", "gpt-4o-mini")
+
+    async def complete(self, prompt: str) -> str:
+        return await self._chat.send_message(self._message_class(text=prompt))
+
+
+class StubLLMClient:
+    """Offline stand-in for the LLM used by tests and benchmarks"""
+
+    def __init__(self, responder: Callable[[str], str] = None, latency: float = 0.0):
+        self.responder = responder or (lambda prompt: "{}")
+        self.latency = latency
+        self.calls = 0
+
+    async def complete(self, prompt: str) -> str:
+        self.calls += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self.responder(prompt)
+
+
+class LLMGatewayService:
+    def __init__(
+        self,
+        client_factory: Callable[[], Any] = None,
+        cache_size: int = None,
+        cache_ttl: float = None,
+        max_concurrency: int = None,
+        timeout: float = None
+    ):
+        self.cache = ResponseCache(
+            max_entries=cache_size or int(os.environ.get('LLM_GATEWAY_CACHE_SIZE', 512)),
+            ttl=cache_ttl or float(os.environ.get('LLM_GATEWAY_CACHE_TTL', 900))
+        )
+        self.max_concurrency = max_concurrency or int(os.environ.get('LLM_GATEWAY_MAX_CONCURRENCY', 4))
+        self.timeout = timeout or float(os.environ.get('LLM_GATEWAY_TIMEOUT', 8.0))
+
+        self._client_factory = client_factory or self._default_client_factory()
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._active_calls = 0
+        self._latencies = deque(maxlen=200)
+
+        self.stats = {
+            "cache_hits": 0,
+            "cache_misses": 0,
+            "coalesced": 0,
+            "upstream_calls": 0,
+            "timeouts": 0,
+            "errors": 0
+        }
+
+    @staticmethod
+    def _default_client_factory() -> Callable[[], Any]:
+        """Select the upstream client from LLM_GATEWAY_BACKEND (emergent or stub)"""
+        if os.environ.get('LLM_GATEWAY_BACKEND', 'emergent').lower() == 'stub':
+            stub = StubLLMClient(latency=float(os.environ.get('LLM_STUB_LATENCY', 0.05)))
+            return lambda: stub
+
+        # A fresh LlmChat per upstream call: the chat object keeps its message history,
+        # so a shared instance would leak prompts between users and grow every request
+        return lambda: EmergentLLMClient(session_id=f"catalyst_search_{uuid.uuid4().hex}")
+
+    def set_client_factory(self, client_factory: Callable[[], Any]):
+        """Swap the upstream client (e.g. a StubLLMClient in tests)"""
+        self._client_factory = client_factory
+        self.cache.clear()
+
+    @staticmethod
+    def normalize_query(text: str) -> str:
+        """Lowercase and collapse whitespace/punctuation so equivalent queries share a cache entry"""
+        if not text:
+            return ""
+        return re.sub(r"[^\w]+", " ", text.lower()).strip()
+
+    async def complete(self, namespace: str, prompt: PromptSource, key: str = None) -> Optional[str]:
+        """
+        Return the model response for a prompt, or None when the model is unavailable,
+        times out or errors - callers then use their local fallback path.
+
+        `prompt` may be a coroutine function so the (possibly DB-backed) prompt is only
+        built on a cache miss; in that case an explicit `key` is required.
+        """
+        if key is None:
+            if callable(prompt):
+                raise ValueError("An explicit cache key is required for lazily built prompts")
+            key = self.normalize_query(prompt)
+        cache_key = f"{namespace}:{key}"
+
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            self.stats["cache_hits"] += 1
+            return cached
+
+        # Single-flight: identical in-flight prompts share one upstream call
+        inflight = self._inflight.get(cache_key)
+        if inflight is not None:
+            self.stats["coalesced"] += 1
+            return await asyncio.shield(inflight)
+
+        self.stats["cache_misses"] += 1
+        task = asyncio.ensure_future(self._fetch(cache_key, prompt))
+        self._inflight[cache_key] = task
+        task.add_done_callback(lambda _: self._inflight.pop(cache_key, None))
+
+        # Shielded so a disconnecting client does not cancel the shared call
+        return await asyncio.shield(task)
+
+    async def _fetch(self, cache_key: str, prompt: PromptSource) -> Optional[str]:
+        """Run one upstream call under the hard timeout, caching successful responses"""
+        start_time = time.monotonic()
+        try:
+            response = await asyncio.wait_for(self._invoke(prompt), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            self.stats["timeouts"] += 1
+            logger.warning(f"LLM gateway timeout after {self.timeout}s for {cache_key.split(':', 1)[0]}")
+            return None
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.warning(f"LLM gateway upstream error: {e}")
+            return None
+        finally:
+            self._latencies.append((time.monotonic() - start_time) * 1000)
+
+        if response:
+            response = response.strip()
+            self.cache.set(cache_key, response)
+        return response or None
+
+    async def _invoke(self, prompt: PromptSource) -> str:
+        prompt_text = await prompt() if callable(prompt) else prompt
+
+        async with self._semaphore:
+            self._active_calls += 1
+            self.stats["upstream_calls"] += 1
+            try:
+                client = self._client_factory()
+                return await client.complete(prompt_text.strip())
+            finally:
+                self._active_calls -= 1
+
+    def clear_cache(self) -> int:
+        """Drop all cached responses"""
+        return self.cache.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get gateway cache and upstream statistics"""
+        lookups = self.stats["cache_hits"] + self.stats["cache_misses"] + self.stats["coalesced"]
+        latencies = sorted(self._latencies)
+
+        return {
+            **self.stats,
+            "hit_rate": round(self.stats["cache_hits"] / lookups, 3) if lookups else 0.0,
+            "cached_entries": len(self.cache),
+            "inflight": len(self._inflight),
+            "active_calls": self._active_calls,
+            "max_concurrency": self.max_concurrency,
+            "timeout_seconds": self.timeout,
+            "upstream_p50_ms": round(latencies[len(latencies) // 2], 2) if latencies else 0,
+            "upstream_p95_ms": round(latencies[int(len(latencies) * 0.95) - 1], 2) if latencies else 0
+        }
+
+
+# Global LLM gateway instance
+llm_gateway_service = LLMGatewayService()
+
+def get_llm_gateway_service() -> LLMGatewayService:
+    """Get LLM gateway instance"""
+    return llm_gateway_service
+
+
+async def self_check():
+    """Offline check of caching, single-flight and the timeout against StubLLMClient"""
+    stub = StubLLMClient(responder=lambda prompt: f"echo {prompt}", latency=0.05)
+    gateway = LLMGatewayService(client_factory=lambda: stub, timeout=1.0)
+
+    # Identical prompts in flight share one upstream call
+    results = await asyncio.gather(*(gateway.complete("search", "Platinum catalyst") for _ in range(10)))
+    assert stub.calls == 1, f"expected 1 upstream call, got {stub.calls}"
+    assert set(results) == {"echo Platinum catalyst"}
+    assert gateway.stats["coalesced"] == 9
+
+    # A cache hit (same normalized query) skips the upstream call
+    assert await gateway.complete("search", "  platinum   CATALYST? ") == "echo Platinum catalyst"
+    assert stub.calls == 1 and gateway.stats["cache_hits"] == 1
+
+    # An upstream call slower than the hard timeout returns None (local fallback)
+    slow = StubLLMClient(latency=0.5)
+    gateway.set_client_factory(lambda: slow)
+    gateway.timeout = 0.05
+    assert await gateway.complete("search", "rhodium") is None
+    assert gateway.stats["timeouts"] == 1
+
+    return gateway.get_stats()
+
+
+if __name__ == "__main__":
+    # python llm_gateway_service.py
+    print(asyncio.run(self_check()))
@@ -0,0 +1,128 @@
+"""
+Menu Snapshot Service for Cataloro Marketplace
+Precompiled per-role menu payloads with content-hash ETags
+"""
+
+import copy
+import hashlib
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+MENU_ROLES = ("admin", "manager", "seller", "buyer")
+
+
+def resolve_menu_role(user: Dict[str, Any]) -> str:
+    """Map a user's role / RBAC role to the role used in menu settings"""
+    user_role = user.get("role", "buyer")
+    user_rbac_role = user.get("user_role", "")
+
+    if user_role == "admin" or user_rbac_role in ["Admin", "Admin-Manager"]:
+        return "admin"
+    elif user_rbac_role == "Admin-Manager":
+        return "manager"
+    elif user_rbac_role in ["User-Seller"]:
+        return "seller"
+    elif user_rbac_role in ["User-Buyer"]:
+        return "buyer"
+    # Default fallback based on user role
+    return user_role if user_role in MENU_ROLES else "buyer"
+
+
+def filter_menu_for_role(menu_settings: Optional[Dict[str, Any]], menu_role: str) -> Dict[str, Any]:
+    """Build the menu payload a role sees (enabled items that list the role, custom items included)"""
+    if not menu_settings:
+        return {
+            "desktop_menu": {},
+            "mobile_menu": {},
+            "user_role": menu_role
+        }
+
+    filtered = {}
+    for menu_key in ("desktop_menu", "mobile_menu"):
+        menu = menu_settings.get(menu_key, {})
+        items = {
+            item_key: item_config
+            for item_key, item_config in menu.items()
+            if item_key != "custom_items"
+            and item_config.get("enabled", True) and menu_role in item_config.get("roles", [])
+        }
+        custom_items = [
+            custom_item for custom_item in menu.get("custom_items", [])
+            if custom_item.get("enabled", True) and menu_role in custom_item.get("roles", [])
+        ]
+        if custom_items:
+            items["custom_items"] = custom_items
+        filtered[menu_key] = items
+
+    return {
+        "desktop_menu": filtered["desktop_menu"],
+        "mobile_menu": filtered["mobile_menu"],
+        "user_role": menu_role
+    }
+
+
+def compute_etag(payload: Dict[str, Any]) -> str:
+    encoded = json.dumps(payload, sort_keys=True, default=str).encode("utf-8")
+    return '"' + hashlib.sha256(encoded).hexdigest()[:32] + '"'
+
+
+class MenuSnapshotService:
+    """
+    Holds one filtered menu payload and ETag per role, compiled from the single
+    menu_config document. Rebuilt after update_menu_settings writes; the TTL
+    picks up writes handled by other workers.
+    """
+
+    def __init__(self, db, ttl: float = None):
+        self.db = db
+        self.ttl = ttl if ttl is not None else float(os.environ.get('MENU_SNAPSHOT_TTL', 60))
+        self._snapshots: Dict[str, Tuple[str, Dict[str, Any]]] = {}
+        self._built_at = 0.0
+        self.stats = {"builds": 0, "hits": 0, "not_modified": 0}
+
+    async def rebuild(self, menu_settings: Optional[Dict[str, Any]] = None):
+        """Compile every role's menu from menu_settings (or the stored document)"""
+        if menu_settings is None:
+            menu_settings = await self.db.menu_settings.find_one({"type": "menu_config"}, {"_id": 0})
+
+        snapshots = {}
+        for role in MENU_ROLES:
+            payload = filter_menu_for_role(copy.deepcopy(menu_settings), role)
+            snapshots[role] = (compute_etag(payload), payload)
+
+        self._snapshots = snapshots
+        self._built_at = time.monotonic()
+        self.stats["builds"] += 1
+
+    async def get(self, menu_role: str) -> Tuple[str, Dict[str, Any]]:
+        """(etag, payload) for a role"""
+        if not self._snapshots or time.monotonic() - self._built_at > self.ttl:
+            await self.rebuild()
+        self.stats["hits"] += 1
+        return self._snapshots.get(menu_role) or self._snapshots["buyer"]
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "roles": {role: etag for role, (etag, _) in self._snapshots.items()},
+            "age_seconds": round(time.monotonic() - self._built_at, 1) if self._snapshots else None
+        }
+
+
+# Global menu snapshot service instance
+menu_snapshot_service = None
+
+async def init_menu_snapshot_service(db):
+    """Initialize menu snapshot service"""
+    global menu_snapshot_service
+    menu_snapshot_service = MenuSnapshotService(db)
+    return menu_snapshot_service
+
+def get_menu_snapshot_service():
+    """Get menu snapshot service instance"""
+    return menu_snapshot_service
@@ -4,16 +4,25 @@ Implements comprehensive application monitoring, performance tracking, and alert
 """
 
 import asyncio
+import bisect
 import logging
 import os
 import psutil
 import time
+from contextvars import ContextVar
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any
-from collections import defaultdict, deque
+from typing import Dict, List, Optional, Any, Tuple
+from collections import Counter, defaultdict, deque
 
 logger = logging.getLogger(__name__)
 
+# Upper bounds (ms) of the database latency histogram buckets; the last bucket is unbounded
+DB_LATENCY_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000)
+DB_OTHER_SHAPE = "(other)"
+
+# Route and per-shape call counts of the request currently being served
+_request_db_profile: ContextVar[Optional[Dict[str, Any]]] = ContextVar("request_db_profile", default=None)
+
 class MonitoringService:
     def __init__(self):
         # Performance metrics storage
@@ -36,6 +45,12 @@ class MonitoringService:
             "disk_usage": 90        # 90%
         }
         
+        # Database operation metrics keyed by (collection, operation, query shape)
+        self.db_operations: Dict[Tuple[str, str, str], Dict[str, Any]] = {}
+        self.db_max_shapes = int(os.environ.get('DB_MAX_QUERY_SHAPES', 2000))
+        self.db_slow_query_ms = float(os.environ.get('DB_SLOW_QUERY_MS', 100))
+        self.db_slow_queries = deque(maxlen=int(os.environ.get('DB_SLOW_LOG_SIZE', 200)))
+        
         # Monitoring state
         self.monitoring_enabled = True
         self.start_time = datetime.utcnow()
@@ -98,6 +113,121 @@ class MonitoringService:
         except Exception as e:
             logger.error(f"Failed to record request metrics: {e}")
     
+    def record_database_operation(self, collection: str, operation: str, shape: str, duration_ms: float):
+        """Record one database operation (called by the instrumented database wrapper)"""
+        try:
+            key = (collection, operation, shape)
+            stats = self.db_operations.get(key)
+            if stats is None:
+                if len(self.db_operations) >= self.db_max_shapes:
+                    # Bound memory when shapes are unexpectedly unique
+                    key = (collection, operation, DB_OTHER_SHAPE)
+                    stats = self.db_operations.get(key)
+                if stats is None:
+                    stats = self.db_operations[key] = {
+                        "count": 0, "total_ms": 0.0, "max_ms": 0.0,
+                        "histogram": [0] * (len(DB_LATENCY_BUCKETS_MS) + 1),
+                        "requests": 0, "request_calls": 0, "max_per_request": 0, "max_per_request_route": None
+                    }
+            
+            stats["count"] += 1
+            stats["total_ms"] += duration_ms
+            stats["max_ms"] = max(stats["max_ms"], duration_ms)
+            stats["histogram"][bisect.bisect_left(DB_LATENCY_BUCKETS_MS, duration_ms)] += 1
+            
+            profile = _request_db_profile.get()
+            if profile is not None:
+                profile["operations"][key] += 1
+            
+            if duration_ms >= self.db_slow_query_ms:
+                self.db_slow_queries.append({
+                    "timestamp": datetime.utcnow().isoformat(),
+                    "collection": collection,
+                    "operation": operation,
+                    "shape": shape,
+                    "duration_ms": round(duration_ms, 2),
+                    "route": profile["route"] if profile is not None else None
+                })
+        except Exception as e:
+            logger.error(f"Failed to record database operation: {e}")
+    
+    def begin_request_profile(self, route: str):
+        """Start counting database operations for the current request"""
+        return _request_db_profile.set({"route": route, "operations": Counter()})
+    
+    def end_request_profile(self, token, route: str = None):
+        """Fold the current request's per-shape call counts into the shape statistics"""
+        profile = _request_db_profile.get()
+        _request_db_profile.reset(token)
+        if not profile:
+            return
+        route = route or profile["route"]
+        for key, calls in profile["operations"].items():
+            stats = self.db_operations.get(key)
+            if stats is None:
+                continue
+            stats["requests"] += 1
+            stats["request_calls"] += calls
+            if calls > stats["max_per_request"]:
+                stats["max_per_request"] = calls
+                stats["max_per_request_route"] = route
+    
+    @staticmethod
+    def _histogram_percentile(histogram: List[int], fraction: float) -> Optional[float]:
+        """Upper bound of the bucket holding the given fraction of operations (None = above the last bound)"""
+        target = sum(histogram) * fraction
+        seen = 0
+        for index, count in enumerate(histogram):
+            seen += count
+            if count and seen >= target:
+                return DB_LATENCY_BUCKETS_MS[index] if index < len(DB_LATENCY_BUCKETS_MS) else None
+        return None
+    
+    def _format_database_shape(self, key: Tuple[str, str, str], stats: Dict[str, Any]) -> Dict[str, Any]:
+        collection, operation, shape = key
+        labels = [f"<={bound}ms" for bound in DB_LATENCY_BUCKETS_MS] + [f">{DB_LATENCY_BUCKETS_MS[-1]}ms"]
+        return {
+            "collection": collection,
+            "operation": operation,
+            "shape": shape,
+            "count": stats["count"],
+            "total_ms": round(stats["total_ms"], 2),
+            "avg_ms": round(stats["total_ms"] / stats["count"], 2),
+            "max_ms": round(stats["max_ms"], 2),
+            "p50_ms": self._histogram_percentile(stats["histogram"], 0.5),
+            "p95_ms": self._histogram_percentile(stats["histogram"], 0.95),
+            "histogram": {label: count for label, count in zip(labels, stats["histogram"]) if count},
+            "requests": stats["requests"],
+            "avg_per_request": round(stats["request_calls"] / stats["requests"], 2) if stats["requests"] else None,
+            "max_per_request": stats["max_per_request"],
+            "max_per_request_route": stats["max_per_request_route"]
+        }
+    
+    def get_database_summary(self, limit: int = 20) -> Dict[str, Any]:
+        """Database time by query shape, likely N+1 shapes and the slow-query log"""
+        shapes = [(key, stats) for key, stats in self.db_operations.items() if stats["count"]]
+        by_time = sorted(shapes, key=lambda item: item[1]["total_ms"], reverse=True)[:limit]
+        # A shape issued many times within single requests is the signature of an N+1 loop
+        by_fanout = sorted(
+            (item for item in shapes if item[1]["max_per_request"] > 1),
+            key=lambda item: (item[1]["max_per_request"], item[1]["request_calls"]), reverse=True
+        )[:limit]
+        
+        return {
+            "total_operations": sum(stats["count"] for _, stats in shapes),
+            "total_time_ms": round(sum(stats["total_ms"] for _, stats in shapes), 2),
+            "tracked_shapes": len(shapes),
+            "slow_query_threshold_ms": self.db_slow_query_ms,
+            "top_by_total_time": [self._format_database_shape(key, stats) for key, stats in by_time],
+            "top_by_calls_per_request": [self._format_database_shape(key, stats) for key, stats in by_fanout],
+            "slow_queries": list(reversed(self.db_slow_queries))[:limit]
+        }
+    
+    def reset_database_metrics(self):
+        """Clear database shape statistics and the slow-query log"""
+        self.db_operations.clear()
+        self.db_slow_queries.clear()
+    
     async def _collect_system_metrics(self):
         """Collect system performance metrics"""
         try:
@@ -369,6 +499,7 @@ class MonitoringService:
             "system_health": self.get_system_health_status(),
             "performance_metrics": self.get_performance_metrics(),
             "recent_alerts": self.get_recent_alerts(10),
+            "database": self.get_database_summary(10),
             "uptime": {
                 "start_time": self.start_time.isoformat(),
                 "uptime_seconds": (datetime.utcnow() - self.start_time).total_seconds(),
@@ -412,16 +543,22 @@ class MonitoringMiddleware:
                     response_status = message["status"]
                 await send(message)
             
-            # Process request
-            await self.app(scope, receive, send_wrapper)
+            path = scope.get("path", "unknown")
+            method = scope.get("method", "unknown")
+            
+            # Process request, attributing its database operations to this route
+            token = monitoring_service.begin_request_profile(f"{method} {path}")
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                # Routing has filled in the matched route, e.g. /api/listings/{listing_id}
+                route_path = getattr(scope.get("route"), "path", path)
+                monitoring_service.end_request_profile(token, f"{method} {route_path}")
             
             # Record metrics
             end_time = time.time()
             response_time = (end_time - start_time) * 1000  # Convert to milliseconds
             
-            path = scope.get("path", "unknown")
-            method = scope.get("method", "unknown")
-            
             monitoring_service.record_request(
                 endpoint=path,
                 method=method,
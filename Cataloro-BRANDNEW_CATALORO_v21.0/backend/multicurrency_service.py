@@ -7,13 +7,80 @@ import asyncio
 import json
 import logging
 import requests
+from collections import OrderedDict
+from dataclasses import dataclass
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any
+from types import MappingProxyType
+from typing import Dict, List, Mapping, Optional, Any, Sequence, Tuple
 from decimal import Decimal, ROUND_HALF_UP
 import aiofiles
 
 logger = logging.getLogger(__name__)
 
+# Currencies whose symbol is written before the amount
+PREFIX_SYMBOL_CURRENCIES = {"USD", "GBP", "CAD", "AUD", "JPY"}
+
+def format_amount(amount: float, currency_code: str, currencies: Mapping[str, Dict]) -> str:
+    """Format amount with currency symbol and proper decimals"""
+    currency_info = currencies.get(currency_code.upper())
+    if not currency_info:
+        return f"{amount:.2f} {currency_code}"
+    
+    formatted_amount = f"{amount:.{currency_info['decimal_places']}f}"
+    
+    # Different positioning for different currencies
+    if currency_code in PREFIX_SYMBOL_CURRENCIES:
+        return f"{currency_info['symbol']}{formatted_amount}"
+    return f"{formatted_amount} {currency_info['symbol']}"
+
+@dataclass(frozen=True)
+class RateSnapshot:
+    """Immutable view of the exchange rates, loaded once per request"""
+    version: int
+    base_currency: str
+    rates: Mapping[str, float]
+    currencies: Mapping[str, Dict]
+    fetched_at: datetime
+    source: str  # api, database or fallback
+    
+    def rate(self, from_currency: str, to_currency: str) -> float:
+        """Exchange rate between two currencies, converting via the base currency"""
+        if from_currency == to_currency:
+            return 1.0
+        to_base_rate = 1.0 if from_currency == self.base_currency else 1.0 / self.rates.get(from_currency, 1.0)
+        to_target_rate = 1.0 if to_currency == self.base_currency else self.rates.get(to_currency, 1.0)
+        return to_base_rate * to_target_rate
+    
+    def decimal_places(self, currency_code: str) -> int:
+        return self.currencies.get(currency_code, {}).get("decimal_places", 2)
+    
+    def convert(self, amount: float, from_currency: str, to_currency: str) -> float:
+        return round(amount * self.rate(from_currency, to_currency), self.decimal_places(to_currency))
+    
+    def format(self, amount: float, currency_code: str) -> str:
+        return format_amount(amount, currency_code, self.currencies)
+    
+    def convert_many(
+        self,
+        amounts: Sequence[Optional[float]],
+        from_currency: str,
+        to_currency: str
+    ) -> Tuple[float, List[Optional[float]], List[Optional[str]]]:
+        """Convert and format a whole page of prices with a single rate lookup"""
+        rate = self.rate(from_currency, to_currency)
+        places = self.decimal_places(to_currency)
+        converted = []
+        formatted = []
+        for amount in amounts:
+            if amount is None:
+                converted.append(None)
+                formatted.append(None)
+                continue
+            value = round(float(amount) * rate, places)
+            converted.append(value)
+            formatted.append(format_amount(value, to_currency, self.currencies))
+        return rate, converted, formatted
+
 class MultiCurrencyService:
     def __init__(self, db):
         self.db = db
@@ -39,6 +106,14 @@ class MultiCurrencyService:
         self.exchange_rates = {}
         self.rates_last_updated = None
         self.rates_cache_duration = 3600  # 1 hour
+        self.rates_retry_interval = 300  # 5 minutes after a failed refresh
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._snapshot_version = 0
+        
+        # Per-user preferred currency cache (session length)
+        self._preference_cache: "OrderedDict[str, Tuple[datetime, str]]" = OrderedDict()
+        self.preference_cache_ttl = 1800  # 30 minutes
+        self.preference_cache_size = 10000
         
         # Fallback rates for when API is unavailable
         self.fallback_rates = {
@@ -53,45 +128,114 @@ class MultiCurrencyService:
             "DKK": 7.45
         }
         
+        # Start from fallback rates until persisted or live rates are loaded
+        fallback = self.fallback_rates.copy()
+        fallback[self.base_currency] = 1.0
+        self.snapshot = self._build_snapshot(fallback, "fallback", None)
+        
         logger.info("✅ Multi-currency service initialized")
     
-    async def get_exchange_rates(self, force_refresh: bool = False) -> Dict[str, float]:
-        """Get current exchange rates"""
+    def _build_snapshot(self, rates: Dict[str, float], source: str, fetched_at: Optional[datetime]) -> RateSnapshot:
+        """Create a new immutable snapshot and mirror it into the legacy attributes"""
+        self._snapshot_version += 1
+        self.exchange_rates = dict(rates)
+        self.rates_last_updated = fetched_at
+        return RateSnapshot(
+            version=self._snapshot_version,
+            base_currency=self.base_currency,
+            rates=MappingProxyType(dict(rates)),
+            currencies=MappingProxyType(self.supported_currencies),
+            fetched_at=fetched_at or datetime.utcnow(),
+            source=source
+        )
+    
+    def get_rate_snapshot(self) -> RateSnapshot:
+        """Current rate snapshot - never blocks on the network"""
+        return self.snapshot
+    
+    async def load_persisted_rates(self) -> bool:
+        """Warm start from the exchange_rates collection"""
         try:
-            # Check if cache is still valid
-            if (not force_refresh and 
-                self.rates_last_updated and 
-                self.exchange_rates and
-                datetime.utcnow() - self.rates_last_updated < timedelta(seconds=self.rates_cache_duration)):
-                return self.exchange_rates
-            
-            # Try to fetch from external API (using free service)
-            rates = await self._fetch_rates_from_api()
-            
-            if rates:
-                self.exchange_rates = rates
-                self.rates_last_updated = datetime.utcnow()
-                
-                # Store in database for persistence
-                await self._store_exchange_rates(rates)
-            else:
-                # Use fallback rates or cached rates
-                if self.exchange_rates:
-                    logger.warning("Using cached exchange rates due to API failure")
+            document = await self.db.exchange_rates.find_one({"base_currency": self.base_currency})
+            if not document or not document.get("rates"):
+                return False
+            
+            rates = {code: float(rate) for code, rate in document["rates"].items()}
+            rates[self.base_currency] = 1.0
+            updated_at = document.get("updated_at")
+            fetched_at = datetime.fromisoformat(updated_at) if updated_at else None
+            
+            self.snapshot = self._build_snapshot(rates, "database", fetched_at)
+            logger.info(f"📊 Loaded persisted exchange rates ({len(rates)} currencies)")
+            return True
+            
+        except Exception as e:
+            logger.error(f"Failed to load persisted exchange rates: {e}")
+            return False
+    
+    def _rates_are_fresh(self) -> bool:
+        return bool(
+            self.rates_last_updated and
+            datetime.utcnow() - self.rates_last_updated < timedelta(seconds=self.rates_cache_duration)
+        )
+    
+    async def refresh_rates(self) -> bool:
+        """Fetch live rates, persist them and swap in a new snapshot"""
+        rates = await self._fetch_rates_from_api()
+        if not rates:
+            logger.warning(f"Exchange rate refresh failed - keeping {self.snapshot.source} rates")
+            return False
+        
+        rates[self.base_currency] = 1.0
+        self.snapshot = self._build_snapshot(rates, "api", datetime.utcnow())
+        
+        # Store in database for persistence
+        await self._store_exchange_rates(rates)
+        return True
+    
+    async def _rate_refresh_loop(self):
+        """Background refresher so request paths never wait on the rates API"""
+        while True:
+            try:
+                if self._rates_are_fresh():
+                    # Warm-started rates: refresh when they expire, not a full period later
+                    expires_at = self.rates_last_updated + timedelta(seconds=self.rates_cache_duration)
+                    delay = max(0, (expires_at - datetime.utcnow()).total_seconds())
+                elif await self.refresh_rates():
+                    delay = self.rates_cache_duration
                 else:
-                    logger.warning("Using fallback exchange rates")
-                    self.exchange_rates = self.fallback_rates.copy()
-                    self.exchange_rates[self.base_currency] = 1.0
+                    delay = self.rates_retry_interval
+            except Exception as e:
+                logger.error(f"Exchange rate refresher error: {e}")
+                delay = self.rates_retry_interval
             
-            return self.exchange_rates
+            await asyncio.sleep(delay)
+    
+    def start_rate_refresher(self):
+        """Start the background rate refresher"""
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._rate_refresh_loop())
+    
+    async def stop_rate_refresher(self):
+        """Stop the background rate refresher"""
+        if self._refresh_task:
+            self._refresh_task.cancel()
+            try:
+                await self._refresh_task
+            except asyncio.CancelledError:
+                pass
+            self._refresh_task = None
+    
+    async def get_exchange_rates(self, force_refresh: bool = False) -> Dict[str, float]:
+        """Get current exchange rates"""
+        try:
+            if force_refresh:
+                await self.refresh_rates()
+            return dict(self.snapshot.rates)
             
         except Exception as e:
             logger.error(f"Failed to get exchange rates: {e}")
-            # Return fallback or cached rates
-            if not self.exchange_rates:
-                self.exchange_rates = self.fallback_rates.copy()
-                self.exchange_rates[self.base_currency] = 1.0
-            return self.exchange_rates
+            return dict(self.snapshot.rates)
     
     async def _fetch_rates_from_api(self) -> Optional[Dict[str, float]]:
         """Fetch exchange rates from external API"""
@@ -167,28 +311,11 @@ class MultiCurrencyService:
                     "timestamp": datetime.utcnow().isoformat()
                 }
             
-            # Get current exchange rates
-            rates = await self.get_exchange_rates()
-            
-            # Convert via base currency if needed
-            if from_currency == self.base_currency:
-                # Base to target
-                rate = rates.get(to_currency, 1.0)
-                converted = amount * rate
-            elif to_currency == self.base_currency:
-                # Source to base
-                rate = 1.0 / rates.get(from_currency, 1.0)
-                converted = amount * rate
-            else:
-                # Source to base, then base to target
-                to_base_rate = 1.0 / rates.get(from_currency, 1.0)
-                to_target_rate = rates.get(to_currency, 1.0)
-                rate = to_base_rate * to_target_rate
-                converted = amount * rate
-            
-            # Round to appropriate decimal places
-            decimal_places = self.supported_currencies.get(to_currency, {}).get("decimal_places", 2)
-            converted = round(converted, decimal_places)
+            # Convert via base currency using the current snapshot
+            snapshot = self.get_rate_snapshot()
+            rate = snapshot.rate(from_currency, to_currency)
+            decimal_places = snapshot.decimal_places(to_currency)
+            converted = round(amount * rate, decimal_places)
             
             return {
                 "original_amount": amount,
@@ -219,34 +346,29 @@ class MultiCurrencyService:
     async def format_currency(self, amount: float, currency_code: str) -> str:
         """Format amount with currency symbol and proper decimals"""
         try:
-            currency_info = self.supported_currencies.get(currency_code.upper())
-            if not currency_info:
-                return f"{amount:.2f} {currency_code}"
-            
-            decimal_places = currency_info["decimal_places"]
-            symbol = currency_info["symbol"]
-            
-            formatted_amount = f"{amount:.{decimal_places}f}"
-            
-            # Different positioning for different currencies
-            if currency_code in ["USD", "GBP", "CAD", "AUD"]:
-                return f"{symbol}{formatted_amount}"
-            elif currency_code == "JPY":
-                return f"¥{formatted_amount}"
-            else:
-                return f"{formatted_amount} {symbol}"
+            return format_amount(amount, currency_code, self.supported_currencies)
                 
         except Exception as e:
             logger.error(f"Currency formatting failed: {e}")
             return f"{amount:.2f} {currency_code}"
     
+    def _cache_preference(self, user_id: str, currency_code: str):
+        self._preference_cache[user_id] = (datetime.utcnow(), currency_code)
+        self._preference_cache.move_to_end(user_id)
+        while len(self._preference_cache) > self.preference_cache_size:
+            self._preference_cache.popitem(last=False)
+    
     async def get_user_preferred_currency(self, user_id: str) -> str:
-        """Get user's preferred currency"""
+        """Get user's preferred currency (cached per session)"""
+        cached = self._preference_cache.get(user_id)
+        if cached and datetime.utcnow() - cached[0] < timedelta(seconds=self.preference_cache_ttl):
+            return cached[1]
+        
         try:
-            user = await self.db.users.find_one({"id": user_id})
-            if user and "preferred_currency" in user:
-                return user["preferred_currency"]
-            return self.base_currency
+            user = await self.db.users.find_one({"id": user_id}, {"preferred_currency": 1})
+            currency_code = (user or {}).get("preferred_currency") or self.base_currency
+            self._cache_preference(user_id, currency_code)
+            return currency_code
             
         except Exception as e:
             logger.error(f"Failed to get user currency preference: {e}")
@@ -262,6 +384,7 @@ class MultiCurrencyService:
                 {"id": user_id},
                 {"$set": {"preferred_currency": currency_code.upper()}}
             )
+            self._cache_preference(user_id, currency_code.upper())
             
             return True
             
@@ -269,32 +392,33 @@ class MultiCurrencyService:
             logger.error(f"Failed to set user currency preference: {e}")
             return False
     
-    async def convert_listing_prices(self, listings: List[Dict], target_currency: str) -> List[Dict]:
-        """Convert listing prices to target currency"""
+    async def convert_listing_prices(
+        self,
+        listings: List[Dict],
+        target_currency: str,
+        snapshot: Optional[RateSnapshot] = None
+    ) -> List[Dict]:
+        """Convert listing prices to target currency in one pass over a single snapshot"""
         try:
-            converted_listings = []
+            snapshot = snapshot or self.get_rate_snapshot()
+            
+            # Assuming all prices stored in base currency
+            rate, converted, formatted = snapshot.convert_many(
+                [listing.get("price") for listing in listings],
+                self.base_currency,
+                target_currency
+            )
             
-            for listing in listings:
+            converted_listings = []
+            for listing, converted_price, formatted_price in zip(listings, converted, formatted):
                 converted_listing = listing.copy()
                 
-                # Convert main price
-                if "price" in listing:
-                    conversion = await self.convert_currency(
-                        listing["price"],
-                        self.base_currency,  # Assuming all prices stored in base currency
-                        target_currency
-                    )
-                    
-                    converted_listing["price"] = conversion["converted_amount"]
+                if converted_price is not None:
+                    converted_listing["price"] = converted_price
                     converted_listing["original_price"] = listing["price"]
                     converted_listing["price_currency"] = target_currency
-                    converted_listing["exchange_rate"] = conversion["exchange_rate"]
-                    
-                    # Format for display
-                    converted_listing["formatted_price"] = await self.format_currency(
-                        conversion["converted_amount"],
-                        target_currency
-                    )
+                    converted_listing["exchange_rate"] = rate
+                    converted_listing["formatted_price"] = formatted_price
                 
                 converted_listings.append(converted_listing)
             
@@ -304,6 +428,41 @@ class MultiCurrencyService:
             logger.error(f"Failed to convert listing prices: {e}")
             return listings  # Return original on error
     
+    def apply_display_prices(
+        self,
+        listings: List[Dict],
+        target_currency: str,
+        snapshot: Optional[RateSnapshot] = None
+    ) -> List[Dict]:
+        """
+        Annotate listings in place with display-currency prices in one batched pass.
+        Stored base-currency prices (used for bids and orders) are left untouched.
+        """
+        snapshot = snapshot or self.get_rate_snapshot()
+        
+        rate, prices, formatted_prices = snapshot.convert_many(
+            [listing.get("price") for listing in listings],
+            self.base_currency,
+            target_currency
+        )
+        _, bids, formatted_bids = snapshot.convert_many(
+            [(listing.get("bid_info") or {}).get("highest_bid") for listing in listings],
+            self.base_currency,
+            target_currency
+        )
+        
+        for index, listing in enumerate(listings):
+            listing["display_currency"] = target_currency
+            listing["display_price"] = prices[index]
+            listing["formatted_price"] = formatted_prices[index]
+            listing["exchange_rate"] = rate
+            
+            if bids[index] is not None:
+                listing["bid_info"]["display_highest_bid"] = bids[index]
+                listing["bid_info"]["formatted_highest_bid"] = formatted_bids[index]
+        
+        return listings
+    
     async def create_currency_conversion_history(
         self, 
         user_id: str, 
@@ -401,6 +560,8 @@ class MultiCurrencyService:
                 "supported_currencies": len(self.supported_currencies),
                 "base_currency": self.base_currency,
                 "rates_last_updated": self.rates_last_updated.isoformat() if self.rates_last_updated else None,
+                "rates_source": self.snapshot.source,
+                "rates_version": self.snapshot.version,
                 "active_rates": len(rates),
                 "cache_duration_seconds": self.rates_cache_duration,
                 "currency_list": list(self.supported_currencies.keys()),
@@ -421,8 +582,15 @@ async def init_multicurrency_service(db):
     """Initialize multi-currency service"""
     global multicurrency_service
     multicurrency_service = MultiCurrencyService(db)
+    await multicurrency_service.load_persisted_rates()
+    multicurrency_service.start_rate_refresher()
     return multicurrency_service
 
+async def cleanup_multicurrency_service():
+    """Stop the background rate refresher"""
+    if multicurrency_service:
+        await multicurrency_service.stop_rate_refresher()
+
 def get_multicurrency_service():
     """Get multi-currency service instance"""
     return multicurrency_service
\ No newline at end of file
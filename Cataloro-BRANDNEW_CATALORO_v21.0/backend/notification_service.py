@@ -0,0 +1,247 @@
+"""
+Notification Service for Cataloro Marketplace
+Single write path for user notifications: persist, count unread, push over WebSocket
+"""
+
+import logging
+import os
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import pytz
+from pymongo import UpdateOne
+
+from index_registry import ensure_collection_indexes
+from websocket_service import get_websocket_service
+
+logger = logging.getLogger(__name__)
+
+# Fields pushed over the socket; clients fetch the full document if they need it
+PUSH_FIELDS = ("id", "title", "message", "type", "created_at", "listing_id", "order_id", "tender_id")
+
+
+class NotificationService:
+    """
+    Writes user_notifications and keeps one counter document per user in
+    `notification_counters` ({user_id, unread}) so unread badges are a
+    single indexed read instead of a query over the notifications.
+    """
+
+    def __init__(self, db):
+        self.db = db
+
+        # In-process copy of the active system notifications, invalidated on admin writes.
+        # The TTL bounds staleness on workers that did not handle the write.
+        self.system_cache_ttl = float(os.environ.get('SYSTEM_NOTIFICATION_CACHE_TTL', 30))
+        self._system_notifications: Optional[List[Dict[str, Any]]] = None
+        self._system_loaded_at = 0.0
+
+    async def ensure_indexes(self):
+        await ensure_collection_indexes(self.db, "notification_counters", "user_notifications", "notification_views")
+
+    async def notify(self, notification: Dict[str, Any]) -> Dict[str, Any]:
+        """Persist a notification, bump the unread counter and push it to the user"""
+        self._prepare(notification)
+        user_id = notification["user_id"]
+
+        await self.db.user_notifications.insert_one(notification)
+
+        unread_count = None
+        if not notification["read"]:
+            counter = await self.db.notification_counters.find_one_and_update(
+                {"user_id": user_id},
+                {"$inc": {"unread": 1}, "$set": {"updated_at": datetime.utcnow()}},
+                upsert=True,
+                return_document=True
+            )
+            unread_count = counter.get("unread") if counter else None
+
+        await self._push(user_id, notification, unread_count)
+        return notification
+
+    async def notify_many(self, notifications: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Bulk variant of notify: one insert_many and one counter bulk_write"""
+        if not notifications:
+            return []
+        for notification in notifications:
+            self._prepare(notification)
+
+        await self.db.user_notifications.insert_many(notifications)
+
+        unread_by_user: Dict[str, int] = {}
+        for notification in notifications:
+            if not notification["read"]:
+                unread_by_user[notification["user_id"]] = unread_by_user.get(notification["user_id"], 0) + 1
+        if unread_by_user:
+            now = datetime.utcnow()
+            await self.db.notification_counters.bulk_write([
+                UpdateOne({"user_id": user_id}, {"$inc": {"unread": count}, "$set": {"updated_at": now}}, upsert=True)
+                for user_id, count in unread_by_user.items()
+            ], ordered=False)
+
+        # Counts are not read back per user; clients refetch the badge when unread_count is None
+        for notification in notifications:
+            await self._push(notification["user_id"], notification, None)
+        return notifications
+
+    @staticmethod
+    def _prepare(notification: Dict[str, Any]):
+        """Fill defaults; created_at is always stored as an ISO string so it can be pushed as JSON"""
+        notification.setdefault("id", str(uuid.uuid4()))
+        notification.setdefault("read", False)
+        notification.setdefault("created_at", datetime.now(pytz.timezone('Europe/Berlin')).isoformat())
+        if isinstance(notification["created_at"], datetime):
+            notification["created_at"] = notification["created_at"].isoformat()
+
+    async def _push(self, user_id: str, notification: Dict[str, Any], unread_count: Optional[int]):
+        ws_service = get_websocket_service()
+        if not ws_service:
+            return
+        try:
+            payload = {field: notification[field] for field in PUSH_FIELDS if notification.get(field) is not None}
+            payload["unread_count"] = unread_count
+            await ws_service.send_notification(user_id, payload)
+        except Exception as e:
+            logger.warning(f"Notification push failed for {user_id}: {e}")
+
+    async def get_unread_count(self, user_id: str) -> int:
+        """Read the materialized unread counter, rebuilding it if it does not exist yet"""
+        counter = await self.db.notification_counters.find_one({"user_id": user_id}, {"unread": 1})
+        if counter is not None:
+            return max(0, counter.get("unread", 0))
+        return await self.recount(user_id)
+
+    async def recount(self, user_id: str) -> int:
+        """Recompute a user's unread counter from user_notifications"""
+        unread = await self.db.user_notifications.count_documents({"user_id": user_id, "read": {"$ne": True}})
+        await self.db.notification_counters.update_one(
+            {"user_id": user_id},
+            {"$set": {"unread": unread, "updated_at": datetime.utcnow()}},
+            upsert=True
+        )
+        return unread
+
+    async def mark_read(self, user_id: str, notification_id: str, read: bool = True) -> Optional[bool]:
+        """
+        Set the read flag on a notification and adjust the counter when it changed.
+        Returns None if the notification does not exist.
+        """
+        update = {"read": read}
+        if read:
+            update["read_at"] = datetime.utcnow().isoformat()
+
+        result = await self.db.user_notifications.update_one(
+            {"user_id": user_id, "id": notification_id, "read": {"$ne": read} if read else True},
+            {"$set": update}
+        )
+        if result.modified_count:
+            await self._adjust(user_id, -1 if read else 1)
+            return True
+
+        exists = await self.db.user_notifications.count_documents({"user_id": user_id, "id": notification_id}, limit=1)
+        return False if exists else None
+
+    async def delete(self, user_id: Optional[str], notification_id: str) -> bool:
+        """Delete a notification, decrementing the counter if it was unread"""
+        query = {"id": notification_id}
+        if user_id:
+            query["user_id"] = user_id
+
+        deleted = await self.db.user_notifications.find_one_and_delete(query, {"user_id": 1, "read": 1})
+        if not deleted:
+            return False
+        if not deleted.get("read"):
+            await self._adjust(deleted["user_id"], -1)
+        return True
+
+    async def clear_user(self, user_id: str):
+        """Remove all notifications and the counter for a user"""
+        await self.db.user_notifications.delete_many({"user_id": user_id})
+        await self.db.notification_counters.delete_one({"user_id": user_id})
+
+    async def clear_users(self, user_ids: List[str]):
+        """Set-based clear_user for many users"""
+        await self.db.user_notifications.delete_many({"user_id": {"$in": user_ids}})
+        await self.db.notification_counters.delete_many({"user_id": {"$in": user_ids}})
+
+    async def _adjust(self, user_id: str, delta: int):
+        query = {"user_id": user_id}
+        if delta < 0:
+            # Never drive the counter below zero
+            query["unread"] = {"$gte": -delta}
+        await self.db.notification_counters.update_one(
+            query,
+            {"$inc": {"unread": delta}, "$set": {"updated_at": datetime.utcnow()}}
+        )
+
+    # System notifications (admin-authored toasts)
+    async def get_active_system_notifications(self) -> List[Dict[str, Any]]:
+        """Active system notifications, newest first, from the in-process cache"""
+        if self._system_notifications is None or time.monotonic() - self._system_loaded_at > self.system_cache_ttl:
+            notifications = await self.db.system_notifications.find(
+                {"is_active": True}
+            ).sort("created_at", -1).to_list(length=None)
+            for notification in notifications:
+                notification["_id"] = str(notification["_id"])
+            self._system_notifications = notifications
+            self._system_loaded_at = time.monotonic()
+        return self._system_notifications
+
+    def invalidate_system_notifications(self):
+        """Drop the cached active list after an admin create/update/delete"""
+        self._system_notifications = None
+
+    async def get_unseen_system_notifications(self, user_id: str, limit: int = 50) -> List[Dict[str, Any]]:
+        """Active, unexpired notifications targeted at the user that they have not seen yet"""
+        current_time = datetime.utcnow().isoformat()
+        candidates = [
+            notification for notification in await self.get_active_system_notifications()
+            if (not notification.get("expires_at") or notification["expires_at"] > current_time)
+        ][:limit]
+
+        targeted = [
+            notification for notification in candidates
+            if notification.get("target_users") == "all"
+            or (notification.get("target_users") == "specific_ids" and user_id in notification.get("user_ids", []))
+        ]
+        if not targeted:
+            return []
+
+        # One indexed $in read for the user's seen-state
+        seen = await self.db.notification_views.find(
+            {"user_id": user_id, "notification_id": {"$in": [n["id"] for n in targeted]}},
+            {"notification_id": 1, "_id": 0}
+        ).to_list(length=None)
+        seen_ids = {view["notification_id"] for view in seen}
+
+        return [dict(notification) for notification in targeted if notification["id"] not in seen_ids]
+
+    async def mark_system_notification_viewed(self, user_id: str, notification_id: str) -> bool:
+        """Record a view once per user; returns True when this was the first view"""
+        result = await self.db.notification_views.update_one(
+            {"user_id": user_id, "notification_id": notification_id},
+            {"$setOnInsert": {
+                "id": str(uuid.uuid4()),
+                "user_id": user_id,
+                "notification_id": notification_id,
+                "viewed_at": datetime.utcnow().isoformat()
+            }},
+            upsert=True
+        )
+        return result.upserted_id is not None
+
+
+# Global notification service instance
+notification_service = None
+
+async def init_notification_service(db):
+    """Initialize notification service"""
+    global notification_service
+    notification_service = NotificationService(db)
+    return notification_service
+
+def get_notification_service():
+    """Get notification service instance"""
+    return notification_service
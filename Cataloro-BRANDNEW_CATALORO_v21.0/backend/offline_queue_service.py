@@ -0,0 +1,143 @@
+"""
+Offline Queue Service for Cataloro Marketplace
+Durable, bounded per-user queue for WebSocket events sent while a user is offline
+"""
+
+import logging
+import os
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, List
+
+from index_registry import ensure_collection_indexes
+
+logger = logging.getLogger(__name__)
+
+
+class OfflineMessageQueue:
+    """
+    Per-user queue persisted in the `offline_messages` collection.
+
+    Entries expire through a TTL index on `expires_at`; each user's queue is
+    trimmed to `max_depth` entries (oldest dropped first) on enqueue.
+    """
+
+    def __init__(self, db, ttl_seconds: int = None, max_depth: int = None, batch_size: int = None):
+        self.db = db
+        self.collection = db.offline_messages
+        self.ttl_seconds = ttl_seconds or int(os.environ.get('OFFLINE_QUEUE_TTL', 7 * 24 * 3600))
+        self.max_depth = max_depth or int(os.environ.get('OFFLINE_QUEUE_MAX_DEPTH', 200))
+        self.batch_size = batch_size or int(os.environ.get('OFFLINE_QUEUE_BATCH_SIZE', 100))
+        # get_stats groups the whole collection, so its result is reused for this long
+        self.stats_ttl = float(os.environ.get('OFFLINE_QUEUE_STATS_TTL', 30))
+        self._depth_summary: Dict[str, Any] = {}
+        self._depth_summary_at = 0.0
+
+        self.stats = {
+            "enqueued": 0,
+            "delivered": 0,
+            "dropped_overflow": 0,
+            "drains": 0
+        }
+
+    async def ensure_indexes(self):
+        """Create the TTL index and the per-user ordering index"""
+        await ensure_collection_indexes(self.collection.database, self.collection.name)
+
+    async def enqueue(self, user_id: str, event_type: str, payload: Dict[str, Any]) -> str:
+        """Persist an event for later delivery and trim the user's queue to max_depth"""
+        now = datetime.utcnow()
+        entry_id = str(uuid.uuid4())
+        await self.collection.insert_one({
+            "id": entry_id,
+            "user_id": user_id,
+            "type": event_type,
+            "payload": payload,
+            "created_at": now,
+            "expires_at": now + timedelta(seconds=self.ttl_seconds)
+        })
+        self.stats["enqueued"] += 1
+
+        # Drop the oldest entries beyond max_depth; the bounded count is the common-case cost
+        depth = await self.collection.count_documents({"user_id": user_id}, limit=self.max_depth + 1)
+        if depth > self.max_depth:
+            overflow = await self.collection.find(
+                {"user_id": user_id}, {"_id": 1}
+            ).sort("created_at", -1).skip(self.max_depth).to_list(length=None)
+            if overflow:
+                await self.collection.delete_many({"_id": {"$in": [doc["_id"] for doc in overflow]}})
+                self.stats["dropped_overflow"] += len(overflow)
+
+        return entry_id
+
+    async def drain(self, user_id: str) -> List[Dict[str, Any]]:
+        """
+        Read a user's pending events, oldest first, in batches, without removing them;
+        call ack() with the delivered ids once the emit succeeded.
+        Expired entries the TTL monitor has not reaped yet are skipped.
+        """
+        now = datetime.utcnow()
+        messages = []
+
+        while True:
+            query = {"user_id": user_id, "expires_at": {"$gt": now}}
+            if messages:
+                # Nothing is deleted while reading, so skip what earlier batches returned
+                # (bounded by max_depth)
+                query["id"] = {"$nin": [message["id"] for message in messages]}
+            batch = await self.collection.find(query).sort("created_at", 1).limit(
+                self.batch_size
+            ).to_list(length=self.batch_size)
+            if not batch:
+                break
+
+            messages.extend({
+                "id": doc["id"],
+                "type": doc["type"],
+                "data": doc["payload"],
+                "timestamp": doc["created_at"].isoformat()
+            } for doc in batch)
+
+            if len(batch) < self.batch_size:
+                break
+
+        return messages
+
+    async def ack(self, user_id: str, message_ids: List[str]) -> int:
+        """Remove delivered events; unacknowledged ones stay queued for the next connect"""
+        if not message_ids:
+            return 0
+        result = await self.collection.delete_many({"user_id": user_id, "id": {"$in": message_ids}})
+        self.stats["drains"] += 1
+        self.stats["delivered"] += result.deleted_count
+        return result.deleted_count
+
+    async def depth(self, user_id: str) -> int:
+        """Number of pending events for a user"""
+        return await self.collection.count_documents({"user_id": user_id})
+
+    async def get_stats(self) -> Dict[str, Any]:
+        """Queue depth metrics (refreshed at most every stats_ttl seconds) plus enqueue/delivery counters"""
+        if time.monotonic() - self._depth_summary_at >= self.stats_ttl:
+            depths = await self.collection.aggregate([
+                {"$group": {"_id": "$user_id", "depth": {"$sum": 1}}},
+                {"$group": {
+                    "_id": None,
+                    "users": {"$sum": 1},
+                    "total": {"$sum": "$depth"},
+                    "max_depth": {"$max": "$depth"}
+                }}
+            ]).to_list(length=1)
+            self._depth_summary = depths[0] if depths else {}
+            self._depth_summary_at = time.monotonic()
+        summary = self._depth_summary
+
+        return {
+            **self.stats,
+            "queued_users": summary.get("users", 0),
+            "queued_messages": summary.get("total", 0),
+            "max_user_depth": summary.get("max_depth", 0),
+            "depth_limit": self.max_depth,
+            "ttl_seconds": self.ttl_seconds
+        }
@@ -0,0 +1,502 @@
+"""
+PDF Reports for Cataloro Marketplace
+Synchronous reportlab renderers for the export job pipeline; they take pre-collected data and write a file
+"""
+
+import logging
+import os
+from datetime import datetime, timezone
+from typing import Any, Dict
+
+logger = logging.getLogger(__name__)
+
+
+def render_comprehensive_pdf(data: Dict[str, Any], pdf_path: str):
+    """Admin comprehensive export; `data` comes from collect_comprehensive_export"""
+    from reportlab.lib.pagesizes import A4
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, PageBreak
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.lib.units import inch
+    from reportlab.lib import colors
+    from reportlab.lib.enums import TA_CENTER
+
+    export_types = data.get("types", [])
+    date_range = data.get("dateRange", {})
+    format_type = data.get("format", "comprehensive")
+    totals = data["totals"]
+
+    # Initialize PDF document
+    doc = SimpleDocTemplate(
+        pdf_path,
+        pagesize=A4,
+        rightMargin=72,
+        leftMargin=72,
+        topMargin=72,
+        bottomMargin=18
+    )
+
+    # Get sample styles
+    styles = getSampleStyleSheet()
+
+    # Create custom styles
+    title_style = ParagraphStyle(
+        'CustomTitle',
+        parent=styles['Heading1'],
+        fontSize=24,
+        spaceAfter=30,
+        alignment=TA_CENTER,
+        textColor=colors.HexColor('#2563eb')
+    )
+
+    heading_style = ParagraphStyle(
+        'CustomHeading',
+        parent=styles['Heading2'],
+        fontSize=16,
+        spaceAfter=12,
+        spaceBefore=20,
+        textColor=colors.HexColor('#1f2937')
+    )
+
+    # Story container for PDF content
+    story = []
+
+    # Add title page
+    story.append(Paragraph("CATALORO MARKETPLACE", title_style))
+    story.append(Paragraph("Comprehensive Data Export Report", styles['Title']))
+
+    # Add generation info
+    generation_date = datetime.now(timezone.utc).strftime("%B %d, %Y at %H:%M UTC")
+    story.append(Spacer(1, 20))
+    story.append(Paragraph(f"Generated on: {generation_date}", styles['Normal']))
+
+    if date_range.get('start') and date_range.get('end'):
+        start_date = datetime.fromisoformat(date_range['start']).strftime("%B %d, %Y")
+        end_date = datetime.fromisoformat(date_range['end']).strftime("%B %d, %Y")
+        story.append(Paragraph(f"Data Period: {start_date} to {end_date}", styles['Normal']))
+
+    story.append(Spacer(1, 30))
+
+    # Add executive summary
+    summary_data = []
+    total_users = totals["users"]
+    total_listings = totals["listings"]
+    total_orders = totals["orders"]
+
+    summary_data.extend([
+        ["Metric", "Value"],
+        ["Total Users", f"{total_users:,}"],
+        ["Total Listings", f"{total_listings:,}"],
+        ["Total Orders", f"{total_orders:,}"],
+        ["Report Types", f"{len(export_types)}"],
+        ["Export Format", format_type.title()]
+    ])
+
+    summary_table = Table(summary_data, colWidths=[3*inch, 2*inch])
+    summary_table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#f3f4f6')),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.HexColor('#1f2937')),
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), 12),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+        ('BACKGROUND', (0, 1), (-1, -1), colors.white),
+        ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#e5e7eb'))
+    ]))
+
+    story.append(Paragraph("Executive Summary", heading_style))
+    story.append(summary_table)
+    story.append(PageBreak())
+
+    # Process each selected export type
+    for export_type in export_types:
+        try:
+            story.append(Paragraph(f"{export_type.replace('_', ' ').title()} Report", heading_style))
+
+            if export_type == "users":
+                # Users Report
+                users = data.get("users", [])
+
+                if users:
+                    user_data = [["Username", "Email", "Join Date", "Status"]]
+                    for user in users[:50]:  # Limit to first 50 for PDF
+                        join_date = user.get('created_at', 'N/A')
+                        if isinstance(join_date, str):
+                            try:
+                                join_date = datetime.fromisoformat(join_date.replace('Z', '+00:00')).strftime("%Y-%m-%d")
+                            except:
+                                join_date = 'N/A'
+
+                        user_data.append([
+                            user.get('username', 'N/A')[:20],
+                            user.get('email', 'N/A')[:30],
+                            join_date,
+                            user.get('status', 'active')
+                        ])
+
+                    user_table = Table(user_data, colWidths=[1.5*inch, 2.5*inch, 1.5*inch, 1*inch])
+                    user_table.setStyle(TableStyle([
+                        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#3b82f6')),
+                        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+                        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+                        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+                        ('FONTSIZE', (0, 0), (-1, 0), 10),
+                        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+                        ('BACKGROUND', (0, 1), (-1, -1), colors.white),
+                        ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#e5e7eb')),
+                        ('FONTSIZE', (0, 1), (-1, -1), 8)
+                    ]))
+
+                    story.append(user_table)
+                    if len(users) > 50:
+                        story.append(Paragraph(f"Showing first 50 of {len(users)} total users", styles['Normal']))
+
+            elif export_type == "listings":
+                # Listings Report
+                listings = data.get("listings", [])
+
+                if listings:
+                    listing_data = [["Title", "Price", "Category", "Created", "Status"]]
+                    for listing in listings[:50]:  # Limit for PDF
+                        created_at = listing.get('created_at', 'N/A')
+                        if isinstance(created_at, str):
+                            try:
+                                created_at = datetime.fromisoformat(created_at.replace('Z', '+00:00')).strftime("%Y-%m-%d")
+                            except:
+                                created_at = 'N/A'
+
+                        listing_data.append([
+                            listing.get('title', 'N/A')[:25],
+                            f"€{listing.get('price', 0)}",
+                            listing.get('category', 'N/A')[:15],
+                            created_at,
+                            listing.get('status', 'active')
+                        ])
+
+                    listing_table = Table(listing_data, colWidths=[2*inch, 1*inch, 1.5*inch, 1*inch, 1*inch])
+                    listing_table.setStyle(TableStyle([
+                        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#10b981')),
+                        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+                        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+                        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+                        ('FONTSIZE', (0, 0), (-1, 0), 10),
+                        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+                        ('BACKGROUND', (0, 1), (-1, -1), colors.white),
+                        ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#e5e7eb')),
+                        ('FONTSIZE', (0, 1), (-1, -1), 8)
+                    ]))
+
+                    story.append(listing_table)
+                    if len(listings) > 50:
+                        story.append(Paragraph(f"Showing first 50 of {len(listings)} total listings", styles['Normal']))
+
+            elif export_type == "transactions":
+                # Transactions Report
+                orders = data.get("orders", [])
+
+                if orders:
+                    order_data = [["Order ID", "Amount", "Status", "Date", "User"]]
+                    total_revenue = 0
+
+                    for order in orders[:50]:
+                        amount = order.get('total_amount', 0)
+                        total_revenue += amount
+
+                        created_at = order.get('created_at', 'N/A')
+                        if isinstance(created_at, str):
+                            try:
+                                created_at = datetime.fromisoformat(created_at.replace('Z', '+00:00')).strftime("%Y-%m-%d")
+                            except:
+                                created_at = 'N/A'
+
+                        order_data.append([
+                            order.get('id', 'N/A')[:15],
+                            f"€{amount:.2f}",
+                            order.get('status', 'N/A'),
+                            created_at,
+                            order.get('buyer_email', 'N/A')[:20]
+                        ])
+
+                    order_table = Table(order_data, colWidths=[1.5*inch, 1*inch, 1*inch, 1*inch, 2*inch])
+                    order_table.setStyle(TableStyle([
+                        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#f59e0b')),
+                        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+                        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+                        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+                        ('FONTSIZE', (0, 0), (-1, 0), 10),
+                        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+                        ('BACKGROUND', (0, 1), (-1, -1), colors.white),
+                        ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#e5e7eb')),
+                        ('FONTSIZE', (0, 1), (-1, -1), 8)
+                    ]))
+
+                    story.append(order_table)
+                    story.append(Spacer(1, 12))
+                    story.append(Paragraph(f"Total Revenue (shown): €{total_revenue:.2f}", styles['Normal']))
+
+                    if len(orders) > 50:
+                        story.append(Paragraph(f"Showing first 50 of {len(orders)} total orders", styles['Normal']))
+
+            elif export_type == "analytics":
+                # Analytics Report
+                story.append(Paragraph("Platform Analytics Overview", styles['Normal']))
+
+                # Get basic analytics
+                user_count_by_month = totals["users"]
+                listing_count_by_category = totals["listings"]
+
+                analytics_data = [
+                    ["Metric", "Value", "Period"],
+                    ["Total Users", f"{user_count_by_month}", "All Time"],
+                    ["Total Listings", f"{listing_count_by_category}", "All Time"],
+                    ["Active Orders", f"{totals['active_orders']}", "Current"],
+                    ["Completed Orders", f"{totals['completed_orders']}", "All Time"]
+                ]
+
+                analytics_table = Table(analytics_data, colWidths=[2*inch, 1.5*inch, 1.5*inch])
+                analytics_table.setStyle(TableStyle([
+                    ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#8b5cf6')),
+                    ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+                    ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+                    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+                    ('FONTSIZE', (0, 0), (-1, 0), 10),
+                    ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+                    ('BACKGROUND', (0, 1), (-1, -1), colors.white),
+                    ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#e5e7eb'))
+                ]))
+
+                story.append(analytics_table)
+
+            else:
+                # Generic report for other types
+                story.append(Paragraph(f"Data export for {export_type} is being processed...", styles['Normal']))
+                story.append(Paragraph("This section contains comprehensive data analysis and insights.", styles['Normal']))
+
+            story.append(Spacer(1, 20))
+
+        except Exception as e:
+            logger.error(f"Error processing {export_type}: {e}")
+            story.append(Paragraph(f"Error processing {export_type}: {str(e)}", styles['Normal']))
+            story.append(Spacer(1, 20))
+
+    # Add footer info
+    story.append(PageBreak())
+    story.append(Paragraph("Report Generation Complete", heading_style))
+    story.append(Paragraph(f"This report was generated by Cataloro Marketplace Admin Panel on {generation_date}.", styles['Normal']))
+    story.append(Paragraph("For questions about this data, please contact your system administrator.", styles['Normal']))
+
+    doc.build(story)
+
+
+def render_basket_pdf(data: Dict[str, Any], pdf_path: str):
+    """Individual basket export with Cataloro branding; `data` is the posted basket"""
+    from reportlab.lib.pagesizes import A4
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, Image
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.lib.units import inch
+    from reportlab.lib import colors
+    from reportlab.lib.enums import TA_CENTER
+
+    basket_name = data.get("basketName", "Unnamed Basket")
+    basket_description = data.get("basketDescription", "")
+    totals = data.get("totals", {})
+    items = data.get("items", [])
+
+    # Initialize PDF document
+    doc = SimpleDocTemplate(
+        pdf_path,
+        pagesize=A4,
+        rightMargin=72,
+        leftMargin=72,
+        topMargin=72,
+        bottomMargin=72
+    )
+
+    # Get sample styles
+    styles = getSampleStyleSheet()
+
+    # Create custom styles
+    title_style = ParagraphStyle(
+        'CustomTitle',
+        parent=styles['Heading1'],
+        fontSize=20,
+        spaceAfter=20,
+        alignment=TA_CENTER,
+        textColor=colors.HexColor('#2563eb')
+    )
+
+    heading_style = ParagraphStyle(
+        'CustomHeading',
+        parent=styles['Heading2'],
+        fontSize=14,
+        spaceAfter=12,
+        spaceBefore=16,
+        textColor=colors.HexColor('#1f2937')
+    )
+
+    # Story container for PDF content
+    story = []
+
+    # Add Cataloro Logo and Header
+    try:
+        # Try to find the logo file in the uploads directory
+        logo_path = None
+        logo_dirs = ['/app/backend/uploads', '/app/frontend/public', '/app/uploads']
+
+        for logo_dir in logo_dirs:
+            if os.path.exists(logo_dir):
+                for filename in os.listdir(logo_dir):
+                    if 'logo' in filename.lower() and filename.lower().endswith(('.png', '.jpg', '.jpeg')):
+                        logo_path = os.path.join(logo_dir, filename)
+                        break
+                if logo_path:
+                    break
+
+        if logo_path and os.path.exists(logo_path):
+            # Add logo
+            logo = Image(logo_path, width=120, height=40)  # Adjust size as needed
+            logo.hAlign = 'CENTER'
+            story.append(logo)
+            story.append(Spacer(1, 20))
+    except Exception as e:
+        logger.warning(f"Could not add logo: {e}")
+
+    # Title
+    story.append(Paragraph("CATALORO MARKETPLACE", title_style))
+    story.append(Paragraph("Basket Export Report", styles['Title']))
+    story.append(Spacer(1, 30))
+
+    # Basket Information Header
+    story.append(Paragraph("Basket Information", heading_style))
+
+    basket_info_data = [
+        ["Basket Name", basket_name],
+        ["Total Items", str(len(items))],
+        ["Total Value Paid", f"€{totals.get('valuePaid', 0):.2f}"],
+        ["Total Pt (grams)", f"{totals.get('ptG', 0):.4f}"],
+        ["Total Pd (grams)", f"{totals.get('pdG', 0):.4f}"],
+        ["Total Rh (grams)", f"{totals.get('rhG', 0):.4f}"],
+        ["Export Date", datetime.now(timezone.utc).strftime("%B %d, %Y at %H:%M UTC")]
+    ]
+
+    if basket_description:
+        basket_info_data.insert(1, ["Description", basket_description])
+
+    basket_info_table = Table(basket_info_data, colWidths=[2.5*inch, 3.5*inch])
+    basket_info_table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#f3f4f6')),
+        ('TEXTCOLOR', (0, 0), (0, -1), colors.HexColor('#1f2937')),
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, -1), 10),
+        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+        ('TOPPADDING', (0, 0), (-1, -1), 8),
+        ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#e5e7eb'))
+    ]))
+
+    story.append(basket_info_table)
+    story.append(Spacer(1, 30))
+
+    # Items List
+    if items:
+        story.append(Paragraph("Basket Items", heading_style))
+
+        # Prepare items data
+        items_data = [["Title", "Price", "Seller", "Date of Buying", "Pt (g)", "Pd (g)", "Rh (g)"]]
+
+        for item in items:
+            # Format the date of buying
+            date_bought = item.get('created_at', item.get('purchase_date', 'N/A'))
+            if isinstance(date_bought, str) and date_bought != 'N/A':
+                try:
+                    date_bought = datetime.fromisoformat(date_bought.replace('Z', '+00:00')).strftime("%Y-%m-%d")
+                except:
+                    date_bought = 'N/A'
+
+            # Get precious metal values
+            pt_g = item.get('pt_g', 0)
+            pd_g = item.get('pd_g', 0) 
+            rh_g = item.get('rh_g', 0)
+
+            # If direct values aren't available, try calculating from PPM and weight
+            if pt_g == 0 and item.get('pt_ppm') and item.get('weight'):
+                pt_g = (item.get('weight', 0) * item.get('pt_ppm', 0) / 1000) * item.get('renumeration_pt', 0)
+            if pd_g == 0 and item.get('pd_ppm') and item.get('weight'):
+                pd_g = (item.get('weight', 0) * item.get('pd_ppm', 0) / 1000) * item.get('renumeration_pd', 0)
+            if rh_g == 0 and item.get('rh_ppm') and item.get('weight'):
+                rh_g = (item.get('weight', 0) * item.get('rh_ppm', 0) / 1000) * item.get('renumeration_rh', 0)
+
+            items_data.append([
+                item.get('title', 'N/A')[:30],  # Truncate long titles
+                f"€{item.get('price', 0):.2f}",
+                item.get('seller', item.get('seller_name', 'N/A'))[:20],
+                date_bought,
+                f"{pt_g:.4f}",
+                f"{pd_g:.4f}",
+                f"{rh_g:.4f}"
+            ])
+
+        # Create items table
+        items_table = Table(items_data, colWidths=[2*inch, 0.8*inch, 1.2*inch, 1*inch, 0.6*inch, 0.6*inch, 0.6*inch])
+        items_table.setStyle(TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#2563eb')),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+            ('ALIGN', (1, 1), (1, -1), 'RIGHT'),  # Price column right-aligned
+            ('ALIGN', (4, 1), (-1, -1), 'RIGHT'),  # Metal columns right-aligned
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, 0), 9),
+            ('FONTSIZE', (0, 1), (-1, -1), 8),
+            ('BOTTOMPADDING', (0, 0), (-1, 0), 8),
+            ('TOPPADDING', (0, 0), (-1, 0), 8),
+            ('BOTTOMPADDING', (0, 1), (-1, -1), 6),
+            ('TOPPADDING', (0, 1), (-1, -1), 6),
+            ('BACKGROUND', (0, 1), (-1, -1), colors.white),
+            ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#e5e7eb')),
+            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f9fafb')])
+        ]))
+
+        story.append(items_table)
+        story.append(Spacer(1, 20))
+
+        # Summary totals at the bottom
+        story.append(Paragraph("Summary Totals", heading_style))
+
+        summary_data = [
+            ["Total Items", str(len(items))],
+            ["Total Value Paid", f"€{totals.get('valuePaid', 0):.2f}"],
+            ["Total Platinum", f"{totals.get('ptG', 0):.4f} grams"],
+            ["Total Palladium", f"{totals.get('pdG', 0):.4f} grams"],  
+            ["Total Rhodium", f"{totals.get('rhG', 0):.4f} grams"]
+        ]
+
+        summary_table = Table(summary_data, colWidths=[2*inch, 2*inch])
+        summary_table.setStyle(TableStyle([
+            ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#10b981')),
+            ('BACKGROUND', (1, 0), (1, -1), colors.HexColor('#ecfdf5')),
+            ('TEXTCOLOR', (0, 0), (0, -1), colors.white),
+            ('TEXTCOLOR', (1, 0), (1, -1), colors.HexColor('#065f46')),
+            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+            ('ALIGN', (1, 0), (1, -1), 'RIGHT'),
+            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+            ('FONTNAME', (1, 0), (1, -1), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, -1), 11),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 10),
+            ('TOPPADDING', (0, 0), (-1, -1), 10),
+            ('GRID', (0, 0), (-1, -1), 2, colors.HexColor('#065f46'))
+        ]))
+
+        story.append(summary_table)
+    else:
+        story.append(Paragraph("No items found in this basket.", styles['Normal']))
+
+    story.append(Spacer(1, 30))
+
+    # Footer
+    story.append(Paragraph(
+        f"This report was generated by Cataloro Marketplace on {datetime.now(timezone.utc).strftime('%B %d, %Y at %H:%M UTC')}.",
+        styles['Normal']
+    ))
+    story.append(Paragraph("For questions about this data, please contact support.", styles['Normal']))
+
+    doc.build(story)
@@ -0,0 +1,231 @@
+"""
+Review Service for Cataloro Marketplace
+Incrementally maintained listing rating aggregates and keyset-paginated review pages
+"""
+
+import base64
+import json
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from pymongo import UpdateOne
+
+from index_registry import ensure_collection_indexes
+
+logger = logging.getLogger(__name__)
+
+MIGRATION_NAME = "review_aggregates_v1"
+STARS = ("1", "2", "3", "4", "5")
+
+# Sort orders for review pages; every order ends in `id` so the keyset is unique
+REVIEW_SORTS = {
+    "newest": [("created_at", -1), ("id", -1)],
+    "oldest": [("created_at", 1), ("id", 1)],
+    "highest": [("rating", -1), ("created_at", -1), ("id", -1)],
+    "lowest": [("rating", 1), ("created_at", 1), ("id", 1)],
+    "helpful": [("helpful_count", -1), ("created_at", -1), ("id", -1)]
+}
+
+
+def normalize_rating(value: Any) -> Optional[int]:
+    """Whole-star rating between 1 and 5, None if the value is not a rating"""
+    try:
+        rating = int(round(float(value)))
+    except (TypeError, ValueError):
+        return None
+    return rating if 1 <= rating <= 5 else None
+
+
+def _rating_update(rating: int, delta: int) -> List[Dict[str, Any]]:
+    """
+    Update pipeline applying one review (+1) or its removal (-1) to a listing's
+    rating_sum/rating_count/rating_histogram and re-deriving average_rating and
+    review_count from them in the same atomic write.
+    """
+    return [
+        {"$set": {
+            "rating_sum": {"$add": [{"$ifNull": ["$rating_sum", 0]}, rating * delta]},
+            "rating_count": {"$max": [0, {"$add": [{"$ifNull": ["$rating_count", 0]}, delta]}]},
+            f"rating_histogram.{rating}": {
+                "$max": [0, {"$add": [{"$ifNull": [f"$rating_histogram.{rating}", 0]}, delta]}]
+            }
+        }},
+        {"$set": {
+            "review_count": "$rating_count",
+            "average_rating": {"$cond": [
+                {"$gt": ["$rating_count", 0]},
+                {"$divide": ["$rating_sum", "$rating_count"]},
+                0
+            ]}
+        }}
+    ]
+
+
+def encode_cursor(review: Dict[str, Any], sort: List[tuple]) -> str:
+    values = [review.get(field) for field, _ in sort]
+    return base64.urlsafe_b64encode(json.dumps(values, default=str).encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> Optional[list]:
+    try:
+        return json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except (ValueError, TypeError):
+        return None
+
+
+def keyset_filter(sort: List[tuple], values: list) -> Dict[str, Any]:
+    """Documents strictly after `values` in `sort` order"""
+    branches = []
+    for index, (field, direction) in enumerate(sort):
+        branch = {prev_field: values[prev_index] for prev_index, (prev_field, _) in enumerate(sort[:index])}
+        branch[field] = {"$lt" if direction < 0 else "$gt": values[index]}
+        branches.append(branch)
+    return {"$or": branches}
+
+
+class ReviewService:
+    """
+    Listings carry rating_sum, rating_count and rating_histogram.<star>, adjusted
+    atomically when a review is created or deleted, so rating maintenance and the
+    review summary never read the listing's reviews.
+    """
+
+    def __init__(self, db):
+        self.db = db
+
+    async def ensure_indexes(self):
+        await ensure_collection_indexes(self.db, "reviews")
+
+    async def create_review(self, review: Dict[str, Any]) -> Dict[str, Any]:
+        await self.db.reviews.insert_one(review)
+        await self.db.listings.update_one({"id": review["listing_id"]}, _rating_update(review["rating"], 1))
+        return review
+
+    async def delete_review(self, review_id: str) -> Optional[Dict[str, Any]]:
+        """Delete a review and take it out of its listing's aggregates"""
+        review = await self.db.reviews.find_one_and_delete({"id": review_id}, {"_id": 0})
+        if not review:
+            return None
+        rating = normalize_rating(review.get("rating"))
+        if rating:
+            await self.db.listings.update_one({"id": review["listing_id"]}, _rating_update(rating, -1))
+        await self.db.review_helpful.delete_many({"review_id": review_id})
+        return review
+
+    async def get_summary(self, listing_id: str) -> Dict[str, Any]:
+        """average_rating, total_reviews and rating_distribution from the listing aggregates"""
+        listing = await self.db.listings.find_one(
+            {"id": listing_id}, {"_id": 0, "rating_sum": 1, "rating_count": 1, "rating_histogram": 1}
+        )
+        if listing is None or "rating_count" not in listing:
+            # Listing not migrated yet (or deleted): compute once from the reviews
+            return await self._summarize(listing_id)
+
+        count = listing.get("rating_count", 0)
+        histogram = listing.get("rating_histogram", {})
+        return {
+            "average_rating": listing.get("rating_sum", 0) / count if count else 0,
+            "total_reviews": count,
+            "rating_distribution": {int(star): histogram.get(star, 0) for star in STARS}
+        }
+
+    async def _summarize(self, listing_id: str) -> Dict[str, Any]:
+        groups = await self.db.reviews.aggregate([
+            {"$match": {"listing_id": listing_id}},
+            {"$group": {"_id": "$rating", "count": {"$sum": 1}}}
+        ]).to_list(length=None)
+        distribution = {int(star): 0 for star in STARS}
+        total = rating_sum = 0
+        for group in groups:
+            rating = normalize_rating(group["_id"])
+            if rating:
+                distribution[rating] += group["count"]
+                total += group["count"]
+                rating_sum += rating * group["count"]
+        return {
+            "average_rating": rating_sum / total if total else 0,
+            "total_reviews": total,
+            "rating_distribution": distribution
+        }
+
+    async def list_reviews(
+        self, listing_id: str, sort_by: str = "newest", limit: int = 20, cursor: str = None
+    ) -> Dict[str, Any]:
+        """One page of reviews; pass next_cursor back as `cursor` for the following page"""
+        sort = REVIEW_SORTS.get(sort_by, REVIEW_SORTS["newest"])
+        query: Dict[str, Any] = {"listing_id": listing_id}
+        if cursor:
+            values = decode_cursor(cursor)
+            # Anything but a list of one value per sort field is ignored (first page)
+            if isinstance(values, list) and len(values) == len(sort):
+                query.update(keyset_filter(sort, values))
+
+        reviews = await self.db.reviews.find(query, {"_id": 0}).sort(sort).limit(limit + 1).to_list(length=limit + 1)
+        has_more = len(reviews) > limit
+        reviews = reviews[:limit]
+        return {
+            "reviews": reviews,
+            "next_cursor": encode_cursor(reviews[-1], sort) if has_more else None
+        }
+
+    async def backfill(self, batch_size: int = 500) -> Optional[Dict[str, int]]:
+        """One-time: write aggregates for every listing from a single $group over reviews"""
+        if await self.db.migrations.find_one({"name": MIGRATION_NAME}):
+            return None
+
+        per_listing: Dict[str, Dict[str, Any]] = {}
+        async for group in self.db.reviews.aggregate([
+            {"$group": {"_id": {"listing_id": "$listing_id", "rating": "$rating"}, "count": {"$sum": 1}}}
+        ], allowDiskUse=True):
+            rating = normalize_rating(group["_id"].get("rating"))
+            listing_id = group["_id"].get("listing_id")
+            if not rating or not listing_id:
+                continue
+            stats = per_listing.setdefault(listing_id, {"sum": 0, "count": 0, "histogram": {star: 0 for star in STARS}})
+            stats["sum"] += rating * group["count"]
+            stats["count"] += group["count"]
+            stats["histogram"][str(rating)] += group["count"]
+
+        operations = [
+            UpdateOne({"id": listing_id}, {"$set": {
+                "rating_sum": stats["sum"],
+                "rating_count": stats["count"],
+                "rating_histogram": stats["histogram"],
+                "review_count": stats["count"],
+                "average_rating": stats["sum"] / stats["count"]
+            }})
+            for listing_id, stats in per_listing.items()
+        ]
+        for start in range(0, len(operations), batch_size):
+            await self.db.listings.bulk_write(operations[start:start + batch_size], ordered=False)
+
+        # Listings without reviews start from zero
+        await self.db.listings.update_many(
+            {"rating_count": {"$exists": False}},
+            {"$set": {
+                "rating_sum": 0,
+                "rating_count": 0,
+                "rating_histogram": {star: 0 for star in STARS},
+                "review_count": 0,
+                "average_rating": 0
+            }}
+        )
+        await self.db.migrations.insert_one({"name": MIGRATION_NAME, "completed_at": datetime.utcnow()})
+
+        logger.info(f"⭐ Review aggregates backfilled for {len(per_listing)} listings")
+        return {"listings_with_reviews": len(per_listing)}
+
+
+# Global review service instance
+review_service = None
+
+async def init_review_service(db):
+    """Initialize review service"""
+    global review_service
+    review_service = ReviewService(db)
+    return review_service
+
+def get_review_service():
+    """Get review service instance"""
+    return review_service
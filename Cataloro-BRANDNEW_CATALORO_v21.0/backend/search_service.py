@@ -6,11 +6,12 @@ Implements advanced search, filtering, and recommendation features
 import asyncio
 import json
 import logging
-from typing import List, Dict, Optional, Any
+from typing import List, Dict, Optional, Any, TYPE_CHECKING
 from datetime import datetime
 import os
-from elasticsearch import AsyncElasticsearch
-from elasticsearch.exceptions import ConnectionError, NotFoundError
+
+if TYPE_CHECKING:
+    from elasticsearch import AsyncElasticsearch
 
 logger = logging.getLogger(__name__)
 
@@ -22,7 +23,7 @@ class SearchService:
         self.es_username = os.environ.get('ELASTICSEARCH_USERNAME', '')
         self.es_password = os.environ.get('ELASTICSEARCH_PASSWORD', '')
         
-        self.es_client: Optional[AsyncElasticsearch] = None
+        self.es_client: Optional["AsyncElasticsearch"] = None
         self.connected = False
         
         # Index names
@@ -33,6 +34,9 @@ class SearchService:
     async def connect(self):
         """Initialize Elasticsearch connection"""
         try:
+            # Imported here so loading the app does not pay for the client library
+            from elasticsearch import AsyncElasticsearch
+            
             # Configure connection
             if self.es_username and self.es_password:
                 self.es_client = AsyncElasticsearch(
@@ -630,7 +634,7 @@ search_service = SearchService()
 
 async def init_search():
     """Initialize search service"""
-    await search_service.connect()
+    return await search_service.connect()
 
 async def cleanup_search():
     """Cleanup search service"""  
@@ -0,0 +1,172 @@
+"""
+Search Token Service for Cataloro Marketplace
+Maintains the normalized search_tokens array on listings for indexed keyword matching
+"""
+
+import logging
+import re
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from pymongo import UpdateOne
+
+from index_registry import ensure_collection_indexes
+
+logger = logging.getLogger(__name__)
+
+MIGRATION_NAME = "listing_search_tokens_v1"
+
+# Fields a listing's search tokens are derived from
+TOKEN_SOURCE_FIELDS = ("title", "description", "category", "tags")
+
+STOP_WORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "in", "is", "it",
+    "of", "on", "or", "the", "to", "with", "without", "very", "this", "that"
+}
+
+_WORD_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def stem_token(token: str) -> str:
+    """Light suffix-stripping stemmer - applied identically to listings and queries"""
+    if len(token) <= 3 or token.isdigit():
+        return token
+
+    if token.endswith("ies") and len(token) > 4:
+        return token[:-3] + "y"
+    if token.endswith("sses"):
+        return token[:-2]
+    if token.endswith("ing") and len(token) > 5:
+        return token[:-3]
+    if token.endswith("ed") and len(token) > 4:
+        return token[:-2]
+    if token.endswith("es") and token[-3] in "sxz":
+        return token[:-2]
+    if token.endswith("s") and not token.endswith(("ss", "us", "is")):
+        return token[:-1]
+    return token
+
+
+def tokenize_search_text(text: Any) -> List[str]:
+    """Split text into lowercased, stemmed, de-duplicated tokens (order preserved)"""
+    if not text:
+        return []
+    if isinstance(text, (list, tuple, set)):
+        text = " ".join(str(part) for part in text if part)
+
+    tokens = []
+    seen = set()
+    for word in _WORD_PATTERN.findall(str(text).lower()):
+        if word in STOP_WORDS:
+            continue
+        token = stem_token(word)
+        if token not in seen:
+            seen.add(token)
+            tokens.append(token)
+    return tokens
+
+
+def build_search_tokens(listing: Dict) -> List[str]:
+    """Build the search_tokens array for a listing document"""
+    return tokenize_search_text([listing.get(field) for field in TOKEN_SOURCE_FIELDS])
+
+
+def build_token_query(terms: Iterable[str], match_all: bool = True) -> Dict:
+    """Build a search_tokens condition for a list of query terms/phrases"""
+    tokens = tokenize_search_text(list(terms))
+    if not tokens:
+        return {}
+    return {"search_tokens": {"$all" if match_all else "$in": tokens}}
+
+
+class SearchTokenService:
+    def __init__(self, db):
+        self.db = db
+
+    async def ensure_indexes(self):
+        """Create the multikey indexes used for token matching"""
+        await ensure_collection_indexes(self.db, "listings")
+
+    async def refresh_listing_tokens(self, listing_id: str) -> bool:
+        """Recompute tokens for a single listing from its stored fields"""
+        projection = {field: 1 for field in TOKEN_SOURCE_FIELDS}
+        listing = await self.db.listings.find_one({"id": listing_id}, projection)
+        if not listing:
+            return False
+
+        await self.db.listings.update_one(
+            {"id": listing_id},
+            {"$set": {"search_tokens": build_search_tokens(listing)}}
+        )
+        return True
+
+    async def backfill(self, batch_size: int = 500, rebuild: bool = False) -> Dict[str, int]:
+        """Populate search_tokens on listings that do not have them yet (or all, if rebuild)"""
+        query = {} if rebuild else {"search_tokens": {"$exists": False}}
+        projection = {field: 1 for field in TOKEN_SOURCE_FIELDS}
+
+        processed = 0
+        batches = 0
+        operations = []
+
+        async for listing in self.db.listings.find(query, projection):
+            operations.append(UpdateOne(
+                {"_id": listing["_id"]},
+                {"$set": {"search_tokens": build_search_tokens(listing)}}
+            ))
+            if len(operations) >= batch_size:
+                await self.db.listings.bulk_write(operations, ordered=False)
+                processed += len(operations)
+                batches += 1
+                operations = []
+
+        if operations:
+            await self.db.listings.bulk_write(operations, ordered=False)
+            processed += len(operations)
+            batches += 1
+
+        logger.info(f"🔤 Search token backfill updated {processed} listings in {batches} batches")
+        return {"updated": processed, "batches": batches}
+
+    async def migrate(self) -> Optional[Dict[str, int]]:
+        """One-time backfill for listings created before search_tokens existed"""
+        if await self.db.migrations.find_one({"name": MIGRATION_NAME}):
+            return None
+        result = await self.backfill()
+        await self.db.migrations.insert_one({"name": MIGRATION_NAME, "completed_at": datetime.utcnow(), **result})
+        return result
+
+
+
+# Global search token service instance
+search_token_service = None
+
+async def init_search_token_service(db):
+    """Initialize search token service"""
+    global search_token_service
+    search_token_service = SearchTokenService(db)
+    return search_token_service
+
+def get_search_token_service():
+    """Get search token service instance"""
+    return search_token_service
+
+
+if __name__ == "__main__":
+    import asyncio
+    import os
+    import motor.motor_asyncio
+    from dotenv import load_dotenv
+
+    load_dotenv()
+
+    async def run_backfill():
+        client = motor.motor_asyncio.AsyncIOMotorClient(os.environ.get('MONGO_URL', 'mongodb://localhost:27017'))
+        service = SearchTokenService(client.cataloro_marketplace)
+        try:
+            await service.ensure_indexes()
+            print(await service.backfill())
+        finally:
+            client.close()
+
+    asyncio.run(run_backfill())
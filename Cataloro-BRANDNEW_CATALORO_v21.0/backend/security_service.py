@@ -10,6 +10,7 @@ import logging
 import os
 import re
 import time
+from collections import OrderedDict, deque
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Any
 from slowapi import Limiter, _rate_limit_exceeded_handler
@@ -18,9 +19,60 @@ from slowapi.errors import RateLimitExceeded
 from fastapi import Request, HTTPException
 from passlib.context import CryptContext
 from jose import JWTError, jwt
+from executor_service import executor_service
 
 logger = logging.getLogger(__name__)
 
+class PrincipalCache:
+    """
+    In-process cache of authenticated user documents keyed by user id.
+    Entries expire after a short TTL and are invalidated explicitly on
+    suspend, role change and delete; revoked tokens are detected through
+    the token_version claim.
+    """
+    
+    def __init__(self, ttl: float = 60, max_entries: int = 10000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+    
+    def get(self, user_id: str) -> Optional[Dict]:
+        entry = self._entries.get(user_id)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                del self._entries[user_id]
+            self.misses += 1
+            return None
+        
+        self._entries.move_to_end(user_id)
+        self.hits += 1
+        # Shallow copy so handlers can mutate their principal freely
+        return dict(entry[1])
+    
+    def set(self, user_id: str, user: Dict):
+        self._entries[user_id] = (time.monotonic() + self.ttl, dict(user))
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+    
+    def invalidate(self, user_id: str):
+        self._entries.pop(user_id, None)
+    
+    def clear(self):
+        self._entries.clear()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "ttl_seconds": self.ttl
+        }
+
 class SecurityService:
     def __init__(self):
         # Rate limiting configuration
@@ -45,6 +97,17 @@ class SecurityService:
         self.audit_logs = []
         self.security_alerts = []
         
+        # Authenticated principal cache (see get_current_user)
+        self.principal_cache = PrincipalCache(
+            ttl=float(os.environ.get('PRINCIPAL_CACHE_TTL', 60))
+        )
+        
+        # Batched audit writer for high-frequency events (admin access)
+        self._pending_audit_events = deque(maxlen=10000)
+        self._audit_db = None
+        self._audit_task: Optional[asyncio.Task] = None
+        self.AUDIT_FLUSH_INTERVAL = 2  # seconds
+        
     def setup_rate_limiting(self, app):
         """Setup rate limiting for FastAPI app"""
         app.state.limiter = self.limiter
@@ -59,6 +122,14 @@ class SecurityService:
         """Verify a password against its hash"""
         return self.pwd_context.verify(plain_password, hashed_password)
     
+    async def hash_password_async(self, password: str) -> str:
+        """bcrypt hash on the executor thread pool (bcrypt releases the GIL)"""
+        return await executor_service.run_in_thread(self.pwd_context.hash, password)
+    
+    async def verify_password_async(self, plain_password: str, hashed_password: str) -> bool:
+        """bcrypt verify on the executor thread pool"""
+        return await executor_service.run_in_thread(self.pwd_context.verify, plain_password, hashed_password)
+    
     def create_access_token(self, data: dict, expires_delta: Optional[timedelta] = None) -> str:
         """Create JWT access token"""
         to_encode = data.copy()
@@ -251,6 +322,78 @@ class SecurityService:
         if len(self.audit_logs) > 1000:
             self.audit_logs = self.audit_logs[-1000:]
     
+    def queue_audit_event(
+        self,
+        user_id: str,
+        action: str,
+        resource: str,
+        details: Dict = None
+    ):
+        """Queue an audit event for the batched writer (cheap enough for every request)"""
+        if self._audit_task is None:
+            # Writer not running (scripts, tests) - record synchronously
+            self.log_audit_event(user_id=user_id, action=action, resource=resource, details=details)
+            return
+        self._pending_audit_events.append((time.time(), user_id, action, resource, details))
+    
+    async def flush_audit_events(self) -> int:
+        """Materialize queued audit events and persist them in one batch"""
+        if not self._pending_audit_events:
+            return 0
+        
+        entries = []
+        while self._pending_audit_events:
+            queued_at, user_id, action, resource, details = self._pending_audit_events.popleft()
+            entries.append({
+                "timestamp": datetime.utcfromtimestamp(queued_at).isoformat(),
+                "user_id": user_id,
+                "action": action,
+                "resource": resource,
+                "details": details or {},
+                "ip_address": None,
+                "user_agent": None,
+                "id": hashlib.md5(f"{user_id}{action}{queued_at}".encode()).hexdigest()
+            })
+        
+        self.audit_logs.extend(entries)
+        if len(self.audit_logs) > 1000:
+            self.audit_logs = self.audit_logs[-1000:]
+        
+        if self._audit_db is not None:
+            try:
+                # insert_many adds _id to the dicts - persist copies
+                await self._audit_db.audit_logs.insert_many([dict(entry) for entry in entries], ordered=False)
+            except Exception as e:
+                logger.error(f"Failed to persist audit batch: {e}")
+        
+        logger.info(f"AUDIT: flushed {len(entries)} batched events")
+        return len(entries)
+    
+    async def _audit_flush_loop(self):
+        while True:
+            await asyncio.sleep(self.AUDIT_FLUSH_INTERVAL)
+            try:
+                await self.flush_audit_events()
+            except Exception as e:
+                logger.error(f"Audit writer error: {e}")
+    
+    def start_audit_writer(self, db=None):
+        """Start the background audit writer; events are persisted to db.audit_logs when given"""
+        self._audit_db = db
+        if self._audit_task is None or self._audit_task.done():
+            self._audit_task = asyncio.create_task(self._audit_flush_loop())
+    
+    async def stop_audit_writer(self):
+        """Stop the audit writer after a final flush"""
+        if self._audit_task:
+            self._audit_task.cancel()
+            try:
+                await self._audit_task
+            except asyncio.CancelledError:
+                pass
+            self._audit_task = None
+        await self.flush_audit_events()
+    
     def create_security_alert(self, title: str, description: str, severity: str = "medium"):
         """Create a security alert"""
         alert = {
@@ -296,9 +439,11 @@ class SecurityService:
             },
             "audit_logs": {
                 "total_entries": len(self.audit_logs),
+                "pending_batched_entries": len(self._pending_audit_events),
                 "recent_entries_last_hour": len([log for log in self.audit_logs 
                                                if (current_time - datetime.fromisoformat(log["timestamp"]).timestamp()) < 3600])
             },
+            "principal_cache": self.principal_cache.get_stats(),
             "security_status": self._calculate_security_status()
         }
     
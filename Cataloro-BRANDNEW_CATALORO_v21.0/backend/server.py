@@ -3,37 +3,56 @@ CATALORO - Marketplace Backend Server
 Scalable FastAPI backend with MongoDB integration
 """
 
-from fastapi import FastAPI, HTTPException, Depends, File, UploadFile, Form, Request
+import time
+# Reference point for the import time reported by /api/ready
+_IMPORT_STARTED = time.perf_counter()
+
+from fastapi import FastAPI, HTTPException, Depends, File, UploadFile, Form, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
+from fastapi.encoders import jsonable_encoder
 from fastapi.staticfiles import StaticFiles
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from pydantic import BaseModel
 import os
 import uuid
+import asyncio
 import json
-import pandas as pd
-import io
 import base64
-import time
 import shutil
 from datetime import datetime, timedelta, timezone
 import pytz
 from typing import List, Optional, Dict, Any
 import motor.motor_asyncio
 from bson import ObjectId
+from pymongo import UpdateOne, ReturnDocument
+from pymongo.errors import BulkWriteError
 from dotenv import load_dotenv
-from emergentintegrations.llm.chat import LlmChat, UserMessage
 import logging
 from cache_service import cache_service, init_cache, cleanup_cache
 from search_service import search_service, init_search, cleanup_search
 from security_service import security_service, get_client_ip
 from monitoring_service import monitoring_service, MonitoringMiddleware
+from db_instrumentation import instrument_database
 from analytics_service import create_analytics_service
-from websocket_service import init_websocket_service, get_websocket_service
-from multicurrency_service import init_multicurrency_service, get_multicurrency_service
+from websocket_service import init_websocket_service, get_websocket_service, cleanup_websocket_service
+from multicurrency_service import init_multicurrency_service, get_multicurrency_service, cleanup_multicurrency_service
 from escrow_service import init_escrow_service, get_escrow_service
 from ai_recommendation_service import init_ai_recommendation_service, get_ai_recommendation_service
+from llm_gateway_service import llm_gateway_service
+from search_token_service import init_search_token_service, build_search_tokens, build_token_query, TOKEN_SOURCE_FIELDS
+from notification_service import init_notification_service
+from conversation_service import init_conversation_service
+from menu_snapshot_service import init_menu_snapshot_service, resolve_menu_role
+from user_id_resolver_service import init_user_id_resolver
+from executor_service import executor_service, init_executor_service, cleanup_executor_service, ExecutorSaturated
+from catalyst_import import parse_catalyst_workbook, OPTIONAL_COLUMNS as CATALYST_OPTIONAL_COLUMNS
+from export_job_service import init_export_job_service, ReportType
+from pdf_reports import render_comprehensive_pdf, render_basket_pdf
+from counter_service import init_counter_service
+from review_service import init_review_service, normalize_rating
+from startup_service import startup_coordinator, StartupStep
+from index_registry import init_index_registry
 
 # Load environment variables
 load_dotenv()
@@ -97,15 +116,19 @@ app.mount("/static", StaticFiles(directory="static"), name="static")
 # MongoDB Connection
 MONGO_URL = os.environ.get('MONGO_URL', 'mongodb://localhost:27017')
 client = motor.motor_asyncio.AsyncIOMotorClient(MONGO_URL)
-db = client.cataloro_marketplace
+# Every collection operation is timed per query shape for the monitoring dashboard
+db = instrument_database(
+    client.cataloro_marketplace,
+    monitoring_service.record_database_operation,
+    enabled=os.environ.get('DB_INSTRUMENTATION', 'true').lower() == 'true'
+)
 
 # Authentication Dependencies
 security = HTTPBearer()
 
-async def get_current_user_token(credentials: HTTPAuthorizationCredentials = Depends(security)) -> str:
-    """Extract and validate JWT token from request"""
-    token = credentials.credentials
-    payload = security_service.verify_token(token)
+async def get_token_payload(credentials: HTTPAuthorizationCredentials = Depends(security)) -> dict:
+    """Extract and validate JWT token from request (decoded once per request)"""
+    payload = security_service.verify_token(credentials.credentials)
     
     if not payload:
         raise HTTPException(
@@ -113,19 +136,10 @@ async def get_current_user_token(credentials: HTTPAuthorizationCredentials = Dep
             detail="Invalid or expired token"
         )
     
-    return token
+    return payload
 
-async def get_current_user(token: str = Depends(get_current_user_token)) -> dict:
+async def get_current_user(payload: dict = Depends(get_token_payload)) -> dict:
     """Get current user information from JWT token"""
-    payload = security_service.verify_token(token)
-    
-    if not payload:
-        raise HTTPException(
-            status_code=401,
-            detail="Invalid or expired token"
-        )
-    
-    # Get user from database to ensure they still exist and are active
     user_id = payload.get("user_id")
     if not user_id:
         raise HTTPException(
@@ -133,11 +147,22 @@ async def get_current_user(token: str = Depends(get_current_user_token)) -> dict
             detail="Invalid token: missing user_id"
         )
     
-    user = await db.users.find_one({"id": user_id})
-    if not user:
+    # Serve the principal from the in-process cache; fall back to the database
+    user = security_service.principal_cache.get(user_id)
+    if user is None:
+        user = await db.users.find_one({"id": user_id})
+        if not user:
+            raise HTTPException(
+                status_code=401,
+                detail="User not found"
+            )
+        security_service.principal_cache.set(user_id, user)
+    
+    # Tokens issued before a revocation (e.g. suspension) carry an older version
+    if payload.get("tv", 0) != user.get("token_version", 0):
         raise HTTPException(
             status_code=401,
-            detail="User not found"
+            detail="Token has been revoked"
         )
     
     if not user.get("is_active", True):
@@ -148,6 +173,26 @@ async def get_current_user(token: str = Depends(get_current_user_token)) -> dict
     
     return user
 
+async def invalidate_user_principal(user_id: str, revoke_tokens: bool = False):
+    """
+    Drop a user's cached principal after suspend, role change or delete.
+    With revoke_tokens the token_version is bumped so outstanding tokens stop working.
+    """
+    if revoke_tokens:
+        await db.users.update_one({"id": user_id}, {"$inc": {"token_version": 1}})
+    security_service.principal_cache.invalidate(user_id)
+    # Cached seller dashboards skip the active-status check, so drop them too
+    await invalidate_seller_dashboard(user_id)
+
+async def invalidate_user_principals(user_ids: List[str], *cache_prefixes: str):
+    """
+    invalidate_user_principal for many canonical user ids: one in-memory pass and a
+    single Redis DEL for their seller dashboards plus any other per-user cache_prefixes
+    """
+    for user_id in user_ids:
+        security_service.principal_cache.invalidate(user_id)
+    await cache_service.invalidate_users(user_ids, "seller_dashboard", *cache_prefixes)
+
 async def require_admin_role(current_user: dict = Depends(get_current_user)) -> dict:
     """Require admin role for accessing admin endpoints"""
     user_role = current_user.get("role")
@@ -160,8 +205,8 @@ async def require_admin_role(current_user: dict = Depends(get_current_user)) ->
     )
     
     if not is_admin:
-        # Log unauthorized access attempt
-        security_service.log_audit_event(
+        # Log unauthorized access attempt (batched, written asynchronously)
+        security_service.queue_audit_event(
             user_id=current_user.get("id", "unknown"),
             action="UNAUTHORIZED_ADMIN_ACCESS",
             resource="admin_endpoints",
@@ -177,8 +222,8 @@ async def require_admin_role(current_user: dict = Depends(get_current_user)) ->
             detail="Admin access required"
         )
     
-    # Log successful admin access
-    security_service.log_audit_event(
+    # Log successful admin access (batched, written asynchronously)
+    security_service.queue_audit_event(
         user_id=current_user.get("id"),
         action="ADMIN_ACCESS",
         resource="admin_endpoints",
@@ -194,49 +239,124 @@ async def require_admin_role(current_user: dict = Depends(get_current_user)) ->
 # Startup and Shutdown Events
 @app.on_event("startup")
 async def startup_event():
-    """Initialize services on startup"""
+    """
+    Initialize services on startup. In-process services are constructed first;
+    connections then run concurrently under timeouts, while one-time migrations,
+    search and index builds finish in the background. /api/ready reports the
+    state of every component.
+    """
     logger.info("🚀 Starting Cataloro Marketplace API...")
+    startup_coordinator.begin(_IMPORT_STARTED)
+    
+    global counter_aggregator, user_id_resolver, analytics_service, notification_service
+    global menu_snapshot_service, export_job_service, review_service, conversation_service
+    global escrow_service, ai_recommendation_service
+    global search_token_service, index_registry
     
-    # Initialize cache service
-    await init_cache()
+    # Offload pools and event loop lag monitor
+    init_executor_service()
     
-    # Initialize search service
-    await init_search()
+    # Write-behind view/impression/click counters
+    counter_aggregator = await init_counter_service(db)
     
-    # Initialize analytics service
-    global analytics_service
+    # Start batched audit writer
+    security_service.start_audit_writer(db)
+    
+    # Services whose init only constructs objects
+    user_id_resolver = await init_user_id_resolver(db)
     analytics_service = await create_analytics_service(db)
-    logger.info("✅ Analytics service initialized")
+    notification_service = await init_notification_service(db)
+    menu_snapshot_service = await init_menu_snapshot_service(db)
+    export_job_service = await init_export_job_service(db)
+    register_export_reports()
+    export_job_service.start()
+    review_service = await init_review_service(db)
+    conversation_service = await init_conversation_service(db)
+    escrow_service = await init_escrow_service(db)
+    ai_recommendation_service = await init_ai_recommendation_service(db)
+    search_token_service = await init_search_token_service(db)
+    index_registry = await init_index_registry(db)
     
-    # Initialize Phase 5 services
-    global websocket_service, multicurrency_service, escrow_service, ai_recommendation_service
+    if not os.environ.get('EMERGENT_LLM_KEY'):
+        logger.warning("⚠️ AI service not configured - search will use fallback mode")
     
-    websocket_service = await init_websocket_service(db)
-    logger.info("✅ WebSocket service initialized")
+    async def ping_mongodb():
+        await client.admin.command('ping')
     
-    multicurrency_service = await init_multicurrency_service(db)
-    logger.info("✅ Multi-currency service initialized")
+    async def start_websocket():
+        global websocket_service
+        websocket_service = await init_websocket_service(db)
     
-    escrow_service = await init_escrow_service(db)
-    logger.info("✅ Escrow service initialized")
+    async def start_multicurrency():
+        global multicurrency_service
+        multicurrency_service = await init_multicurrency_service(db)
     
-    ai_recommendation_service = await init_ai_recommendation_service(db)
-    logger.info("✅ AI Recommendation service initialized")
+    async def migrate_user_ids():
+        # Canonical user id resolution (one-time alias migration on first boot)
+        await user_id_resolver.ensure_indexes()
+        migration = await user_id_resolver.migrate()
+        if migration:
+            logger.info(f"✅ User id migration completed: {migration}")
     
-    # Run database optimization (indexes) on startup
-    try:
-        from optimize_database import create_database_indexes
-        await create_database_indexes()
-        logger.info("✅ Database indexes optimized")
-    except Exception as e:
-        logger.warning(f"⚠️ Database optimization skipped: {e}")
+    async def backfill_reviews():
+        await review_service.ensure_indexes()
+        backfill = await review_service.backfill()
+        if backfill:
+            logger.info(f"✅ Review aggregates backfilled: {backfill}")
+    
+    async def backfill_conversations():
+        # Inbox, threaded reads and presence partners read conversations, not legacy messages
+        await conversation_service.ensure_indexes()
+        backfill = await conversation_service.migrate()
+        if backfill:
+            logger.info(f"✅ Conversations backfilled: {backfill}")
+    
+    async def backfill_search_tokens():
+        # Listings created before search_tokens are invisible to keyword search until this runs
+        backfill = await search_token_service.migrate()
+        if backfill:
+            logger.info(f"✅ Search tokens backfilled: {backfill}")
+    
+    # Request handlers depend on these, so startup waits for them
+    await startup_coordinator.run([
+        StartupStep("mongodb", ping_mongodb, 5),
+        StartupStep("cache", init_cache, 5),
+        StartupStep("websocket", start_websocket, 10),
+        StartupStep("multicurrency", start_multicurrency, 10)
+    ])
+    if startup_coordinator.components["mongodb"]["status"] != "ready":
+        logger.error(f"❌ Failed to connect to MongoDB: {startup_coordinator.components['mongodb']['error']}")
+        raise RuntimeError("MongoDB is not reachable")
+    
+    startup_coordinator.run_in_background([
+        # One-time migrations can take minutes on first boot; they stay critical, so
+        # /api/ready reports 503 until they are done (and keeps doing so if one fails)
+        # while the server already listens. No retries: a timeout cancels a migration
+        # partway and a rerun would start over.
+        StartupStep("user_id_aliases", migrate_user_ids, 300, retries=0),
+        StartupStep("review_aggregates", backfill_reviews, 300, retries=0),
+        StartupStep("conversations", backfill_conversations, 300, retries=0),
+        # Search falls back to the database and existing indexes keep serving meanwhile;
+        # the registry sync only builds indexes that are missing
+        StartupStep("search", init_search, 30, critical=False),
+        StartupStep("indexes", index_registry.sync, 600, critical=False),
+        StartupStep("search_tokens", backfill_search_tokens, 1800, critical=False, retries=0)
+    ])
+    startup_coordinator.finish()
 
 @app.on_event("shutdown") 
 async def shutdown_event():
     """Cleanup on shutdown"""
     logger.info("🛑 Shutting down Cataloro Marketplace API...")
+    await startup_coordinator.stop()
     await cleanup_cache()
     await cleanup_search()
+    await cleanup_multicurrency_service()
+    await cleanup_websocket_service()
+    await security_service.stop_audit_writer()
+    await export_job_service.stop()
+    await counter_aggregator.stop()
+    await cleanup_executor_service()
 
 # Pydantic Models
 class User(BaseModel):
@@ -390,15 +510,8 @@ async def check_user_active_status(user_id: str) -> dict:
     Utility function to check if a user exists and is active.
     Returns the user document if active, raises HTTPException if suspended or not found.
     """
-    # Try to find user by id field first, then by _id
-    user = await db.users.find_one({"id": user_id})
-    if not user:
-        # Try with ObjectId for backward compatibility
-        try:
-            from bson import ObjectId
-            user = await db.users.find_one({"_id": ObjectId(user_id)})
-        except:
-            pass
+    # Legacy ids are canonicalized through the alias table, so this is one indexed read
+    user = await db.users.find_one({"id": await resolve_user_id(user_id)})
     
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
@@ -412,6 +525,73 @@ async def check_user_active_status(user_id: str) -> dict:
     
     return user
 
+async def fetch_docs_by_ids(collection, ids, projection: dict = None) -> Dict[str, dict]:
+    """
+    Resolve a page's worth of ids in one projected $in query (plus one ObjectId
+    fallback query for legacy documents) and return them keyed by the requested id.
+    """
+    ids = {doc_id for doc_id in ids if doc_id}
+    if not ids:
+        return {}
+    
+    if projection is not None:
+        projection = {**projection, "id": 1}
+    
+    docs = await collection.find({"id": {"$in": list(ids)}}, projection).to_list(length=None)
+    by_id = {doc["id"]: doc for doc in docs}
+    
+    # Legacy documents are addressed by their ObjectId string
+    missing = ids - set(by_id)
+    oid_list = []
+    for doc_id in missing:
+        try:
+            oid_list.append(ObjectId(doc_id))
+        except Exception:
+            continue
+    if oid_list:
+        for doc in await collection.find({"_id": {"$in": oid_list}}, projection).to_list(length=None):
+            by_id[str(doc["_id"])] = doc
+    
+    return by_id
+
+async def resolve_user_id(user_id: str) -> str:
+    """Canonical users.id for a possibly legacy user id (ObjectId string or historical alias)"""
+    return await user_id_resolver.resolve(user_id)
+
+async def fetch_users_by_ids(user_ids, projection: dict = None) -> Dict[str, dict]:
+    """Bulk user lookup for enriching result pages, keyed by the ids as requested"""
+    canonical = await user_id_resolver.resolve_many(user_ids)
+    if projection is not None:
+        projection = {**projection, "id": 1}
+    
+    users = await db.users.find({"id": {"$in": list(set(canonical.values()))}}, projection).to_list(length=None)
+    users_by_id = {user["id"]: user for user in users}
+    return {requested: users_by_id[cid] for requested, cid in canonical.items() if cid in users_by_id}
+
+async def fetch_listings_by_ids(listing_ids, projection: dict = None) -> Dict[str, dict]:
+    """Bulk listing lookup for enriching result pages"""
+    return await fetch_docs_by_ids(db.listings, listing_ids, projection)
+
+async def resolve_display_currency(currency: Optional[str], user_id: Optional[str]) -> Optional[str]:
+    """
+    Pick the display currency for listing prices: explicit parameter first,
+    then the user's (cached) preference. Returns None when no conversion is wanted.
+    """
+    currency_service = get_multicurrency_service()
+    if not currency_service:
+        return None
+    
+    if currency:
+        currency_code = currency.upper()
+        if currency_code not in currency_service.supported_currencies:
+            raise HTTPException(status_code=400, detail=f"Unsupported currency: {currency}")
+        return currency_code
+    
+    if user_id:
+        return await currency_service.get_user_preferred_currency(user_id)
+    
+    return None
+
 async def trigger_system_notifications(user_id: str, event_type: str):
     """Trigger system notifications based on user events"""
     try:
@@ -442,11 +622,8 @@ async def trigger_system_notifications(user_id: str, event_type: str):
             print(f"DEBUG: System notification triggered for user {user_id}: {sys_notif.get('title')} - {sys_notif.get('message')}")
             # No database insertion - system notifications are fetched directly from system_notifications collection
             
-            # Update display count
-            await db.system_notifications.update_one(
-                {"id": sys_notif.get("id")},
-                {"$inc": {"display_count": 1}}
-            )
+            # Update display count (write-behind)
+            counter_aggregator.increment("system_notifications", sys_notif.get("id"), "display_count")
             
             print(f"DEBUG: System notification created successfully for user {user_id}")
             
@@ -477,7 +654,7 @@ async def create_listing_expiration_notification(listing_id: str, seller_id: str
             "winning_bid_amount": winning_bid_amount
         }
         
-        await db.user_notifications.insert_one(notification)
+        await notification_service.notify(notification)
         print(f"DEBUG: Created listing expiration notification for seller {seller_id}")
         
     except Exception as e:
@@ -488,6 +665,12 @@ async def create_listing_expiration_notification(listing_id: str, seller_id: str
 async def health_check():
     return {"status": "healthy", "app": "Cataloro Marketplace", "version": "1.0.0"}
 
+@app.get("/api/ready")
+async def readiness_check():
+    """Readiness probe: 200 once every critical startup component is up, 503 before that"""
+    status = startup_coordinator.get_status()
+    return JSONResponse(status_code=200 if status["ready"] else 503, content=status)
+
 @app.get("/api/placeholder-image.jpg")
 @app.head("/api/placeholder-image.jpg")
 async def get_placeholder_image():
@@ -509,6 +692,9 @@ async def get_placeholder_image():
         }
     )
 
+# Larger base64 payloads are decoded on the thread pool instead of the event loop
+THUMBNAIL_INLINE_DECODE_LIMIT = 64 * 1024
+
 @app.get("/api/listings/{listing_id}/thumbnail/{image_index}")
 @app.head("/api/listings/{listing_id}/thumbnail/{image_index}")
 async def get_listing_thumbnail(listing_id: str, image_index: int):
@@ -535,7 +721,10 @@ async def get_listing_thumbnail(listing_id: str, image_index: int):
         try:
             # Parse data URL: data:image/jpeg;base64,<data>
             header, data = image.split(',', 1)
-            image_data = base64.b64decode(data)
+            if len(data) > THUMBNAIL_INLINE_DECODE_LIMIT:
+                image_data = await executor_service.run_in_thread(base64.b64decode, data)
+            else:
+                image_data = base64.b64decode(data)
             
             # Determine content type from header
             content_type = "image/jpeg"  # default
@@ -624,6 +813,26 @@ async def clear_all_cache(current_user: dict = Depends(require_admin_role)):
             "cache_status": await cache_service.health_check()
         }
 
+@app.get("/api/admin/database/indexes")
+async def get_database_indexes(current_user: dict = Depends(require_admin_role), min_age_hours: int = 24):
+    """Index registry diff, the last startup sync and indexes unused per $indexStats"""
+    try:
+        return {
+            "last_sync": index_registry.last_sync,
+            "diff": await index_registry.diff(),
+            "usage": await index_registry.usage_report(max(0, min_age_hours))
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to inspect indexes: {str(e)}")
+
+@app.post("/api/admin/database/indexes/sync")
+async def sync_database_indexes(current_user: dict = Depends(require_admin_role)):
+    """Build any registry index the database is missing"""
+    try:
+        return {"collections": await index_registry.sync()}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to sync indexes: {str(e)}")
+
 @app.get("/api/admin/performance")
 async def get_performance_metrics(current_user: dict = Depends(require_admin_role)):
     """Get performance metrics and optimization status"""
@@ -685,6 +894,10 @@ async def get_performance_metrics(current_user: dict = Depends(require_admin_rol
                 "forecasting_available": True,
                 "business_intelligence": "enabled"
             },
+            "ai_gateway": llm_gateway_service.get_stats(),
+            "executors": executor_service.get_stats(),
+            "exports": export_job_service.get_stats(),
+            "counters": counter_aggregator.get_stats(),
             "phase5_services": {
                 "websocket": "enabled" if websocket_service else "disabled",
                 "multicurrency": "enabled" if multicurrency_service else "disabled", 
@@ -796,7 +1009,7 @@ async def register_user(request: Request, user_data: dict):
             "registration_user_id": user_id,
             "registration_user_role": user_role
         }
-        await db.user_notifications.insert_one(admin_notification)
+        await notification_service.notify(admin_notification)
     
     # Trigger system notifications for first login event
     await trigger_system_notifications(user_id, "first_login")
@@ -1083,7 +1296,8 @@ async def login_user(request: Request, credentials: dict):
         "user_id": user_id,
         "email": email,
         "role": role,
-        "user_role": user_role
+        "user_role": user_role,
+        "tv": serialized_user.get("token_version", 0) if serialized_user else 0
     }
     access_token = security_service.create_access_token(token_data)
     
@@ -1193,34 +1407,19 @@ async def check_username_availability(username: str):
 async def approve_user(user_id: str):
     """Approve user registration"""
     try:
-        # Update user status to approved - try UUID id field first, then ObjectId
+        user_id = await resolve_user_id(user_id)
+        
+        # Update user status to approved
         result = await db.users.update_one(
             {"id": user_id},
             {"$set": {"registration_status": "Approved"}}
         )
         
-        # If not found, try by ObjectId (for API compatibility)
-        if result.matched_count == 0:
-            try:
-                from bson import ObjectId
-                result = await db.users.update_one(
-                    {"_id": ObjectId(user_id)},
-                    {"$set": {"registration_status": "Approved"}}
-                )
-            except:
-                pass
-        
         if result.matched_count == 0:
             raise HTTPException(status_code=404, detail="User not found")
         
-        # Get user data for notification - try both ID formats
+        # Get user data for notification
         user = await db.users.find_one({"id": user_id})
-        if not user:
-            try:
-                from bson import ObjectId
-                user = await db.users.find_one({"_id": ObjectId(user_id)})
-            except:
-                pass
         
         if user:
             # Send approval notification to user
@@ -1233,7 +1432,7 @@ async def approve_user(user_id: str):
                 "created_at": datetime.now(pytz.timezone('Europe/Berlin')).isoformat(),
                 "id": str(uuid.uuid4())
             }
-            await db.user_notifications.insert_one(approval_notification)
+            await notification_service.notify(approval_notification)
         
         return {"message": "User approved successfully"}
     except Exception as e:
@@ -1243,36 +1442,21 @@ async def approve_user(user_id: str):
 async def reject_user(user_id: str, rejection_data: dict = None):
     """Reject user registration"""
     try:
+        user_id = await resolve_user_id(user_id)
+        
         reason = rejection_data.get("reason", "No reason provided") if rejection_data else "No reason provided"
         
-        # Update user status to rejected - try UUID id field first, then ObjectId
+        # Update user status to rejected
         result = await db.users.update_one(
             {"id": user_id},
             {"$set": {"registration_status": "Rejected"}}
         )
         
-        # If not found, try by ObjectId (for API compatibility)
-        if result.matched_count == 0:
-            try:
-                from bson import ObjectId
-                result = await db.users.update_one(
-                    {"_id": ObjectId(user_id)},
-                    {"$set": {"registration_status": "Rejected"}}
-                )
-            except:
-                pass
-        
         if result.matched_count == 0:
             raise HTTPException(status_code=404, detail="User not found")
         
-        # Get user data for notification - try both ID formats
+        # Get user data for notification
         user = await db.users.find_one({"id": user_id})
-        if not user:
-            try:
-                from bson import ObjectId
-                user = await db.users.find_one({"_id": ObjectId(user_id)})
-            except:
-                pass
         
         if user:
             # Send rejection notification to user
@@ -1285,7 +1469,7 @@ async def reject_user(user_id: str, rejection_data: dict = None):
                 "created_at": datetime.now(pytz.timezone('Europe/Berlin')).isoformat(),
                 "id": str(uuid.uuid4())
             }
-            await db.user_notifications.insert_one(rejection_notification)
+            await notification_service.notify(rejection_notification)
         
         return {"message": "User rejected successfully"}
     except Exception as e:
@@ -1295,6 +1479,7 @@ async def reject_user(user_id: str, rejection_data: dict = None):
 async def update_user_role(user_id: str, role_data: dict):
     """Update user role and badge"""
     try:
+        user_id = await resolve_user_id(user_id)
         new_role = role_data.get("user_role")
         if new_role not in ["User-Seller", "User-Buyer", "Admin", "Admin-Manager"]:
             raise HTTPException(status_code=400, detail="Invalid user role")
@@ -1324,6 +1509,8 @@ async def update_user_role(user_id: str, role_data: dict):
         if result.matched_count == 0:
             raise HTTPException(status_code=404, detail="User not found")
         
+        await invalidate_user_principal(user_id)
+        
         # Get user data for notification
         user = await db.users.find_one({"id": user_id})
         if user:
@@ -1337,7 +1524,7 @@ async def update_user_role(user_id: str, role_data: dict):
                 "created_at": datetime.now(pytz.timezone('Europe/Berlin')).isoformat(),
                 "id": str(uuid.uuid4())
             }
-            await db.user_notifications.insert_one(role_notification)
+            await notification_service.notify(role_notification)
         
         return {"message": "User role updated successfully"}
     except Exception as e:
@@ -1347,34 +1534,20 @@ async def update_user_role(user_id: str, role_data: dict):
 async def activate_user(user_id: str):
     """Activate a user account"""
     try:
-        # Activate user - try UUID id field first, then ObjectId
+        user_id = await resolve_user_id(user_id)
+        
+        # Activate user
         result = await db.users.update_one(
             {"id": user_id},
             {"$set": {"is_active": True}}
         )
         
-        if result.matched_count == 0:
-            # Try with ObjectId for backward compatibility
-            try:
-                from bson import ObjectId
-                result = await db.users.update_one(
-                    {"_id": ObjectId(user_id)},
-                    {"$set": {"is_active": True}}
-                )
-            except:
-                pass
-        
         if result.matched_count > 0:
             # Get updated user
             user = await db.users.find_one({"id": user_id})
-            if not user:
-                try:
-                    from bson import ObjectId
-                    user = await db.users.find_one({"_id": ObjectId(user_id)})
-                    if user:
-                        user['id'] = str(user['_id'])
-                except:
-                    pass
+            
+            if user:
+                await invalidate_user_principal(user.get("id", user_id))
             
             if user and '_id' in user:
                 del user['_id']
@@ -1393,34 +1566,20 @@ async def activate_user(user_id: str):
 async def suspend_user(user_id: str):
     """Suspend a user account"""
     try:
-        # Suspend user - try UUID id field first, then ObjectId
+        user_id = await resolve_user_id(user_id)
+        
+        # Suspend user and revoke outstanding tokens
         result = await db.users.update_one(
             {"id": user_id},
-            {"$set": {"is_active": False}}
+            {"$set": {"is_active": False}, "$inc": {"token_version": 1}}
         )
         
-        if result.matched_count == 0:
-            # Try with ObjectId for backward compatibility
-            try:
-                from bson import ObjectId
-                result = await db.users.update_one(
-                    {"_id": ObjectId(user_id)},
-                    {"$set": {"is_active": False}}
-                )
-            except:
-                pass
-        
         if result.matched_count > 0:
             # Get updated user
             user = await db.users.find_one({"id": user_id})
-            if not user:
-                try:
-                    from bson import ObjectId
-                    user = await db.users.find_one({"_id": ObjectId(user_id)})
-                    if user:
-                        user['id'] = str(user['_id'])
-                except:
-                    pass
+            
+            if user:
+                await invalidate_user_principal(user.get("id", user_id))
             
             if user and '_id' in user:
                 del user['_id']
@@ -1514,9 +1673,12 @@ async def browse_listings(
     status: str = "active", 
     limit: int = 50, 
     user_id: str = None,
-    bid_filter: str = "all"  # New filter: "all", "placed_bid", "not_placed_bid", "own_listings"
+    bid_filter: str = "all",  # New filter: "all", "placed_bid", "not_placed_bid", "own_listings"
+    currency: str = None  # Display currency (defaults to the user's preferred currency)
 ):
     """Browse available listings with enhanced filtering options"""
+    display_currency = await resolve_display_currency(currency, user_id)
+    
     try:
         logger.info(f"📋 Browse request - status: {status}, bid_filter: {bid_filter}, user_id: {user_id}")
         
@@ -1560,6 +1722,9 @@ async def browse_listings(
                               and l.get('seller_id') != user_id]
                     logger.info(f"📋 After not_placed_bid filter: {len(listings)} listings")
         
+        # Cached id set, so flagging favorites costs no query per listing
+        favorite_ids = await get_favorite_ids(user_id) if user_id else set()
+        
         # Simple processing - minimal enrichment
         for listing in listings:
             # Clean up MongoDB _id
@@ -1568,6 +1733,8 @@ async def browse_listings(
                     listing['id'] = str(listing['_id'])
                 del listing['_id']
             
+            listing['is_favorited'] = listing.get('id') in favorite_ids
+            
             # CRITICAL: Optimize images for browse view performance
             if listing.get('images'):
                 optimized_images = []
@@ -1684,6 +1851,10 @@ async def browse_listings(
             if not listing.get('created_at'):
                 listing['created_at'] = datetime.utcnow().isoformat()
         
+        # Server-side display prices from one shared rate snapshot
+        if display_currency:
+            get_multicurrency_service().apply_display_prices(listings, display_currency)
+        
         logger.info(f"📋 Simple optimized returned {len(listings)} listings (without heavy images)")
         return listings
         
@@ -1717,9 +1888,13 @@ async def advanced_search_listings(
     status: str = "",  # Status filter (active, pending, expired, sold, draft)
     sort_by: str = "relevance",  # Sort by: relevance, price_low, price_high, newest, oldest
     page: int = 1,  # Page number
-    limit: int = 20  # Results per page
+    limit: int = 20,  # Results per page
+    currency: str = None,  # Display currency (defaults to the user's preferred currency)
+    user_id: str = None
 ):
     """Advanced search with Elasticsearch or fallback to database search"""
+    display_currency = await resolve_display_currency(currency, user_id)
+    
     try:
         # Calculate pagination
         from_ = (page - 1) * limit
@@ -1739,6 +1914,9 @@ async def advanced_search_listings(
         )
         
         if search_results.get("hits"):
+            if display_currency:
+                get_multicurrency_service().apply_display_prices(search_results["hits"], display_currency)
+            
             return {
                 "results": search_results["hits"],
                 "total": search_results["total"],
@@ -1746,6 +1924,7 @@ async def advanced_search_listings(
                 "limit": limit,
                 "took": search_results["took"],
                 "aggregations": search_results.get("aggregations", {}),
+                "display_currency": display_currency,
                 "search_engine": "elasticsearch"
             }
         
@@ -1829,6 +2008,9 @@ async def advanced_search_listings(
             
             enriched_listings.append(listing)
         
+        if display_currency:
+            get_multicurrency_service().apply_display_prices(enriched_listings, display_currency)
+        
         return {
             "results": enriched_listings,
             "total": total_count,
@@ -1836,6 +2018,7 @@ async def advanced_search_listings(
             "limit": limit,
             "took": 0,
             "aggregations": {},
+            "display_currency": display_currency,
             "search_engine": "database_fallback"
         }
         
@@ -1959,22 +2142,62 @@ async def get_similar_listings(listing_id: str, limit: int = 5):
         return {"similar_listings": [], "error": str(e)}
 
 async def get_user_associated_ids(user_id: str) -> list:
-    """Get all IDs associated with a user (current and legacy)"""
-    user_ids = [user_id]
+    """Get all IDs associated with a user (canonical id plus legacy aliases)"""
+    return await user_id_resolver.associated_ids(user_id)
+
+SELLER_LISTING_STATUSES = ["active", "pending", "expired", "sold", "draft"]
+
+async def load_seller_summary(seller_id: str) -> dict:
+    """
+    Listing counts by status plus the seller's latest tenders, computed in one
+    aggregation and cached per seller until a listing or tender write for that
+    seller invalidates it. Raises like check_user_active_status on a cache miss.
+    """
+    seller_id = await resolve_user_id(seller_id)
+    cached = await cache_service.get_cached_seller_dashboard(seller_id)
+    if cached is not None:
+        return cached
     
-    # For admin users, check for legacy admin IDs
-    if user_id == "admin_user_1":
-        # Add known legacy admin IDs
-        legacy_admin_ids = ["68bff934bdb9d78bad2b925c", "admin", "sash_admin"]
-        user_ids.extend(legacy_admin_ids)
+    await check_user_active_status(seller_id)
+    associated_ids = await get_user_associated_ids(seller_id)
     
-    # For demo users, check for alternative demo IDs  
-    elif user_id == "68bfff790e4e46bc28d43631":
-        # Add known demo user variations
-        demo_ids = ["demo_user", "demo_user_1", "user"]
-        user_ids.extend(demo_ids)
+    rows = await db.listings.aggregate([
+        {"$match": {"seller_id": {"$in": associated_ids}}},
+        {"$group": {"_id": "$status", "count": {"$sum": 1}}},
+        {"$unionWith": {"coll": "tenders", "pipeline": [
+            {"$match": {"seller_id": {"$in": associated_ids}}},
+            {"$sort": {"created_at": -1}},
+            {"$limit": 10},
+            {"$addFields": {"id": {"$ifNull": ["$id", {"$toString": "$_id"}]}}},
+            {"$project": {"_id": 0}},
+            {"$replaceWith": {"tender": "$$ROOT"}}
+        ]}}
+    ]).to_list(length=None)
     
-    return user_ids
+    status_counts = {}
+    recent_tenders = []
+    for row in rows:
+        if "tender" in row:
+            recent_tenders.append(row["tender"])
+        else:
+            status_counts[str(row["_id"])] = row["count"]
+    
+    listings_summary = {status: status_counts.get(status, 0) for status in SELLER_LISTING_STATUSES}
+    listings_summary["total"] = sum(listings_summary.values())
+    
+    # Encoded up front so cold and cached responses serialize dates identically
+    summary = jsonable_encoder({
+        "listings_summary": listings_summary,
+        "status_counts": status_counts,
+        "recent_tenders": recent_tenders
+    })
+    await cache_service.cache_seller_dashboard(seller_id, summary)
+    return summary
+
+async def invalidate_seller_dashboard(seller_id: str):
+    """Drop a seller's cached dashboard summary after a write to their listings or tenders"""
+    if seller_id:
+        await cache_service.invalidate_seller_dashboard(await resolve_user_id(seller_id))
 
 @app.get("/api/user/my-listings/{user_id}")
 async def get_my_listings(user_id: str, limit: int = 50, skip: int = 0):
@@ -2009,8 +2232,8 @@ async def get_my_listings(user_id: str, limit: int = 50, skip: int = 0):
 async def get_seller_listings(seller_id: str, status: str = "all", page: int = 1, limit: int = 50):
     """Get seller's listings for Management Center - with status filtering and pagination"""
     try:
-        # Check if user exists and is active
-        await check_user_active_status(seller_id)
+        # Checks the user is active on a cache miss; the per-status counts give the total
+        summary = await load_seller_summary(seller_id)
         
         # Get all associated user IDs (current and legacy)
         associated_ids = await get_user_associated_ids(seller_id)
@@ -2036,8 +2259,11 @@ async def get_seller_listings(seller_id: str, status: str = "all", page: int = 1
         # Get listings with pagination
         listings = await db.listings.find(query).sort("created_at", -1).skip(skip).limit(limit).to_list(length=limit)
         
-        # Get total count for pagination info
-        total_count = await db.listings.count_documents(query)
+        # Total for pagination info, from the cached per-status counts
+        if "status" in query:
+            total_count = summary["status_counts"].get(query["status"], 0)
+        else:
+            total_count = sum(summary["status_counts"].values())
         
         # Ensure consistent ID format
         for listing in listings:
@@ -2076,40 +2302,11 @@ async def get_my_listings_marketplace(current_user: dict = Depends(get_current_u
 async def get_seller_dashboard(seller_id: str):
     """Get seller dashboard data for Management Center"""
     try:
-        # Check if user exists and is active
-        await check_user_active_status(seller_id)
-        
-        # Get all associated user IDs
-        associated_ids = await get_user_associated_ids(seller_id)
-        
-        # Get listing counts by status
-        active_count = await db.listings.count_documents({"seller_id": {"$in": associated_ids}, "status": "active"})
-        pending_count = await db.listings.count_documents({"seller_id": {"$in": associated_ids}, "status": "pending"})
-        expired_count = await db.listings.count_documents({"seller_id": {"$in": associated_ids}, "status": "expired"})
-        sold_count = await db.listings.count_documents({"seller_id": {"$in": associated_ids}, "status": "sold"})
-        draft_count = await db.listings.count_documents({"seller_id": {"$in": associated_ids}, "status": "draft"})
-        
-        # Get recent tenders for seller's listings
-        recent_tenders = await db.tenders.find({
-            "seller_id": {"$in": associated_ids}
-        }).sort("created_at", -1).limit(10).to_list(length=10)
-        
-        # Process tenders
-        for tender in recent_tenders:
-            if 'id' not in tender and '_id' in tender:
-                tender['id'] = str(tender['_id'])
-            tender.pop('_id', None)
+        summary = await load_seller_summary(seller_id)
         
         return {
-            "listings_summary": {
-                "active": active_count,
-                "pending": pending_count,
-                "expired": expired_count,
-                "sold": sold_count,
-                "draft": draft_count,
-                "total": active_count + pending_count + expired_count + sold_count + draft_count
-            },
-            "recent_tenders": recent_tenders,
+            "listings_summary": summary["listings_summary"],
+            "recent_tenders": summary["recent_tenders"],
             "seller_id": seller_id
         }
         
@@ -2175,15 +2372,28 @@ async def get_my_deals(user_id: str):
             ]
         }).sort("created_at", -1)
         
+        orders = await orders_cursor.to_list(length=None)
+        
+        # Bulk enrichment: one listing query and one user query for the whole page
+        listings = await fetch_listings_by_ids(
+            (order.get("listing_id") for order in orders),
+            {"title": 1, "price": 1, "images": 1}
+        )
+        counterpart_ids = set()
+        for order in orders:
+            for role_key in ("buyer_id", "seller_id"):
+                if order.get(role_key) != user_id:
+                    counterpart_ids.add(order.get(role_key))
+        users = await fetch_users_by_ids(counterpart_ids, {"username": 1, "email": 1})
+        
         deals = []
-        async for order in orders_cursor:
-            # Enrich with listing data
-            listing = await db.listings.find_one({"id": order.get("listing_id")})
+        for order in orders:
+            listing = listings.get(order.get("listing_id"))
             
             # Enrich with buyer data if user is seller
             buyer_info = {}
             if order.get("buyer_id") != user_id:
-                buyer = await db.users.find_one({"id": order.get("buyer_id")})
+                buyer = users.get(order.get("buyer_id"))
                 if buyer:
                     buyer_info = {
                         "id": buyer.get("id"),
@@ -2194,7 +2404,7 @@ async def get_my_deals(user_id: str):
             # Enrich with seller data if user is buyer
             seller_info = {}
             if order.get("seller_id") != user_id:
-                seller = await db.users.find_one({"id": order.get("seller_id")})
+                seller = users.get(order.get("seller_id"))
                 if seller:
                     seller_info = {
                         "id": seller.get("id"),
@@ -2455,24 +2665,14 @@ async def get_all_users(current_user: dict = Depends(require_admin_role)):
 
 @app.put("/api/admin/users/{user_id}")
 async def update_user(user_id: str, user_data: dict, current_user: dict = Depends(require_admin_role)):
-    # Try to update by UUID id field first
+    user_id = await resolve_user_id(user_id)
     result = await db.users.update_one(
         {"id": user_id},
         {"$set": user_data}
     )
     
-    # If not found, try by ObjectId (for API compatibility)
-    if result.matched_count == 0:
-        try:
-            from bson import ObjectId
-            result = await db.users.update_one(
-                {"_id": ObjectId(user_id)},
-                {"$set": user_data}
-            )
-        except:
-            pass
-    
     if result.modified_count:
+        await invalidate_user_principal(user_id)
         return {"message": "User updated successfully"}
     raise HTTPException(status_code=404, detail="User not found")
 
@@ -2583,23 +2783,21 @@ async def create_user_by_admin(user_data: dict):
 async def delete_user_by_admin(user_id: str):
     """Admin endpoint to delete users"""
     try:
-        # Delete user - try UUID id field first, then ObjectId
-        result = await db.users.delete_one({"id": user_id})
+        user_id = await resolve_user_id(user_id)
         
-        # If not found, try by ObjectId (for API compatibility)
-        if result.deleted_count == 0:
-            try:
-                from bson import ObjectId
-                result = await db.users.delete_one({"_id": ObjectId(user_id)})
-            except:
-                pass
+        # Delete user
+        result = await db.users.delete_one({"id": user_id})
         
         if result.deleted_count == 0:
             raise HTTPException(status_code=404, detail="User not found")
         
+        await invalidate_user_principal(user_id)
+        await user_id_resolver.forget_user(user_id)
+        
         # Clean up user-related data
-        await db.user_notifications.delete_many({"user_id": user_id})
+        await notification_service.clear_user(user_id)
         await db.user_favorites.delete_many({"user_id": user_id})
+        await cache_service.invalidate_user_favorites(user_id)
         await db.listings.update_many(
             {"seller_id": user_id}, 
             {"$set": {"status": "inactive", "seller_id": f"deleted_user_{user_id[:8]}"}}
@@ -2671,6 +2869,30 @@ async def sync_listings_to_elasticsearch(current_user: dict = Depends(require_ad
         logger.error(f"Listing sync failed: {e}")
         raise HTTPException(status_code=500, detail=f"Sync failed: {str(e)}")
 
+@app.post("/api/admin/search/backfill-tokens")
+async def backfill_listing_search_tokens(rebuild: bool = False, current_user: dict = Depends(require_admin_role)):
+    """Populate search_tokens on existing listings (rebuild=true recomputes all)"""
+    try:
+        result = await search_token_service.backfill(rebuild=rebuild)
+        return {
+            "message": "Search token backfill completed",
+            **result
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Search token backfill failed: {str(e)}")
+
+@app.post("/api/admin/messages/backfill-conversations")
+async def backfill_message_conversations(current_user: dict = Depends(require_admin_role)):
+    """Thread legacy messages into conversations and rebuild conversation documents"""
+    try:
+        result = await conversation_service.backfill()
+        return {
+            "message": "Conversation backfill completed",
+            **result
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Conversation backfill failed: {str(e)}")
+
 @app.get("/api/admin/security/dashboard")
 async def get_security_dashboard(current_user: dict = Depends(require_admin_role)):
     """Get comprehensive security dashboard data (Admin only)"""
@@ -2714,6 +2936,7 @@ async def get_monitoring_dashboard(current_user: dict = Depends(require_admin_ro
         
         return {
             **dashboard_data,
+            "executors": executor_service.get_stats(),
             "monitoring_recommendations": [
                 {
                     "title": "Monitor Response Times",
@@ -2737,6 +2960,24 @@ async def get_monitoring_dashboard(current_user: dict = Depends(require_admin_ro
         logger.error(f"Monitoring dashboard failed: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to get monitoring dashboard: {str(e)}")
 
+@app.get("/api/admin/monitoring/database")
+async def get_database_monitoring(
+    limit: int = 20,
+    current_user: dict = Depends(require_admin_role)
+):
+    """Database time per query shape, N+1 candidates and the slow-query log (Admin only)"""
+    try:
+        return monitoring_service.get_database_summary(max(1, min(limit, 200)))
+    except Exception as e:
+        logger.error(f"Database monitoring failed: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to get database monitoring: {str(e)}")
+
+@app.post("/api/admin/monitoring/database/reset")
+async def reset_database_monitoring(current_user: dict = Depends(require_admin_role)):
+    """Clear database shape statistics and the slow-query log (Admin only)"""
+    monitoring_service.reset_database_metrics()
+    return {"message": "Database monitoring statistics reset"}
+
 @app.post("/api/admin/security/alerts/{alert_id}/resolve")
 async def resolve_security_alert(alert_id: str):
     """Resolve a security alert (Admin only)"""
@@ -3027,313 +3268,104 @@ async def generate_custom_report(report_config: dict):
         logger.error(f"Custom report generation failed: {e}")
         raise HTTPException(status_code=500, detail=f"Custom report failed: {str(e)}")
 
+# Export jobs: documents are rendered by export_job_service workers and cached by content
+async def collect_comprehensive_export(params: dict) -> dict:
+    """Everything the comprehensive report renders, read up front"""
+    export_types = params.get("types", [])
+    data = {
+        "types": export_types,
+        "dateRange": params.get("dateRange", {}),
+        "format": params.get("format", "comprehensive"),
+        "totals": {
+            "users": await db.users.count_documents({}),
+            "listings": await db.listings.count_documents({}),
+            "orders": await db.orders.count_documents({}),
+            "active_orders": await db.orders.count_documents({"status": "active"}),
+            "completed_orders": await db.orders.count_documents({"status": "completed"})
+        }
+    }
+    
+    # Limit for performance; the PDF shows at most 50 rows of each
+    if "users" in export_types:
+        data["users"] = await db.users.find(
+            {}, {"_id": 0, "username": 1, "email": 1, "created_at": 1, "status": 1}
+        ).to_list(length=100)
+    if "listings" in export_types:
+        data["listings"] = await db.listings.find(
+            {}, {"_id": 0, "title": 1, "price": 1, "category": 1, "created_at": 1, "status": 1}
+        ).to_list(length=100)
+    if "transactions" in export_types:
+        data["orders"] = await db.orders.find(
+            {}, {"_id": 0, "id": 1, "total_amount": 1, "status": 1, "created_at": 1, "buyer_email": 1}
+        ).to_list(length=100)
+    
+    return data
+
+async def collect_basket_export(params: dict) -> dict:
+    """Basket exports render the posted basket as is"""
+    return params
+
+def register_export_reports():
+    export_job_service.register_report("comprehensive", ReportType(
+        collect=collect_comprehensive_export,
+        render=render_comprehensive_pdf,
+        filename=lambda params: f"cataloro-export-{datetime.now().strftime('%Y%m%d-%H%M%S')}.pdf"
+    ))
+    export_job_service.register_report("basket", ReportType(
+        collect=collect_basket_export,
+        render=render_basket_pdf,
+        filename=lambda params: f"cataloro-basket-{params.get('basketName', 'Unnamed Basket').replace(' ', '_')}-{datetime.now().strftime('%Y%m%d-%H%M%S')}.pdf"
+    ))
+
+def basket_export_params(export_data: dict) -> dict:
+    # exportDate is the client's click time; keeping it would defeat artifact reuse
+    return {key: value for key, value in export_data.items() if key != "exportDate"}
+
+def export_job_response(job: dict) -> dict:
+    return {
+        "job_id": job["id"],
+        "type": job["type"],
+        "status": job["status"],
+        "cached": job.get("cached"),
+        "size": job.get("size"),
+        "filename": job.get("filename"),
+        "error": job.get("error"),
+        "created_at": job.get("created_at"),
+        "completed_at": job.get("completed_at"),
+        "download_url": f"/api/exports/jobs/{job['id']}/download" if job["status"] == "completed" else None
+    }
+
+def export_artifact_response(job: dict):
+    from fastapi.responses import FileResponse
+    
+    if job["status"] == "failed":
+        raise HTTPException(status_code=500, detail=f"Export failed: {job.get('error', 'unknown error')}")
+    if job["status"] != "completed":
+        raise HTTPException(status_code=409, detail=f"Export is {job['status']}")
+    
+    path = export_job_service.artifact_path(job)
+    if not path:
+        raise HTTPException(status_code=410, detail="Export artifact expired, please export again")
+    
+    return FileResponse(path, media_type=job.get("media_type", "application/pdf"), filename=job["filename"])
+
+async def run_export_job(report_type: str, params: dict, user_id: str = None):
+    """Submit an export and wait for it (used by the synchronous legacy endpoints)"""
+    job = await export_job_service.submit(report_type, params, user_id)
+    job = await export_job_service.wait(job["id"])
+    return export_artifact_response(job)
+
 @app.post("/api/admin/export-pdf")
 async def export_comprehensive_pdf(export_data: dict):
     """Generate comprehensive PDF export with selected data types"""
     try:
-        from reportlab.lib.pagesizes import letter, A4
-        from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, PageBreak
-        from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-        from reportlab.lib.units import inch
-        from reportlab.lib import colors
-        from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
-        from reportlab.graphics.shapes import Drawing
-        from reportlab.graphics.charts.linecharts import HorizontalLineChart
-        from reportlab.graphics.charts.piecharts import Pie
-        from fastapi.responses import StreamingResponse
-        import tempfile
-        
-        # Extract export parameters
-        export_types = export_data.get("types", [])
-        date_range = export_data.get("dateRange", {})
-        format_type = export_data.get("format", "comprehensive")
-        options = export_data.get("options", {})
-        
-        logger.info(f"Generating PDF export for types: {export_types}")
-        
-        # Create temporary file for PDF
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_file:
-            pdf_filename = tmp_file.name
-        
-        # Initialize PDF document
-        doc = SimpleDocTemplate(
-            pdf_filename,
-            pagesize=A4,
-            rightMargin=72,
-            leftMargin=72,
-            topMargin=72,
-            bottomMargin=18
-        )
-        
-        # Get sample styles
-        styles = getSampleStyleSheet()
-        
-        # Create custom styles
-        title_style = ParagraphStyle(
-            'CustomTitle',
-            parent=styles['Heading1'],
-            fontSize=24,
-            spaceAfter=30,
-            alignment=TA_CENTER,
-            textColor=colors.HexColor('#2563eb')
-        )
-        
-        heading_style = ParagraphStyle(
-            'CustomHeading',
-            parent=styles['Heading2'],
-            fontSize=16,
-            spaceAfter=12,
-            spaceBefore=20,
-            textColor=colors.HexColor('#1f2937')
-        )
-        
-        # Story container for PDF content
-        story = []
-        
-        # Add title page
-        story.append(Paragraph("CATALORO MARKETPLACE", title_style))
-        story.append(Paragraph("Comprehensive Data Export Report", styles['Title']))
-        
-        # Add generation info
-        generation_date = datetime.now(timezone.utc).strftime("%B %d, %Y at %H:%M UTC")
-        story.append(Spacer(1, 20))
-        story.append(Paragraph(f"Generated on: {generation_date}", styles['Normal']))
-        
-        if date_range.get('start') and date_range.get('end'):
-            start_date = datetime.fromisoformat(date_range['start']).strftime("%B %d, %Y")
-            end_date = datetime.fromisoformat(date_range['end']).strftime("%B %d, %Y")
-            story.append(Paragraph(f"Data Period: {start_date} to {end_date}", styles['Normal']))
-        
-        story.append(Spacer(1, 30))
-        
-        # Add executive summary
-        summary_data = []
-        total_users = await db.users.count_documents({})
-        total_listings = await db.listings.count_documents({})
-        total_orders = await db.orders.count_documents({})
-        
-        summary_data.extend([
-            ["Metric", "Value"],
-            ["Total Users", f"{total_users:,}"],
-            ["Total Listings", f"{total_listings:,}"],
-            ["Total Orders", f"{total_orders:,}"],
-            ["Report Types", f"{len(export_types)}"],
-            ["Export Format", format_type.title()]
-        ])
-        
-        summary_table = Table(summary_data, colWidths=[3*inch, 2*inch])
-        summary_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#f3f4f6')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.HexColor('#1f2937')),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 12),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.white),
-            ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#e5e7eb'))
-        ]))
-        
-        story.append(Paragraph("Executive Summary", heading_style))
-        story.append(summary_table)
-        story.append(PageBreak())
-        
-        # Process each selected export type
-        for export_type in export_types:
-            try:
-                story.append(Paragraph(f"{export_type.replace('_', ' ').title()} Report", heading_style))
-                
-                if export_type == "users":
-                    # Users Report
-                    users = await db.users.find({}, {"_id": 0}).to_list(length=100)  # Limit for performance
-                    
-                    if users:
-                        user_data = [["Username", "Email", "Join Date", "Status"]]
-                        for user in users[:50]:  # Limit to first 50 for PDF
-                            join_date = user.get('created_at', 'N/A')
-                            if isinstance(join_date, str):
-                                try:
-                                    join_date = datetime.fromisoformat(join_date.replace('Z', '+00:00')).strftime("%Y-%m-%d")
-                                except:
-                                    join_date = 'N/A'
-                            
-                            user_data.append([
-                                user.get('username', 'N/A')[:20],
-                                user.get('email', 'N/A')[:30],
-                                join_date,
-                                user.get('status', 'active')
-                            ])
-                        
-                        user_table = Table(user_data, colWidths=[1.5*inch, 2.5*inch, 1.5*inch, 1*inch])
-                        user_table.setStyle(TableStyle([
-                            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#3b82f6')),
-                            ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-                            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-                            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                            ('FONTSIZE', (0, 0), (-1, 0), 10),
-                            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                            ('BACKGROUND', (0, 1), (-1, -1), colors.white),
-                            ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#e5e7eb')),
-                            ('FONTSIZE', (0, 1), (-1, -1), 8)
-                        ]))
-                        
-                        story.append(user_table)
-                        if len(users) > 50:
-                            story.append(Paragraph(f"Showing first 50 of {len(users)} total users", styles['Normal']))
-                
-                elif export_type == "listings":
-                    # Listings Report
-                    listings = await db.listings.find({}, {"_id": 0}).to_list(length=100)
-                    
-                    if listings:
-                        listing_data = [["Title", "Price", "Category", "Created", "Status"]]
-                        for listing in listings[:50]:  # Limit for PDF
-                            created_at = listing.get('created_at', 'N/A')
-                            if isinstance(created_at, str):
-                                try:
-                                    created_at = datetime.fromisoformat(created_at.replace('Z', '+00:00')).strftime("%Y-%m-%d")
-                                except:
-                                    created_at = 'N/A'
-                            
-                            listing_data.append([
-                                listing.get('title', 'N/A')[:25],
-                                f"€{listing.get('price', 0)}",
-                                listing.get('category', 'N/A')[:15],
-                                created_at,
-                                listing.get('status', 'active')
-                            ])
-                        
-                        listing_table = Table(listing_data, colWidths=[2*inch, 1*inch, 1.5*inch, 1*inch, 1*inch])
-                        listing_table.setStyle(TableStyle([
-                            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#10b981')),
-                            ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-                            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-                            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                            ('FONTSIZE', (0, 0), (-1, 0), 10),
-                            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                            ('BACKGROUND', (0, 1), (-1, -1), colors.white),
-                            ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#e5e7eb')),
-                            ('FONTSIZE', (0, 1), (-1, -1), 8)
-                        ]))
-                        
-                        story.append(listing_table)
-                        if len(listings) > 50:
-                            story.append(Paragraph(f"Showing first 50 of {len(listings)} total listings", styles['Normal']))
-                
-                elif export_type == "transactions":
-                    # Transactions Report
-                    orders = await db.orders.find({}, {"_id": 0}).to_list(length=100)
-                    
-                    if orders:
-                        order_data = [["Order ID", "Amount", "Status", "Date", "User"]]
-                        total_revenue = 0
-                        
-                        for order in orders[:50]:
-                            amount = order.get('total_amount', 0)
-                            total_revenue += amount
-                            
-                            created_at = order.get('created_at', 'N/A')
-                            if isinstance(created_at, str):
-                                try:
-                                    created_at = datetime.fromisoformat(created_at.replace('Z', '+00:00')).strftime("%Y-%m-%d")
-                                except:
-                                    created_at = 'N/A'
-                            
-                            order_data.append([
-                                order.get('id', 'N/A')[:15],
-                                f"€{amount:.2f}",
-                                order.get('status', 'N/A'),
-                                created_at,
-                                order.get('buyer_email', 'N/A')[:20]
-                            ])
-                        
-                        order_table = Table(order_data, colWidths=[1.5*inch, 1*inch, 1*inch, 1*inch, 2*inch])
-                        order_table.setStyle(TableStyle([
-                            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#f59e0b')),
-                            ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-                            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-                            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                            ('FONTSIZE', (0, 0), (-1, 0), 10),
-                            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                            ('BACKGROUND', (0, 1), (-1, -1), colors.white),
-                            ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#e5e7eb')),
-                            ('FONTSIZE', (0, 1), (-1, -1), 8)
-                        ]))
-                        
-                        story.append(order_table)
-                        story.append(Spacer(1, 12))
-                        story.append(Paragraph(f"Total Revenue (shown): €{total_revenue:.2f}", styles['Normal']))
-                        
-                        if len(orders) > 50:
-                            story.append(Paragraph(f"Showing first 50 of {len(orders)} total orders", styles['Normal']))
-                
-                elif export_type == "analytics":
-                    # Analytics Report
-                    story.append(Paragraph("Platform Analytics Overview", styles['Normal']))
-                    
-                    # Get basic analytics
-                    user_count_by_month = await db.users.count_documents({})
-                    listing_count_by_category = await db.listings.count_documents({})
-                    
-                    analytics_data = [
-                        ["Metric", "Value", "Period"],
-                        ["Total Users", f"{user_count_by_month}", "All Time"],
-                        ["Total Listings", f"{listing_count_by_category}", "All Time"],
-                        ["Active Orders", f"{await db.orders.count_documents({'status': 'active'})}", "Current"],
-                        ["Completed Orders", f"{await db.orders.count_documents({'status': 'completed'})}", "All Time"]
-                    ]
-                    
-                    analytics_table = Table(analytics_data, colWidths=[2*inch, 1.5*inch, 1.5*inch])
-                    analytics_table.setStyle(TableStyle([
-                        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#8b5cf6')),
-                        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-                        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-                        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                        ('FONTSIZE', (0, 0), (-1, 0), 10),
-                        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                        ('BACKGROUND', (0, 1), (-1, -1), colors.white),
-                        ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#e5e7eb'))
-                    ]))
-                    
-                    story.append(analytics_table)
-                
-                else:
-                    # Generic report for other types
-                    story.append(Paragraph(f"Data export for {export_type} is being processed...", styles['Normal']))
-                    story.append(Paragraph("This section contains comprehensive data analysis and insights.", styles['Normal']))
-                
-                story.append(Spacer(1, 20))
-                
-            except Exception as e:
-                logger.error(f"Error processing {export_type}: {e}")
-                story.append(Paragraph(f"Error processing {export_type}: {str(e)}", styles['Normal']))
-                story.append(Spacer(1, 20))
-        
-        # Add footer info
-        story.append(PageBreak())
-        story.append(Paragraph("Report Generation Complete", heading_style))
-        story.append(Paragraph(f"This report was generated by Cataloro Marketplace Admin Panel on {generation_date}.", styles['Normal']))
-        story.append(Paragraph("For questions about this data, please contact your system administrator.", styles['Normal']))
-        
-        # Build PDF
-        doc.build(story)
-        
-        # Read the PDF file and return as streaming response
-        def iterfile():
-            with open(pdf_filename, mode="rb") as file_like:
-                yield from file_like
-        
-        # Clean up temp file after response
-        import atexit
-        atexit.register(lambda: os.unlink(pdf_filename) if os.path.exists(pdf_filename) else None)
-        
-        return StreamingResponse(
-            iterfile(),
-            media_type="application/pdf",
-            headers={
-                "Content-Disposition": f"attachment; filename=cataloro-export-{datetime.now().strftime('%Y%m%d-%H%M%S')}.pdf"
-            }
-        )
+        logger.info(f"Generating PDF export for types: {export_data.get('types', [])}")
+        return await run_export_job("comprehensive", export_data)
         
+    except HTTPException:
+        raise
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="PDF export is still running, please retry shortly")
     except Exception as e:
         logger.error(f"PDF export failed: {e}")
         raise HTTPException(status_code=500, detail=f"PDF export failed: {str(e)}")
@@ -3342,261 +3374,93 @@ async def export_comprehensive_pdf(export_data: dict):
 async def export_basket_pdf(export_data: dict):
     """Generate individual basket PDF export with Cataloro branding"""
     try:
-        from reportlab.lib.pagesizes import letter, A4
-        from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, PageBreak, Image
-        from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-        from reportlab.lib.units import inch
-        from reportlab.lib import colors
-        from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
-        from fastapi.responses import StreamingResponse
-        import tempfile
-        
-        # Extract basket data
-        basket_id = export_data.get("basketId")
-        basket_name = export_data.get("basketName", "Unnamed Basket")
-        basket_description = export_data.get("basketDescription", "")
-        totals = export_data.get("totals", {})
-        items = export_data.get("items", [])
-        user_id = export_data.get("userId")
-        export_date = export_data.get("exportDate")
-        
-        logger.info(f"Generating basket PDF for basket: {basket_name}")
-        
-        # Create temporary file for PDF
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_file:
-            pdf_filename = tmp_file.name
-        
-        # Initialize PDF document
-        doc = SimpleDocTemplate(
-            pdf_filename,
-            pagesize=A4,
-            rightMargin=72,
-            leftMargin=72,
-            topMargin=72,
-            bottomMargin=72
-        )
-        
-        # Get sample styles
-        styles = getSampleStyleSheet()
-        
-        # Create custom styles
-        title_style = ParagraphStyle(
-            'CustomTitle',
-            parent=styles['Heading1'],
-            fontSize=20,
-            spaceAfter=20,
-            alignment=TA_CENTER,
-            textColor=colors.HexColor('#2563eb')
-        )
-        
-        heading_style = ParagraphStyle(
-            'CustomHeading',
-            parent=styles['Heading2'],
-            fontSize=14,
-            spaceAfter=12,
-            spaceBefore=16,
-            textColor=colors.HexColor('#1f2937')
-        )
-        
-        # Story container for PDF content
-        story = []
-        
-        # Add Cataloro Logo and Header
-        try:
-            # Try to find the logo file in the uploads directory
-            logo_path = None
-            logo_dirs = ['/app/backend/uploads', '/app/frontend/public', '/app/uploads']
-            
-            for logo_dir in logo_dirs:
-                if os.path.exists(logo_dir):
-                    for filename in os.listdir(logo_dir):
-                        if 'logo' in filename.lower() and filename.lower().endswith(('.png', '.jpg', '.jpeg')):
-                            logo_path = os.path.join(logo_dir, filename)
-                            break
-                    if logo_path:
-                        break
-            
-            if logo_path and os.path.exists(logo_path):
-                # Add logo
-                logo = Image(logo_path, width=120, height=40)  # Adjust size as needed
-                logo.hAlign = 'CENTER'
-                story.append(logo)
-                story.append(Spacer(1, 20))
-        except Exception as e:
-            logger.warning(f"Could not add logo: {e}")
-        
-        # Title
-        story.append(Paragraph("CATALORO MARKETPLACE", title_style))
-        story.append(Paragraph("Basket Export Report", styles['Title']))
-        story.append(Spacer(1, 30))
-        
-        # Basket Information Header
-        story.append(Paragraph("Basket Information", heading_style))
-        
-        basket_info_data = [
-            ["Basket Name", basket_name],
-            ["Total Items", str(len(items))],
-            ["Total Value Paid", f"€{totals.get('valuePaid', 0):.2f}"],
-            ["Total Pt (grams)", f"{totals.get('ptG', 0):.4f}"],
-            ["Total Pd (grams)", f"{totals.get('pdG', 0):.4f}"],
-            ["Total Rh (grams)", f"{totals.get('rhG', 0):.4f}"],
-            ["Export Date", datetime.now(timezone.utc).strftime("%B %d, %Y at %H:%M UTC")]
-        ]
-        
-        if basket_description:
-            basket_info_data.insert(1, ["Description", basket_description])
-        
-        basket_info_table = Table(basket_info_data, colWidths=[2.5*inch, 3.5*inch])
-        basket_info_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#f3f4f6')),
-            ('TEXTCOLOR', (0, 0), (0, -1), colors.HexColor('#1f2937')),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, -1), 10),
-            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-            ('TOPPADDING', (0, 0), (-1, -1), 8),
-            ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#e5e7eb'))
-        ]))
-        
-        story.append(basket_info_table)
-        story.append(Spacer(1, 30))
-        
-        # Items List
-        if items:
-            story.append(Paragraph("Basket Items", heading_style))
-            
-            # Prepare items data
-            items_data = [["Title", "Price", "Seller", "Date of Buying", "Pt (g)", "Pd (g)", "Rh (g)"]]
-            
-            for item in items:
-                # Format the date of buying
-                date_bought = item.get('created_at', item.get('purchase_date', 'N/A'))
-                if isinstance(date_bought, str) and date_bought != 'N/A':
-                    try:
-                        date_bought = datetime.fromisoformat(date_bought.replace('Z', '+00:00')).strftime("%Y-%m-%d")
-                    except:
-                        date_bought = 'N/A'
-                
-                # Get precious metal values
-                pt_g = item.get('pt_g', 0)
-                pd_g = item.get('pd_g', 0) 
-                rh_g = item.get('rh_g', 0)
-                
-                # If direct values aren't available, try calculating from PPM and weight
-                if pt_g == 0 and item.get('pt_ppm') and item.get('weight'):
-                    pt_g = (item.get('weight', 0) * item.get('pt_ppm', 0) / 1000) * item.get('renumeration_pt', 0)
-                if pd_g == 0 and item.get('pd_ppm') and item.get('weight'):
-                    pd_g = (item.get('weight', 0) * item.get('pd_ppm', 0) / 1000) * item.get('renumeration_pd', 0)
-                if rh_g == 0 and item.get('rh_ppm') and item.get('weight'):
-                    rh_g = (item.get('weight', 0) * item.get('rh_ppm', 0) / 1000) * item.get('renumeration_rh', 0)
-                
-                items_data.append([
-                    item.get('title', 'N/A')[:30],  # Truncate long titles
-                    f"€{item.get('price', 0):.2f}",
-                    item.get('seller', item.get('seller_name', 'N/A'))[:20],
-                    date_bought,
-                    f"{pt_g:.4f}",
-                    f"{pd_g:.4f}",
-                    f"{rh_g:.4f}"
-                ])
-            
-            # Create items table
-            items_table = Table(items_data, colWidths=[2*inch, 0.8*inch, 1.2*inch, 1*inch, 0.6*inch, 0.6*inch, 0.6*inch])
-            items_table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#2563eb')),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-                ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-                ('ALIGN', (1, 1), (1, -1), 'RIGHT'),  # Price column right-aligned
-                ('ALIGN', (4, 1), (-1, -1), 'RIGHT'),  # Metal columns right-aligned
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, 0), 9),
-                ('FONTSIZE', (0, 1), (-1, -1), 8),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 8),
-                ('TOPPADDING', (0, 0), (-1, 0), 8),
-                ('BOTTOMPADDING', (0, 1), (-1, -1), 6),
-                ('TOPPADDING', (0, 1), (-1, -1), 6),
-                ('BACKGROUND', (0, 1), (-1, -1), colors.white),
-                ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#e5e7eb')),
-                ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f9fafb')])
-            ]))
-            
-            story.append(items_table)
-            story.append(Spacer(1, 20))
-            
-            # Summary totals at the bottom
-            story.append(Paragraph("Summary Totals", heading_style))
-            
-            summary_data = [
-                ["Total Items", str(len(items))],
-                ["Total Value Paid", f"€{totals.get('valuePaid', 0):.2f}"],
-                ["Total Platinum", f"{totals.get('ptG', 0):.4f} grams"],
-                ["Total Palladium", f"{totals.get('pdG', 0):.4f} grams"],  
-                ["Total Rhodium", f"{totals.get('rhG', 0):.4f} grams"]
-            ]
-            
-            summary_table = Table(summary_data, colWidths=[2*inch, 2*inch])
-            summary_table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#10b981')),
-                ('BACKGROUND', (1, 0), (1, -1), colors.HexColor('#ecfdf5')),
-                ('TEXTCOLOR', (0, 0), (0, -1), colors.white),
-                ('TEXTCOLOR', (1, 0), (1, -1), colors.HexColor('#065f46')),
-                ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-                ('ALIGN', (1, 0), (1, -1), 'RIGHT'),
-                ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-                ('FONTNAME', (1, 0), (1, -1), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, -1), 11),
-                ('BOTTOMPADDING', (0, 0), (-1, -1), 10),
-                ('TOPPADDING', (0, 0), (-1, -1), 10),
-                ('GRID', (0, 0), (-1, -1), 2, colors.HexColor('#065f46'))
-            ]))
-            
-            story.append(summary_table)
-        else:
-            story.append(Paragraph("No items found in this basket.", styles['Normal']))
-        
-        story.append(Spacer(1, 30))
-        
-        # Footer
-        story.append(Paragraph(
-            f"This report was generated by Cataloro Marketplace on {datetime.now(timezone.utc).strftime('%B %d, %Y at %H:%M UTC')}.",
-            styles['Normal']
-        ))
-        story.append(Paragraph("For questions about this data, please contact support.", styles['Normal']))
-        
-        # Build PDF
-        doc.build(story)
-        
-        # Read the PDF file and return as streaming response
-        def iterfile():
-            with open(pdf_filename, mode="rb") as file_like:
-                yield from file_like
-        
-        # Clean up temp file after response
-        import atexit
-        atexit.register(lambda: os.unlink(pdf_filename) if os.path.exists(pdf_filename) else None)
-        
-        return StreamingResponse(
-            iterfile(),
-            media_type="application/pdf",
-            headers={
-                "Content-Disposition": f"attachment; filename=cataloro-basket-{basket_name.replace(' ', '_')}-{datetime.now().strftime('%Y%m%d-%H%M%S')}.pdf"
-            }
-        )
+        logger.info(f"Generating basket PDF for basket: {export_data.get('basketName', 'Unnamed Basket')}")
+        return await run_export_job("basket", basket_export_params(export_data), export_data.get("userId"))
         
+    except HTTPException:
+        raise
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="Basket PDF export is still running, please retry shortly")
     except Exception as e:
         logger.error(f"Basket PDF export failed: {e}")
         raise HTTPException(status_code=500, detail=f"Basket PDF export failed: {str(e)}")
 
+@app.post("/api/admin/exports/comprehensive")
+async def submit_comprehensive_export(export_data: dict, current_user: dict = Depends(require_admin_role)):
+    """Queue a comprehensive PDF export; poll the job and download it when completed"""
+    try:
+        job = await export_job_service.submit("comprehensive", export_data, current_user.get("id"))
+        return export_job_response(job)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to queue export: {str(e)}")
+
+@app.post("/api/user/exports/basket")
+async def submit_basket_export(export_data: dict, current_user: dict = Depends(get_current_user)):
+    """Queue a basket PDF export; poll the job and download it when completed"""
+    try:
+        job = await export_job_service.submit("basket", basket_export_params(export_data), current_user.get("id"))
+        return export_job_response(job)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to queue export: {str(e)}")
+
+async def get_export_job_for_user(job_id: str, current_user: dict) -> dict:
+    job = await export_job_service.get_job(job_id)
+    is_admin = current_user.get("role") == "admin" or current_user.get("user_role") in ["Admin", "Admin-Manager"]
+    if not job or (job.get("user_id") != current_user.get("id") and not is_admin):
+        raise HTTPException(status_code=404, detail="Export job not found")
+    return job
+
+@app.get("/api/exports/jobs/{job_id}")
+async def get_export_job_status(job_id: str, current_user: dict = Depends(get_current_user)):
+    """Status of an export job"""
+    return export_job_response(await get_export_job_for_user(job_id, current_user))
+
+@app.get("/api/exports/jobs/{job_id}/download")
+async def download_export_job(job_id: str, current_user: dict = Depends(get_current_user)):
+    """Stream a completed export's artifact"""
+    return export_artifact_response(await get_export_job_for_user(job_id, current_user))
+
 # Include Phase 5 endpoints
 from phase5_endpoints import phase5_router
 from phase6_endpoints import phase6_router
 app.include_router(phase5_router)
 app.include_router(phase6_router)
 
+# Per-user write for each bulk action (delete is handled separately)
+BULK_USER_UPDATES = {
+    "activate": {"$set": {"is_active": True}},
+    "suspend": {"$set": {"is_active": False}, "$inc": {"token_version": 1}},  # suspend revokes tokens
+    "approve": {"$set": {"registration_status": "Approved"}},
+    "reject": {"$set": {"registration_status": "Rejected"}}
+}
+
+def bulk_registration_notification(action: str, user: dict) -> dict:
+    if action == "approve":
+        return {
+            "user_id": user["id"],
+            "title": "Registration Approved",
+            "message": f"Your {user.get('badge', 'user')} account has been approved! You can now access the marketplace.",
+            "type": "registration_approved",
+            "read": False,
+            "created_at": datetime.now(pytz.timezone('Europe/Berlin')).isoformat(),
+            "id": str(uuid.uuid4())
+        }
+    return {
+        "user_id": user["id"],
+        "title": "Registration Rejected",
+        "message": "Your registration has been rejected. Please contact support for more information.",
+        "type": "registration_rejected",
+        "read": False,
+        "created_at": datetime.now(pytz.timezone('Europe/Berlin')).isoformat(),
+        "id": str(uuid.uuid4())
+    }
+
 @app.post("/api/admin/users/bulk-action")
 async def bulk_user_action(action_data: dict):
-    """Bulk operations on users"""
+    """
+    Bulk operations on users. Ids are resolved and checked with one $in read, the
+    action is a single bulk_write on users and cascading cleanup runs set-based.
+    """
     try:
         action = action_data.get("action")
         user_ids = action_data.get("user_ids", [])
@@ -3607,180 +3471,105 @@ async def bulk_user_action(action_data: dict):
         results = {
             "success_count": 0,
             "failed_count": 0,
-            "errors": []
+            "errors": [],
+            "per_user": {}
         }
         
-        for user_id in user_ids:
+        def fail(requested_id: str, reason: str):
+            results["failed_count"] += 1
+            results["errors"].append(reason)
+            results["per_user"][requested_id] = {"success": False, "error": reason}
+        
+        if action != "delete" and action not in BULK_USER_UPDATES:
+            for requested_id in user_ids:
+                fail(requested_id, f"Unknown action: {action}")
+            return {"message": f"Bulk {action} completed", "results": results}
+        
+        canonical_ids = await user_id_resolver.resolve_many(user_ids)
+        users = await db.users.find(
+            {"id": {"$in": list(set(canonical_ids.values()))}},
+            {"_id": 0, "id": 1, "badge": 1}
+        ).to_list(length=None)
+        users_by_id = {user["id"]: user for user in users}
+        
+        # One write per distinct existing user, in request order
+        targets = []
+        for requested_id in user_ids:
+            user_id = canonical_ids.get(requested_id, requested_id)
+            if user_id not in users_by_id:
+                fail(requested_id, f"User {requested_id} not found")
+            elif user_id not in targets:
+                targets.append(user_id)
+        
+        failed_writes = {}
+        affected = 0
+        if targets and action == "delete":
+            # Claim the users before deleting them, so a user removed concurrently between
+            # the lookup and the delete is reported as not found instead of as ours
+            claim = str(uuid.uuid4())
+            await db.users.update_many({"id": {"$in": targets}}, {"$set": {"bulk_delete_claim": claim}})
+            claimed = set(await db.users.distinct("id", {"id": {"$in": targets}, "bulk_delete_claim": claim}))
+            for user_id in targets:
+                if user_id not in claimed:
+                    failed_writes[user_id] = "User not found"
+            await db.users.delete_many({"id": {"$in": list(claimed)}, "bulk_delete_claim": claim})
+        elif targets:
             try:
-                if action == "delete":
-                    # Delete user - try UUID id field first, then ObjectId
-                    result = await db.users.delete_one({"id": user_id})
-                    if result.deleted_count == 0:
-                        # Try with ObjectId for backward compatibility
-                        try:
-                            from bson import ObjectId
-                            result = await db.users.delete_one({"_id": ObjectId(user_id)})
-                        except:
-                            pass
-                    
-                    if result.deleted_count > 0:
-                        # Clean up user-related data
-                        await db.user_notifications.delete_many({"user_id": user_id})
-                        await db.user_favorites.delete_many({"user_id": user_id})
-                        await db.listings.update_many(
-                            {"seller_id": user_id}, 
-                            {"$set": {"status": "inactive", "seller_id": f"deleted_user_{user_id[:8]}"}}
-                        )
-                        results["success_count"] += 1
-                    else:
-                        results["failed_count"] += 1
-                        results["errors"].append(f"User {user_id} not found")
-                        
-                elif action == "activate":
-                    # Activate user - try UUID id field first, then ObjectId
-                    result = await db.users.update_one(
-                        {"id": user_id},
-                        {"$set": {"is_active": True}}
-                    )
-                    if result.matched_count == 0:
-                        # Try with ObjectId for backward compatibility
-                        try:
-                            from bson import ObjectId
-                            result = await db.users.update_one(
-                                {"_id": ObjectId(user_id)},
-                                {"$set": {"is_active": True}}
-                            )
-                        except:
-                            pass
-                    
-                    if result.matched_count > 0:
-                        results["success_count"] += 1
-                    else:
-                        results["failed_count"] += 1
-                        results["errors"].append(f"User {user_id} not found")
-                        
-                elif action == "suspend":
-                    # Suspend user - try UUID id field first, then ObjectId
-                    result = await db.users.update_one(
-                        {"id": user_id},
-                        {"$set": {"is_active": False}}
-                    )
-                    if result.matched_count == 0:
-                        # Try with ObjectId for backward compatibility
-                        try:
-                            from bson import ObjectId
-                            result = await db.users.update_one(
-                                {"_id": ObjectId(user_id)},
-                                {"$set": {"is_active": False}}
-                            )
-                        except:
-                            pass
-                    
-                    if result.matched_count > 0:
-                        results["success_count"] += 1
-                    else:
-                        results["failed_count"] += 1
-                        results["errors"].append(f"User {user_id} not found")
-                        
-                elif action == "approve":
-                    # Approve user registration - try UUID id field first, then ObjectId
-                    result = await db.users.update_one(
-                        {"id": user_id},
-                        {"$set": {"registration_status": "Approved"}}
-                    )
-                    if result.matched_count == 0:
-                        # Try with ObjectId for backward compatibility
-                        try:
-                            from bson import ObjectId
-                            result = await db.users.update_one(
-                                {"_id": ObjectId(user_id)},
-                                {"$set": {"registration_status": "Approved"}}
-                            )
-                        except:
-                            pass
-                    
-                    if result.matched_count > 0:
-                        # Send approval notification - get user data
-                        user = await db.users.find_one({"id": user_id})
-                        if not user:
-                            try:
-                                from bson import ObjectId
-                                user = await db.users.find_one({"_id": ObjectId(user_id)})
-                            except:
-                                pass
-                        
-                        if user:
-                            approval_notification = {
-                                "user_id": user_id,
-                                "title": "Registration Approved",
-                                "message": f"Your {user.get('badge', 'user')} account has been approved! You can now access the marketplace.",
-                                "type": "registration_approved",
-                                "read": False,
-                                "created_at": datetime.now(pytz.timezone('Europe/Berlin')).isoformat(),
-                                "id": str(uuid.uuid4())
-                            }
-                            await db.user_notifications.insert_one(approval_notification)
-                        results["success_count"] += 1
-                    else:
-                        results["failed_count"] += 1
-                        results["errors"].append(f"User {user_id} not found")
-                        
-                elif action == "reject":
-                    # Reject user registration - try UUID id field first, then ObjectId
-                    result = await db.users.update_one(
-                        {"id": user_id},
-                        {"$set": {"registration_status": "Rejected"}}
-                    )
-                    if result.matched_count == 0:
-                        # Try with ObjectId for backward compatibility
-                        try:
-                            from bson import ObjectId
-                            result = await db.users.update_one(
-                                {"_id": ObjectId(user_id)},
-                                {"$set": {"registration_status": "Rejected"}}
-                            )
-                        except:
-                            pass
-                    
-                    if result.matched_count > 0:
-                        # Send rejection notification - get user data
-                        user = await db.users.find_one({"id": user_id})
-                        if not user:
-                            try:
-                                from bson import ObjectId
-                                user = await db.users.find_one({"_id": ObjectId(user_id)})
-                            except:
-                                pass
-                        
-                        if user:
-                            rejection_notification = {
-                                "user_id": user_id,
-                                "title": "Registration Rejected",
-                                "message": "Your registration has been rejected. Please contact support for more information.",
-                                "type": "registration_rejected",
-                                "read": False,
-                                "created_at": datetime.now(pytz.timezone('Europe/Berlin')).isoformat(),
-                                "id": str(uuid.uuid4())
-                            }
-                            await db.user_notifications.insert_one(rejection_notification)
-                        results["success_count"] += 1
-                    else:
-                        results["failed_count"] += 1
-                        results["errors"].append(f"User {user_id} not found")
-                        
-                else:
-                    results["failed_count"] += 1
-                    results["errors"].append(f"Unknown action: {action}")
-                    
-            except Exception as e:
-                results["failed_count"] += 1
-                results["errors"].append(f"Error processing user {user_id}: {str(e)}")
+                bulk_result = await db.users.bulk_write(
+                    [UpdateOne({"id": user_id}, BULK_USER_UPDATES[action]) for user_id in targets],
+                    ordered=False
+                )
+                affected = bulk_result.matched_count
+            except BulkWriteError as bwe:
+                details = bwe.details or {}
+                affected = details.get("nMatched", 0)
+                for write_error in details.get("writeErrors", []):
+                    failed_writes[targets[write_error["index"]]] = write_error.get("errmsg", "write failed")
+        
+        succeeded = [user_id for user_id in targets if user_id not in failed_writes]
+        if action != "delete" and affected < len(succeeded):
+            # Users removed between the lookup and the write; one read finds out which
+            still_there = set(await db.users.distinct("id", {"id": {"$in": succeeded}}))
+            for user_id in set(succeeded) - still_there:
+                failed_writes[user_id] = "User not found"
+            succeeded = [user_id for user_id in succeeded if user_id in still_there]
+        
+        succeeded_set = set(succeeded)
+        for requested_id in user_ids:
+            user_id = canonical_ids.get(requested_id, requested_id)
+            if user_id in succeeded_set:
+                results["success_count"] += 1
+                results["per_user"][requested_id] = {"success": True}
+            elif user_id in failed_writes:
+                fail(requested_id, f"Error processing user {requested_id}: {failed_writes[user_id]}")
+        
+        # Cached principals and per-user caches, one Redis round trip for all users
+        await invalidate_user_principals(succeeded, *(("favorites",) if action == "delete" else ()))
+        
+        # Cascading effects, set-based over every user the action applied to
+        if succeeded and action == "delete":
+            await user_id_resolver.forget_users(succeeded)
+            await notification_service.clear_users(succeeded)
+            await db.user_favorites.delete_many({"user_id": {"$in": succeeded}})
+            await db.listings.update_many(
+                {"seller_id": {"$in": succeeded}},
+                [{"$set": {
+                    "status": "inactive",
+                    "seller_id": {"$concat": ["deleted_user_", {"$substrCP": ["$seller_id", 0, 8]}]}
+                }}]
+            )
+        elif succeeded and action in ("approve", "reject"):
+            await notification_service.notify_many([
+                bulk_registration_notification(action, users_by_id[user_id]) for user_id in succeeded
+            ])
         
         return {
             "message": f"Bulk {action} completed",
             "results": results
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Bulk action failed: {str(e)}")
 
@@ -4048,6 +3837,9 @@ async def update_menu_settings(settings: dict, current_user: dict = Depends(requ
             upsert=True
         )
         
+        # Recompile the per-role snapshots (new ETags) from what was just written
+        await menu_snapshot_service.rebuild(menu_doc)
+        
         return {
             "message": "Menu settings updated successfully",
             "settings": {
@@ -4056,6 +3848,8 @@ async def update_menu_settings(settings: dict, current_user: dict = Depends(requ
             }
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to update menu settings: {str(e)}")
 
@@ -4126,81 +3920,28 @@ async def get_available_icons(current_user: dict = Depends(require_admin_role)):
         raise HTTPException(status_code=500, detail=f"Failed to get available icons: {str(e)}")
 
 @app.get("/api/menu-settings/user/{user_id}")
-async def get_user_menu_settings(user_id: str):
-    """Get menu settings for a specific user based on their role"""
+async def get_user_menu_settings(user_id: str, request: Request):
+    """Get menu settings for a specific user based on their role (ETag / If-None-Match aware)"""
     try:
-        # Get user data to determine role
-        user = await db.users.find_one({"id": user_id})
-        if not user:
-            raise HTTPException(status_code=404, detail="User not found")
-        
-        # Map user role to menu settings role format
-        user_role = user.get("role", "buyer")
-        user_rbac_role = user.get("user_role", "")
-        
-        # Convert RBAC role to menu settings role
-        if user_role == "admin" or user_rbac_role in ["Admin", "Admin-Manager"]:
-            menu_role = "admin"
-        elif user_rbac_role == "Admin-Manager":
-            menu_role = "manager"  
-        elif user_rbac_role in ["User-Seller"]:
-            menu_role = "seller"
-        elif user_rbac_role in ["User-Buyer"]:
-            menu_role = "buyer"
-        else:
-            # Default fallback based on user role
-            menu_role = user_role if user_role in ["admin", "manager", "seller", "buyer"] else "buyer"
-        
-        # Get menu settings
-        menu_settings = await db.menu_settings.find_one({"type": "menu_config"})
-        
-        if not menu_settings:
-            # Return default settings for user role
-            return {
-                "desktop_menu": {},
-                "mobile_menu": {},
-                "user_role": menu_role
-            }
-        
-        # Filter menu items based on user role (including custom items)
-        filtered_desktop = {}
-        filtered_mobile = {}
-        
-        # Filter regular menu items
-        for item_key, item_config in menu_settings.get("desktop_menu", {}).items():
-            if item_key != "custom_items":  # Skip custom_items array, handle separately
-                if item_config.get("enabled", True) and menu_role in item_config.get("roles", []):
-                    filtered_desktop[item_key] = item_config
-        
-        for item_key, item_config in menu_settings.get("mobile_menu", {}).items():
-            if item_key != "custom_items":  # Skip custom_items array, handle separately
-                if item_config.get("enabled", True) and menu_role in item_config.get("roles", []):
-                    filtered_mobile[item_key] = item_config
-        
-        # Filter custom items separately
-        desktop_custom_items = []
-        for custom_item in menu_settings.get("desktop_menu", {}).get("custom_items", []):
-            if custom_item.get("enabled", True) and menu_role in custom_item.get("roles", []):
-                desktop_custom_items.append(custom_item)
-        
-        mobile_custom_items = []
-        for custom_item in menu_settings.get("mobile_menu", {}).get("custom_items", []):
-            if custom_item.get("enabled", True) and menu_role in custom_item.get("roles", []):
-                mobile_custom_items.append(custom_item)
+        # Role comes from the cached principal; Mongo is only read on a cold cache
+        user = security_service.principal_cache.get(user_id)
+        if user is None:
+            user = await db.users.find_one({"id": user_id})
+            if not user:
+                raise HTTPException(status_code=404, detail="User not found")
+            security_service.principal_cache.set(user_id, user)
         
-        # Add filtered custom items back to the response
-        if desktop_custom_items:
-            filtered_desktop["custom_items"] = desktop_custom_items
+        etag, payload = await menu_snapshot_service.get(resolve_menu_role(user))
+        headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
         
-        if mobile_custom_items:
-            filtered_mobile["custom_items"] = mobile_custom_items
+        if request.headers.get("if-none-match") == etag:
+            menu_snapshot_service.stats["not_modified"] += 1
+            return Response(status_code=304, headers=headers)
         
-        return {
-            "desktop_menu": filtered_desktop,
-            "mobile_menu": filtered_mobile,
-            "user_role": menu_role
-        }
+        return JSONResponse(content=payload, headers=headers)
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get user menu settings: {str(e)}")
 
@@ -4512,12 +4253,16 @@ async def create_listing(request: Request, listing_data: dict):
             if field not in listing_data:
                 raise HTTPException(status_code=400, detail=f"Missing required field: {field}")
         
+        # Precompute normalized tokens for indexed keyword search
+        listing_data["search_tokens"] = build_search_tokens(listing_data)
+        
         # Insert into database
         result = await db.listings.insert_one(listing_data)
         
         # Invalidate listings cache when new listing is created
         await cache_service.invalidate_listings_cache()
         await cache_service.invalidate_dashboard_cache()
+        await invalidate_seller_dashboard(listing_data.get("seller_id"))
         
         # Index the new listing in Elasticsearch
         await search_service.index_listing(listing_data)
@@ -4567,33 +4312,41 @@ async def update_listing(listing_id: str, update_data: dict):
     """Update an existing listing"""
     try:
         update_data["updated_at"] = datetime.utcnow().isoformat()
+        update_data.pop("search_tokens", None)
         
-        result = await db.listings.update_one(
+        # Keep search tokens in sync when any searchable field changes
+        if any(field in update_data for field in TOKEN_SOURCE_FIELDS):
+            current = await db.listings.find_one(
+                {"id": listing_id}, {field: 1 for field in TOKEN_SOURCE_FIELDS}
+            )
+            if current:
+                current.update({field: update_data[field] for field in TOKEN_SOURCE_FIELDS if field in update_data})
+                update_data["search_tokens"] = build_search_tokens(current)
+        
+        updated_listing = await db.listings.find_one_and_update(
             {"id": listing_id},
-            {"$set": update_data}
+            {"$set": update_data},
+            return_document=ReturnDocument.AFTER
         )
         
-        if result.matched_count == 0:
+        if not updated_listing:
             raise HTTPException(status_code=404, detail="Listing not found")
         
+        await invalidate_seller_dashboard(updated_listing.get("seller_id"))
+        
         # Clean up favorites if listing is being set to inactive or sold
         status = update_data.get("status")
         if status in ["inactive", "sold"]:
             try:
-                await db.user_favorites.delete_many({"item_id": listing_id})
+                await remove_listing_from_favorites(listing_id)
                 print(f"DEBUG: Cleaned up favorites for {status} listing {listing_id}")
             except Exception as fav_error:
                 print(f"Warning: Failed to clean up favorites for {status} listing: {fav_error}")
         
-        # Get the updated listing to return
-        updated_listing = await db.listings.find_one({"id": listing_id})
-        if updated_listing:
-            # Convert ObjectId to string for JSON serialization
-            if updated_listing.get('_id'):
-                updated_listing['_id'] = str(updated_listing['_id'])
-            return updated_listing
-        else:
-            return {"message": "Listing updated successfully"}
+        # Convert ObjectId to string for JSON serialization
+        if updated_listing.get('_id'):
+            updated_listing['_id'] = str(updated_listing['_id'])
+        return updated_listing
         
     except HTTPException:
         raise
@@ -4605,28 +4358,30 @@ async def delete_listing(listing_id: str):
     """Delete a listing by ID with proper ID format handling"""
     try:
         # Try to delete by UUID 'id' field first (preferred format)
-        result = await db.listings.delete_one({"id": listing_id})
+        deleted = await db.listings.find_one_and_delete({"id": listing_id}, {"seller_id": 1})
         
         # If not found by UUID, try by ObjectId (backward compatibility)
-        if result.deleted_count == 0:
+        if deleted is None:
             try:
                 from bson import ObjectId
                 if ObjectId.is_valid(listing_id):
-                    result = await db.listings.delete_one({"_id": ObjectId(listing_id)})
+                    deleted = await db.listings.find_one_and_delete({"_id": ObjectId(listing_id)}, {"seller_id": 1})
             except:
                 pass  # Not a valid ObjectId, continue with original error
         
-        if result.deleted_count == 0:
+        if deleted is None:
             raise HTTPException(status_code=404, detail=f"Listing with ID {listing_id} not found")
         
+        await invalidate_seller_dashboard(deleted.get("seller_id"))
+        
         # Clean up favorites - remove this listing from all users' favorites
         try:
-            await db.user_favorites.delete_many({"item_id": listing_id})
+            await remove_listing_from_favorites(listing_id)
             print(f"DEBUG: Cleaned up favorites for deleted listing {listing_id}")
         except Exception as fav_error:
             print(f"Warning: Failed to clean up favorites for listing {listing_id}: {fav_error}")
         
-        return {"message": f"Listing {listing_id} deleted successfully", "deleted_count": result.deleted_count}
+        return {"message": f"Listing {listing_id} deleted successfully", "deleted_count": 1}
     except HTTPException:
         raise
     except Exception as e:
@@ -4748,6 +4503,7 @@ async def check_listing_expiration(listing_id: str):
                 )
             
             await db.listings.update_one({"id": listing_id}, {"$set": update_data})
+            await invalidate_seller_dashboard(listing["seller_id"])
             
             # Create expiration notification for seller
             await create_listing_expiration_notification(listing_id, listing["seller_id"], highest_bidder_id, highest_bid_amount)
@@ -4771,7 +4527,7 @@ async def check_listing_expiration(listing_id: str):
         raise HTTPException(status_code=500, detail=f"Failed to check expiration: {str(e)}")
 
 @app.get("/api/listings/{listing_id}")
-async def get_listing(listing_id: str):
+async def get_listing(listing_id: str, request: Request, viewer_id: str = None):
     """Get a specific listing by ID - returns full details including images and bid_info"""
     try:
         listing = await db.listings.find_one({"id": listing_id})
@@ -4781,11 +4537,8 @@ async def get_listing(listing_id: str):
         
         listing['_id'] = str(listing['_id'])
         
-        # Increment view count
-        await db.listings.update_one(
-            {"id": listing_id},
-            {"$inc": {"views": 1}}
-        )
+        # Increment view count (write-behind, one view per viewer per dedup window)
+        counter_aggregator.record_view("listings", listing_id, viewer_id or get_client_ip(request))
         
         # Add bid_info with highest_bidder_id for individual listing page
         if not listing.get('bid_info'):
@@ -4949,29 +4702,78 @@ async def upload_listing_image(listing_id: str, file: UploadFile = File(...)):
 # ============================================================================
 
 # Favorites endpoints
+PLACEHOLDER_IMAGE = '/api/placeholder-image.jpg'
+LISTING_CARD_FIELDS = [
+    "id", "title", "price", "currency", "condition", "category", "location", "tags",
+    "status", "seller_id", "seller", "views", "created_at", "has_time_limit", "expires_at",
+    "time_limit_hours", "is_expired", "bid_info", "average_rating", "review_count"
+]
+LISTING_CARD_PROJECTION = {
+    "_id": 0,
+    **{field: 1 for field in LISTING_CARD_FIELDS},
+    # Inline base64 images become thumbnail URLs inside Mongo, so they never cross the wire
+    "images": {"$map": {
+        "input": {"$range": [0, {"$size": {"$ifNull": ["$images", []]}}]},
+        "as": "index",
+        "in": {"$let": {
+            "vars": {"image": {"$arrayElemAt": ["$images", "$$index"]}},
+            "in": {"$switch": {
+                "branches": [
+                    {"case": {"$ne": [{"$type": "$$image"}, "string"]}, "then": PLACEHOLDER_IMAGE},
+                    {"case": {"$eq": [{"$substrCP": ["$$image", 0, 5]}, "data:"]},
+                     "then": {"$concat": ["/api/listings/", "$id", "/thumbnail/", {"$toString": "$$index"}]}}
+                ],
+                "default": "$$image"
+            }}
+        }}
+    }}
+}
+
+async def get_favorite_ids(user_id: str) -> set:
+    """Ids of the listings a user has favorited, cached per user for is-favorited checks"""
+    cached = await cache_service.get_cached_user_favorites(user_id)
+    if cached is not None:
+        return set(cached)
+    
+    item_ids = await db.user_favorites.distinct("item_id", {"user_id": user_id})
+    await cache_service.cache_user_favorites(user_id, item_ids)
+    return set(item_ids)
+
+async def remove_listing_from_favorites(listing_id: str) -> int:
+    """Remove a listing from every user's favorites and drop those users' cached id sets"""
+    user_ids = await db.user_favorites.distinct("user_id", {"item_id": listing_id})
+    if user_ids:
+        await db.user_favorites.delete_many({"item_id": listing_id})
+        for user_id in user_ids:
+            await cache_service.invalidate_user_favorites(user_id)
+    return len(user_ids)
+
 @app.get("/api/user/{user_id}/favorites")
-async def get_user_favorites(user_id: str):
-    """Get user's favorite items with full listing details"""
+async def get_user_favorites(user_id: str, skip: int = 0, limit: int = 200):
+    """Get user's favorite items as listing cards, most recently favorited first"""
     try:
-        # Get user's favorite item IDs
-        favorites = await db.user_favorites.find({"user_id": user_id}).to_list(length=None)
+        skip = max(0, skip)
+        limit = max(1, min(limit, 500))
+        
+        favorites = await db.user_favorites.find(
+            {"user_id": user_id}, {"_id": 0, "item_id": 1, "created_at": 1}
+        ).sort("created_at", -1).skip(skip).limit(limit).to_list(length=limit)
         
         if not favorites:
             return []
         
-        # Extract item IDs from favorites
-        item_ids = [favorite["item_id"] for favorite in favorites]
+        # One $in fetch for the whole page, joined back to the favorites by id
+        listings = await db.listings.aggregate([
+            {"$match": {"id": {"$in": [favorite["item_id"] for favorite in favorites]}}},
+            {"$project": LISTING_CARD_PROJECTION}
+        ]).to_list(length=None)
+        listings_by_id = {listing["id"]: listing for listing in listings}
         
-        # Get full listing details for favorite items
         favorite_listings = []
-        for item_id in item_ids:
-            listing = await db.listings.find_one({"id": item_id})
+        for favorite in favorites:
+            listing = listings_by_id.get(favorite["item_id"])
             if listing:
-                listing['_id'] = str(listing['_id'])
-                # Add favorite metadata
-                favorite_record = next((fav for fav in favorites if fav["item_id"] == item_id), None)
-                if favorite_record:
-                    listing['favorited_at'] = favorite_record.get('created_at')
+                listing['favorited_at'] = favorite.get('created_at')
                 favorite_listings.append(listing)
         
         return favorite_listings
@@ -4990,11 +4792,12 @@ async def add_to_favorites(user_id: str, item_id: str):
         }
         
         # Check if already exists
-        existing = await db.user_favorites.find_one({"user_id": user_id, "item_id": item_id})
+        existing = await db.user_favorites.find_one({"user_id": user_id, "item_id": item_id}, {"_id": 1})
         if existing:
             return {"message": "Item already in favorites"}
         
         await db.user_favorites.insert_one(favorite_data)
+        await cache_service.invalidate_user_favorites(user_id)
         return {"message": "Added to favorites successfully"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to add to favorites: {str(e)}")
@@ -5008,6 +4811,7 @@ async def remove_from_favorites(user_id: str, item_id: str):
         if result.deleted_count == 0:
             raise HTTPException(status_code=404, detail="Favorite not found")
         
+        await cache_service.invalidate_user_favorites(user_id)
         return {"message": "Removed from favorites successfully"}
     except HTTPException:
         raise
@@ -5094,9 +4898,52 @@ async def remove_from_cart(user_id: str, item_id: str):
         raise HTTPException(status_code=500, detail=f"Failed to remove from cart: {str(e)}")
 
 # Messages endpoints
+@app.get("/api/user/{user_id}/conversations")
+async def get_user_conversations(user_id: str, limit: int = 20, before: Optional[str] = None):
+    """Get the user's inbox: one entry per conversation, most recent first"""
+    try:
+        return await conversation_service.list_conversations(user_id, limit=max(1, min(limit, 100)), before=before)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to fetch conversations: {str(e)}")
+
+@app.get("/api/user/{user_id}/conversations/{conversation_id}/messages")
+async def get_conversation_messages(
+    user_id: str,
+    conversation_id: str,
+    limit: int = 50,
+    before: Optional[str] = None,
+    before_id: Optional[str] = None
+):
+    """Get one page of a conversation (oldest first); pass next_cursor back to load older messages"""
+    try:
+        if not await conversation_service.get_conversation(conversation_id, user_id):
+            raise HTTPException(status_code=404, detail="Conversation not found")
+        
+        return await conversation_service.get_messages(
+            conversation_id, limit=max(1, min(limit, 200)), before=before, before_id=before_id
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to fetch conversation messages: {str(e)}")
+
+@app.put("/api/user/{user_id}/conversations/{conversation_id}/read")
+async def mark_conversation_read(user_id: str, conversation_id: str):
+    """Mark all messages addressed to the user in a conversation as read"""
+    try:
+        if not await conversation_service.get_conversation(conversation_id, user_id):
+            raise HTTPException(status_code=404, detail="Conversation not found")
+        
+        marked = await conversation_service.mark_read(conversation_id, user_id)
+        return {"message": "Conversation marked as read", "marked_count": marked}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to mark conversation as read: {str(e)}")
+
 @app.get("/api/user/{user_id}/messages")
 async def get_user_messages(user_id: str):
-    """Get user's messages with sender/recipient information (OPTIMIZED)"""
+    """Get user's messages with sender/recipient information (legacy full history; prefer /conversations)"""
     try:
         # Get messages for user (sorted oldest first for proper mobile display)
         messages = await db.user_messages.find({"$or": [{"sender_id": user_id}, {"recipient_id": user_id}]}).sort("created_at", 1).to_list(length=None)
@@ -5107,30 +4954,9 @@ async def get_user_messages(user_id: str):
             user_ids.add(message['sender_id'])
             user_ids.add(message['recipient_id'])
         
-        # OPTIMIZATION: Single query to get all user information
-        users_list = await db.users.find({"id": {"$in": list(user_ids)}}).to_list(length=None)
-        users_dict = {user['id']: user for user in users_list}
-        
-        # Fallback lookup with ObjectId for users not found (try both approaches in one query)
-        missing_user_ids = user_ids - set(users_dict.keys())
-        if missing_user_ids:
-            try:
-                from bson import ObjectId
-                # Try to find by ObjectId
-                oid_list = []
-                for uid in missing_user_ids:
-                    try:
-                        oid_list.append(ObjectId(uid))
-                    except:
-                        continue
-                
-                if oid_list:
-                    fallback_users = await db.users.find({"_id": {"$in": oid_list}}).to_list(length=None)
-                    for user in fallback_users:
-                        users_dict[str(user['_id'])] = user
-            except Exception as fallback_error:
-                print(f"Fallback user lookup error: {fallback_error}")
-        
+        # OPTIMIZATION: Single bulk lookup for all user information
+        users_dict = await fetch_users_by_ids(user_ids, {"username": 1, "full_name": 1})
+        
         # Enrich messages with user information
         enriched_messages = []
         for message in messages:
@@ -5164,8 +4990,13 @@ async def send_message(user_id: str, message_data: dict):
             "id": str(uuid.uuid4())
         }
         
-        await db.user_messages.insert_one(message)
-        return {"message": "Message sent successfully", "id": message["id"]}
+        if not message["recipient_id"]:
+            raise HTTPException(status_code=400, detail="recipient_id is required")
+        
+        await conversation_service.record_message(message)
+        return {"message": "Message sent successfully", "id": message["id"], "conversation_id": message["conversation_id"]}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to send message: {str(e)}")
 
@@ -5173,14 +5004,19 @@ async def send_message(user_id: str, message_data: dict):
 async def mark_message_read(user_id: str, message_id: str):
     """Mark message as read"""
     try:
-        result = await db.user_messages.update_one(
+        message = await db.user_messages.find_one_and_update(
             {"id": message_id, "$or": [{"sender_id": user_id}, {"recipient_id": user_id}]},
-            {"$set": {"is_read": True, "read_at": datetime.utcnow().isoformat()}}
+            {"$set": {"is_read": True, "read_at": datetime.utcnow().isoformat()}},
+            projection={"recipient_id": 1, "conversation_id": 1, "is_read": 1}
         )
         
-        if result.matched_count == 0:
+        if not message:
             raise HTTPException(status_code=404, detail="Message not found")
         
+        # Returned document is the pre-update state
+        if not message.get("is_read"):
+            await conversation_service.message_read(message, user_id)
+        
         return {"message": "Message marked as read"}
     except HTTPException:
         raise
@@ -5240,21 +5076,31 @@ async def create_notification(user_id: str, notification_data: dict):
             "id": str(uuid.uuid4())
         }
         
-        await db.user_notifications.insert_one(notification)
+        await notification_service.notify(notification)
         return {"message": "Notification created successfully", "id": notification["id"]}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to create notification: {str(e)}")
 
+@app.get("/api/user/{user_id}/notifications/unread-count")
+async def get_unread_notification_count(user_id: str, current_user: dict = Depends(get_current_user)):
+    """Get the unread notification count from the materialized counter"""
+    try:
+        if current_user.get("id") != user_id and current_user.get("role") != "admin":
+            raise HTTPException(status_code=403, detail="Access denied")
+        
+        return {"user_id": user_id, "unread_count": await notification_service.get_unread_count(user_id)}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to get unread count: {str(e)}")
+
 @app.put("/api/user/{user_id}/notifications/{notification_id}/read")
 async def mark_notification_read(user_id: str, notification_id: str):
     """Mark notification as read"""
     try:
-        result = await db.user_notifications.update_one(
-            {"user_id": user_id, "id": notification_id},
-            {"$set": {"read": True, "read_at": datetime.utcnow().isoformat()}}
-        )
+        result = await notification_service.mark_read(user_id, notification_id)
         
-        if result.matched_count == 0:
+        if result is None:
             raise HTTPException(status_code=404, detail="Notification not found")
         
         return {"message": "Notification marked as read"}
@@ -5270,28 +5116,31 @@ async def update_notification(user_id: str, notification_id: str, update_data: d
         # Prepare update fields
         update_fields = {}
         
-        if "read" in update_data:
-            update_fields["read"] = update_data["read"]
-            if update_data["read"]:
-                update_fields["read_at"] = datetime.utcnow().isoformat()
-        
         if "archived" in update_data:
             update_fields["archived"] = update_data["archived"]
             update_fields["archived_at"] = datetime.utcnow().isoformat() if update_data["archived"] else None
             
-        if not update_fields:
+        if not update_fields and "read" not in update_data:
             raise HTTPException(status_code=400, detail="No valid update fields provided")
         
-        # Update the notification
-        result = await db.user_notifications.update_one(
-            {"user_id": user_id, "id": notification_id},
-            {"$set": update_fields}
-        )
+        # Read state goes through the notifier so the unread counter stays in sync
+        if "read" in update_data:
+            if await notification_service.mark_read(user_id, notification_id, bool(update_data["read"])) is None:
+                raise HTTPException(status_code=404, detail="Notification not found")
         
-        if result.matched_count == 0:
-            raise HTTPException(status_code=404, detail="Notification not found")
+        if update_fields:
+            result = await db.user_notifications.update_one(
+                {"user_id": user_id, "id": notification_id},
+                {"$set": update_fields}
+            )
+            
+            if result.matched_count == 0:
+                raise HTTPException(status_code=404, detail="Notification not found")
         
-        return {"message": "Notification updated successfully", "updated_fields": list(update_fields.keys())}
+        updated = list(update_fields.keys())
+        if "read" in update_data:
+            updated = ["read"] + (["read_at"] if update_data["read"] else []) + updated
+        return {"message": "Notification updated successfully", "updated_fields": updated}
     except HTTPException:
         raise
     except Exception as e:
@@ -5308,10 +5157,7 @@ async def delete_notification(notification_id: str, user_id: str = None):
         
         # Try both collections for compatibility
         result = await db.notifications.delete_one(query)
-        if result.deleted_count == 0:
-            result = await db.user_notifications.delete_one(query)
-        
-        if result.deleted_count == 0:
+        if result.deleted_count == 0 and not await notification_service.delete(user_id, notification_id):
             raise HTTPException(status_code=404, detail="Notification not found")
         
         return {"message": "Notification deleted successfully"}
@@ -5330,13 +5176,7 @@ async def delete_user_notification(user_id: str, notification_id: str):
             "id": notification_id
         })
         
-        if result.deleted_count == 0:
-            result = await db.user_notifications.delete_one({
-                "user_id": user_id, 
-                "id": notification_id
-            })
-        
-        if result.deleted_count == 0:
+        if result.deleted_count == 0 and not await notification_service.delete(user_id, notification_id):
             raise HTTPException(status_code=404, detail="Notification not found")
         
         return {"message": "Notification deleted successfully"}
@@ -5415,6 +5255,7 @@ async def submit_tender(tender_data: dict):
         }
         
         await db.tenders.insert_one(tender)
+        await invalidate_seller_dashboard(seller_id)
         
         # Create notification for seller
         notification = {
@@ -5429,7 +5270,7 @@ async def submit_tender(tender_data: dict):
             "listing_id": listing_id
         }
         
-        await db.user_notifications.insert_one(notification)
+        await notification_service.notify(notification)
         
         return {
             "message": "Tender submitted successfully",
@@ -5451,10 +5292,15 @@ async def get_listing_tenders(listing_id: str):
             "status": "active"
         }).sort("offer_amount", -1).to_list(length=None)
         
-        # Enrich with buyer information
+        # Enrich with buyer information (single bulk lookup)
+        buyers = await fetch_users_by_ids(
+            (tender["buyer_id"] for tender in tenders),
+            {"username": 1, "full_name": 1, "created_at": 1}
+        )
+        
         enriched_tenders = []
         for tender in tenders:
-            buyer = await db.users.find_one({"id": tender["buyer_id"]})
+            buyer = buyers.get(tender["buyer_id"])
             buyer_info = {
                 "id": buyer.get("id", ""),
                 "username": buyer.get("username", "Unknown"),
@@ -5484,15 +5330,24 @@ async def get_buyer_tenders(buyer_id: str):
             "buyer_id": buyer_id
         }).sort("created_at", -1).to_list(length=None)
         
-        # Enrich with listing and seller information
+        # Enrich with listing and seller information (one bulk lookup each)
+        listings = await fetch_listings_by_ids(
+            (tender["listing_id"] for tender in tenders),
+            {"title": 1, "price": 1, "images": 1, "seller_id": 1}
+        )
+        sellers = await fetch_users_by_ids(
+            (listing.get("seller_id") for listing in listings.values()),
+            {"username": 1, "full_name": 1, "email": 1, "is_business": 1, "business_name": 1, "created_at": 1}
+        )
+        
         enriched_tenders = []
         for tender in tenders:
-            listing = await db.listings.find_one({"id": tender["listing_id"]})
+            listing = listings.get(tender["listing_id"])
             if not listing:
                 continue
             
             # Get seller information
-            seller = await db.users.find_one({"id": listing.get("seller_id")})
+            seller = sellers.get(listing.get("seller_id"))
             seller_info = {
                 "id": seller.get("id", ""),
                 "username": seller.get("username", "Unknown"),
@@ -5585,10 +5440,11 @@ async def accept_tender(tender_id: str, acceptance_data: dict):
             {"id": tender["listing_id"]},
             {"$set": {"status": "sold", "sold_at": current_time, "sold_price": tender["offer_amount"]}}
         )
+        await invalidate_seller_dashboard(seller_id)
         
         # Clean up favorites for sold listing
         try:
-            await db.user_favorites.delete_many({"item_id": tender["listing_id"]})
+            await remove_listing_from_favorites(tender["listing_id"])
             print(f"DEBUG: Cleaned up favorites for sold listing {tender['listing_id']}")
         except Exception as fav_error:
             print(f"Warning: Failed to clean up favorites for sold listing: {fav_error}")
@@ -5609,7 +5465,7 @@ async def accept_tender(tender_id: str, acceptance_data: dict):
             "listing_id": tender["listing_id"]
         }
         
-        await db.user_notifications.insert_one(winning_notification)
+        await notification_service.notify(winning_notification)
         
         # Send automated message to winning buyer
         message = {
@@ -5622,7 +5478,7 @@ async def accept_tender(tender_id: str, acceptance_data: dict):
             "id": str(uuid.uuid4())
         }
         
-        await db.user_messages.insert_one(message)
+        await conversation_service.record_message(message)
         
         # Create notifications for losing bidders
         losing_tenders = await db.tenders.find({
@@ -5644,7 +5500,7 @@ async def accept_tender(tender_id: str, acceptance_data: dict):
                 "listing_id": tender["listing_id"]
             }
             
-            await db.user_notifications.insert_one(losing_notification)
+            await notification_service.notify(losing_notification)
         
         # Trigger system notifications for purchase complete event
         await trigger_system_notifications(tender["buyer_id"], "purchase_complete")
@@ -5682,6 +5538,7 @@ async def reject_tender(tender_id: str, rejection_data: dict):
                 }
             }
         )
+        await invalidate_seller_dashboard(seller_id)
         
         # Create notification for buyer
         listing = await db.listings.find_one({"id": tender["listing_id"]})
@@ -5697,7 +5554,7 @@ async def reject_tender(tender_id: str, rejection_data: dict):
             "listing_id": tender["listing_id"]
         }
         
-        await db.user_notifications.insert_one(notification)
+        await notification_service.notify(notification)
         
         return {"message": "Tender rejected successfully"}
         
@@ -5714,14 +5571,8 @@ async def get_seller_tenders_overview(seller_id: str):
         listings = await db.listings.find({"seller_id": seller_id, "status": "active"}).to_list(length=None)
         
         # Get seller information
-        seller = await db.users.find_one({"id": seller_id})
-        if not seller:
-            try:
-                from bson import ObjectId
-                seller = await db.users.find_one({"_id": ObjectId(seller_id)})
-            except:
-                pass
-                
+        seller = await db.users.find_one({"id": await resolve_user_id(seller_id)})
+        
         seller_info = {
             "id": seller.get("id", ""),
             "username": seller.get("username", "Unknown"),
@@ -5737,29 +5588,11 @@ async def get_seller_tenders_overview(seller_id: str):
             "status": "active"
         }).sort("offer_amount", -1).to_list(length=None)
         
-        # OPTIMIZATION: Get all unique buyer IDs and fetch buyers in one query
-        buyer_ids = list(set(tender["buyer_id"] for tender in all_tenders))
-        buyers_list = await db.users.find({"id": {"$in": buyer_ids}}).to_list(length=None)
-        buyers_dict = {buyer['id']: buyer for buyer in buyers_list}
-        
-        # Fallback lookup with ObjectId for buyers not found
-        missing_buyer_ids = set(buyer_ids) - set(buyers_dict.keys())
-        if missing_buyer_ids:
-            try:
-                from bson import ObjectId
-                oid_list = []
-                for uid in missing_buyer_ids:
-                    try:
-                        oid_list.append(ObjectId(uid))
-                    except:
-                        continue
-                
-                if oid_list:
-                    fallback_buyers = await db.users.find({"_id": {"$in": oid_list}}).to_list(length=None)
-                    for buyer in fallback_buyers:
-                        buyers_dict[str(buyer['_id'])] = buyer
-            except Exception as fallback_error:
-                print(f"Fallback buyer lookup error: {fallback_error}")
+        # OPTIMIZATION: Get all unique buyers in one bulk lookup
+        buyers_dict = await fetch_users_by_ids(
+            (tender["buyer_id"] for tender in all_tenders),
+            {"username": 1, "full_name": 1, "is_business": 1, "business_name": 1}
+        )
         
         # Group tenders by listing_id
         tenders_by_listing = {}
@@ -5823,82 +5656,6 @@ async def get_seller_tenders_overview(seller_id: str):
 # TENDER/BIDDING SYSTEM ENDPOINTS
 # ============================================================================
 
-@app.get("/api/tenders/listing/{listing_id}")
-async def get_listing_tenders(listing_id: str):
-    """Get all active tenders for a listing (seller view)"""
-    try:
-        tenders = await db.tenders.find({
-            "listing_id": listing_id,
-            "status": "active"
-        }).sort("offer_amount", -1).to_list(length=None)
-        
-        # Enrich with buyer information
-        enriched_tenders = []
-        for tender in tenders:
-            buyer = await db.users.find_one({"id": tender["buyer_id"]})
-            buyer_info = {
-                "id": buyer.get("id", ""),
-                "username": buyer.get("username", "Unknown"),
-                "full_name": buyer.get("full_name", ""),
-                "created_at": buyer.get("created_at", "")
-            } if buyer else {}
-            
-            enriched_tender = {
-                "id": tender["id"],
-                "offer_amount": tender["offer_amount"],
-                "status": tender["status"],
-                "created_at": tender["created_at"].isoformat() if tender.get("created_at") else "",
-                "buyer": buyer_info
-            }
-            enriched_tenders.append(enriched_tender)
-        
-        return enriched_tenders
-        
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to get listing tenders: {str(e)}")
-
-@app.get("/api/tenders/buyer/{buyer_id}")
-async def get_buyer_tenders(buyer_id: str):
-    """Get all tenders submitted by a buyer (OPTIMIZED)"""
-    try:
-        tenders = await db.tenders.find({
-            "buyer_id": buyer_id
-        }).sort("created_at", -1).to_list(length=None)
-        
-        # OPTIMIZATION: Collect all listing IDs to minimize database queries
-        listing_ids = list(set(tender["listing_id"] for tender in tenders))
-        
-        # OPTIMIZATION: Single query to get all listing information
-        listings_list = await db.listings.find({"id": {"$in": listing_ids}}).to_list(length=None)
-        listings_dict = {listing['id']: listing for listing in listings_list}
-        
-        # Enrich with listing information from cached lookup
-        enriched_tenders = []
-        for tender in tenders:
-            listing = listings_dict.get(tender["listing_id"])
-            if not listing:
-                continue
-                
-            enriched_tender = {
-                "id": tender["id"],
-                "offer_amount": tender["offer_amount"],
-                "status": tender["status"],
-                "created_at": tender["created_at"].isoformat() if tender.get("created_at") else "",
-                "listing": {
-                    "id": listing.get("id", ""),
-                    "title": listing.get("title", ""),
-                    "price": listing.get("price", 0),
-                    "images": listing.get("images", [])
-                }
-            }
-            enriched_tenders.append(enriched_tender)
-        
-        return enriched_tenders
-        
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to get buyer tenders: {str(e)}")
-
-
 @app.put("/api/tenders/{tender_id}/reject")
 async def reject_tender(tender_id: str, rejection_data: dict):
     """Reject a specific tender offer"""
@@ -5925,6 +5682,7 @@ async def reject_tender(tender_id: str, rejection_data: dict):
                 }
             }
         )
+        await invalidate_seller_dashboard(seller_id)
         
         # Create notification for buyer
         listing = await db.listings.find_one({"id": tender["listing_id"]})
@@ -5940,7 +5698,7 @@ async def reject_tender(tender_id: str, rejection_data: dict):
             "listing_id": tender["listing_id"]
         }
         
-        await db.user_notifications.insert_one(notification)
+        await notification_service.notify(notification)
         
         return {"message": "Tender rejected successfully"}
         
@@ -6011,7 +5769,7 @@ async def create_buy_request(order_data: dict):
             "listing_id": listing_id
         }
         
-        await db.user_notifications.insert_one(notification)
+        await notification_service.notify(notification)
         
         return {
             "message": "Buy request created successfully",
@@ -6170,10 +5928,11 @@ async def approve_buy_request(order_id: str, approval_data: dict):
             {"id": order["listing_id"]},
             {"$set": {"status": "sold", "sold_at": current_time}}
         )
+        await invalidate_seller_dashboard(seller_id)
         
         # Clean up favorites for sold listing
         try:
-            await db.user_favorites.delete_many({"item_id": order["listing_id"]})
+            await remove_listing_from_favorites(order["listing_id"])
             print(f"DEBUG: Cleaned up favorites for sold listing {order['listing_id']}")
         except Exception as fav_error:
             print(f"Warning: Failed to clean up favorites for sold listing: {fav_error}")
@@ -6192,7 +5951,7 @@ async def approve_buy_request(order_id: str, approval_data: dict):
             "listing_id": order["listing_id"]
         }
         
-        await db.user_notifications.insert_one(notification)
+        await notification_service.notify(notification)
         
         # TODO: Trigger chat creation between buyer and seller
         
@@ -6236,7 +5995,7 @@ async def reject_buy_request(order_id: str, rejection_data: dict):
             "listing_id": order["listing_id"]
         }
         
-        await db.user_notifications.insert_one(notification)
+        await notification_service.notify(notification)
         
         return {"message": "Buy request rejected successfully"}
         
@@ -6278,6 +6037,7 @@ async def cancel_order(order_id: str, cancel_data: dict):
                 {"id": order["listing_id"]},
                 {"$set": {"status": "active", "sold_at": None}}
             )
+            await invalidate_seller_dashboard(order.get("seller_id"))
         
         return {"message": "Order cancelled successfully"}
         
@@ -6313,10 +6073,10 @@ async def mark_order_shipped(order_id: str, ship_data: dict):
             "message": f"Your order for '{listing.get('title', 'Unknown item')}' has been shipped!",
             "type": "order_shipped",
             "read": False,
-            "created_at": datetime.utcnow()
+            "created_at": datetime.utcnow().isoformat()
         }
         
-        await db.user_notifications.insert_one(notification)
+        await notification_service.notify(notification)
         
         return {"message": "Order marked as shipped"}
         
@@ -6356,10 +6116,10 @@ async def complete_order(order_id: str, complete_data: dict):
             "message": f"Your sale of '{listing.get('title', 'Unknown item')}' has been completed!",
             "type": "order_completed",
             "read": False,
-            "created_at": datetime.utcnow()
+            "created_at": datetime.utcnow().isoformat()
         }
         
-        await db.user_notifications.insert_one(notification)
+        await notification_service.notify(notification)
         
         return {"message": "Order completed successfully"}
         
@@ -6402,7 +6162,7 @@ async def cleanup_expired_orders():
                 "listing_id": order["listing_id"]
             }
             
-            await db.user_notifications.insert_one(notification)
+            await notification_service.notify(notification)
             updated_count += 1
         
         return {"message": f"Cleaned up {updated_count} expired orders"}
@@ -6427,65 +6187,15 @@ async def upload_catalyst_excel(file: UploadFile = File(...)):
         if len(contents) > 10 * 1024 * 1024:
             raise HTTPException(status_code=400, detail="File size too large. Maximum 10MB allowed.")
         
-        df = pd.read_excel(io.BytesIO(contents))
+        # Parse in the process pool; pandas parsing and row validation are pure CPU work
+        parsed = await executor_service.run_in_process(parse_catalyst_workbook, contents)
         
-        # Validate required columns (add_info is optional)
-        required_columns = ['cat_id', 'name', 'ceramic_weight', 'pt_ppm', 'pd_ppm', 'rh_ppm']
-        optional_columns = ['add_info']
-        missing_columns = [col for col in required_columns if col not in df.columns]
+        missing_columns = parsed["missing_columns"]
         if missing_columns:
-            raise HTTPException(status_code=400, detail=f"Missing required columns: {missing_columns}. Optional columns: {optional_columns}")
+            raise HTTPException(status_code=400, detail=f"Missing required columns: {missing_columns}. Optional columns: {CATALYST_OPTIONAL_COLUMNS}")
         
-        # Validate data and process
-        catalysts = []
-        errors = []
-        
-        for index, row in df.iterrows():
-            try:
-                # Helper function to safely convert to float
-                def safe_float(value, field_name, row_num):
-                    if pd.isna(value) or value == '' or value is None:
-                        return 0.0
-                    try:
-                        result = float(value)
-                        # Check for valid range (avoid infinity and very large numbers)
-                        if not (-1e10 <= result <= 1e10):
-                            errors.append(f"Row {row_num}: {field_name} value {result} is out of valid range")
-                            return 0.0
-                        return result
-                    except (ValueError, TypeError):
-                        errors.append(f"Row {row_num}: Invalid {field_name} value '{value}'")
-                        return 0.0
-                
-                row_num = index + 2  # +2 because Excel rows start at 1 and we have header
-                
-                catalyst_data = {
-                    "cat_id": str(row.get('cat_id', '')).strip(),
-                    "name": str(row.get('name', '')).strip(),
-                    "ceramic_weight": safe_float(row.get('ceramic_weight'), 'ceramic_weight', row_num),
-                    "pt_ppm": safe_float(row.get('pt_ppm'), 'pt_ppm', row_num),
-                    "pd_ppm": safe_float(row.get('pd_ppm'), 'pd_ppm', row_num),
-                    "rh_ppm": safe_float(row.get('rh_ppm'), 'rh_ppm', row_num),
-                    "add_info": str(row.get('add_info', '')).strip(),
-                    "created_at": datetime.now(pytz.timezone('Europe/Berlin')).isoformat(),
-                    "updated_at": datetime.now(pytz.timezone('Europe/Berlin')).isoformat(),
-                    "id": str(uuid.uuid4())
-                }
-                
-                # Validate required fields
-                if not catalyst_data["cat_id"]:
-                    errors.append(f"Row {row_num}: cat_id is required")
-                    continue
-                    
-                if not catalyst_data["name"]:
-                    errors.append(f"Row {row_num}: name is required")
-                    continue
-                
-                catalysts.append(catalyst_data)
-                
-            except Exception as row_error:
-                errors.append(f"Row {index + 2}: {str(row_error)}")
-                continue
+        catalysts = parsed["catalysts"]
+        errors = parsed["errors"]
         
         # Check if we have any valid data
         if not catalysts and errors:
@@ -6499,8 +6209,8 @@ async def upload_catalyst_excel(file: UploadFile = File(...)):
         response = {
             "message": f"Successfully uploaded {len(catalysts)} catalyst records",
             "count": len(catalysts),
-            "columns": list(df.columns),
-            "total_rows": len(df),
+            "columns": parsed["columns"],
+            "total_rows": parsed["total_rows"],
             "valid_rows": len(catalysts),
             "errors_count": len(errors)
         }
@@ -6513,6 +6223,8 @@ async def upload_catalyst_excel(file: UploadFile = File(...)):
         
     except HTTPException:
         raise
+    except ExecutorSaturated:
+        raise HTTPException(status_code=503, detail="Catalyst import capacity exhausted, please retry shortly")
     except Exception as e:
         error_msg = str(e)
         if "Out of range float values" in error_msg:
@@ -6856,23 +6568,14 @@ async def delete_catalyst_database(current_user: dict = Depends(require_admin_ro
 # AI-POWERED SEARCH & RECOMMENDATIONS ENDPOINTS
 # ============================================================================
 
-# Initialize AI chat for search suggestions
-async def get_ai_chat():
-    """Get initialized AI chat client"""
-    try:
-        api_key = os.environ.get('EMERGENT_LLM_KEY')
-        if not api_key:
-            raise HTTPException(status_code=500, detail="AI service not configured")
-            
-        chat = LlmChat(
-            api_key=api_key,
-            session_id="catalyst_search",
-            system_message="You are an AI assistant specialized in catalyst marketplace search. Help users find chemical catalysts by understanding their chemical needs, reaction types, and process requirements. Focus on catalyst properties like selectivity, activity, stability, and application areas. Be precise and technically relevant."
-        ).with_model("openai", "gpt-4o-mini")
-        
-        return chat
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to initialize AI service: {str(e)}")
+def get_fallback_search_suggestions(query: str) -> List[str]:
+    """Local suggestions used when the AI service is unavailable or returns unusable output"""
+    fallback_categories = ["automotive catalyst", "industrial catalyst", "precious metal catalyst", "zeolite catalyst", "hydrogenation catalyst"]
+    fallback_suggestions = []
+    for category in fallback_categories:
+        if query.lower() in category.lower():
+            fallback_suggestions.append(category)
+    return fallback_suggestions[:5]
 
 @app.post("/api/search/ai-suggestions")
 async def get_ai_search_suggestions(search_data: dict):
@@ -6884,48 +6587,49 @@ async def get_ai_search_suggestions(search_data: dict):
         if not query or len(query.strip()) < 2:
             return {"suggestions": []}
         
-        # Get available catalysts and popular products for context
-        popular_catalysts = await db.listings.find({"status": "active"}).sort("views", -1).limit(5).to_list(length=5)
+        previous_searches = context.get('previous_searches') or []
         
-        # Create context for AI
-        ai_context = f"""
+        async def build_prompt() -> str:
+            # Get available catalysts and popular products for context (only on cache miss)
+            popular_catalysts = await db.listings.find({"status": "active"}).sort("views", -1).limit(5).to_list(length=5)
+            
+            # Create context for AI
+            ai_context = f"""
         User is searching for catalysts: "{query}"
         Popular catalysts: {[p.get('title', '') for p in popular_catalysts]}
         Available catalyst data: {[p.get('add_info', '')[:100] + '...' if p.get('add_info') else '' for p in popular_catalysts]}
         """
-        
-        if context.get('previous_searches'):
-            ai_context += f"\nPrevious searches: {', '.join(context['previous_searches'][-3:])}"
-        
-        chat = await get_ai_chat()
-        
-        # Generate search suggestions
-        prompt = f"""
+            
+            if previous_searches:
+                ai_context += f"\nPrevious searches: {', '.join(previous_searches[-3:])}"
+            
+            # Generate search suggestions
+            return f"""
         {ai_context}
         
         Based on the user's catalyst search query, provide 5 relevant search suggestions that would help them find the right catalysts. Focus on chemical properties, reaction types, and applications. Return only a JSON array of strings, nothing else.
         Example: ["palladium hydrogenation catalyst", "zeolite cracking catalyst", "platinum oxidation catalyst", "nickel methanation catalyst", "rhodium carbonylation catalyst"]
         """
         
-        user_message = UserMessage(text=prompt.strip())
-        response = await chat.send_message(user_message)
+        cache_key = "|".join(
+            llm_gateway_service.normalize_query(term) for term in [query] + previous_searches[-3:]
+        )
+        response = await llm_gateway_service.complete("search_suggestions", build_prompt, key=cache_key)
+        
+        if response is None:
+            # AI unavailable or timed out - serve local suggestions
+            return {"suggestions": get_fallback_search_suggestions(query)}
         
         # Parse AI response
         try:
-            import json
-            suggestions = json.loads(response.strip())
+            suggestions = json.loads(response)
             if isinstance(suggestions, list) and len(suggestions) <= 5:
                 return {"suggestions": suggestions}
             else:
                 return {"suggestions": suggestions[:5] if isinstance(suggestions, list) else []}
         except:
             # Fallback to manual suggestions if AI response parsing fails
-            fallback_categories = ["automotive catalyst", "industrial catalyst", "precious metal catalyst", "zeolite catalyst", "hydrogenation catalyst"]
-            fallback_suggestions = []
-            for category in fallback_categories:
-                if query.lower() in category.lower():
-                    fallback_suggestions.append(category)
-            return {"suggestions": fallback_suggestions[:5]}
+            return {"suggestions": get_fallback_search_suggestions(query)}
         
     except Exception as e:
         print(f"AI search error: {str(e)}")
@@ -6943,9 +6647,6 @@ async def intelligent_search(search_data: dict):
         if not query or len(query.strip()) < 2:
             return {"results": [], "total": 0, "enhanced_query": query}
         
-        # Get AI chat
-        chat = await get_ai_chat()
-        
         # Let AI understand the search intent and enhance the query
         intent_prompt = f"""
         Analyze this catalyst search query: "{query}"
@@ -6966,14 +6667,16 @@ async def intelligent_search(search_data: dict):
         }}
         """
         
-        user_message = UserMessage(text=intent_prompt.strip())
-        ai_response = await chat.send_message(user_message)
+        ai_response = await llm_gateway_service.complete(
+            "intelligent_search", intent_prompt, key=llm_gateway_service.normalize_query(query)
+        )
         
-        # Parse AI intent analysis
+        # Parse AI intent analysis (timeouts and failures fall back to the raw query terms)
         search_intent = {}
         try:
-            import json
-            search_intent = json.loads(ai_response.strip())
+            search_intent = json.loads(ai_response)
+            if not isinstance(search_intent, dict):
+                raise ValueError("Unexpected intent format")
         except:
             search_intent = {"keywords": query.split(), "enhanced_query": query}
         
@@ -6984,24 +6687,13 @@ async def intelligent_search(search_data: dict):
         # Build MongoDB query
         mongo_query = {"status": "active"}
         
-        # Text search with enhanced terms
-        if search_terms:
-            text_conditions = []
-            for term in search_terms:
-                term_regex = {"$regex": term, "$options": "i"}
-                text_conditions.append({
-                    "$or": [
-                        {"title": term_regex},
-                        {"description": term_regex},
-                        {"category": term_regex},
-                        {"tags": term_regex}
-                    ]
-                })
-            
-            if len(text_conditions) == 1:
-                mongo_query.update(text_conditions[0])
-            else:
-                mongo_query["$and"] = text_conditions
+        # Keyword matching via the multikey search_tokens index
+        if isinstance(search_terms, str):
+            search_terms = [search_terms]
+        token_condition = build_token_query(
+            [term for term in search_terms if isinstance(term, str)]
+        )
+        mongo_query.update(token_condition)
         
         # Apply AI-detected category filter
         if search_intent.get("category") and not filters.get("category"):
@@ -7041,6 +6733,15 @@ async def intelligent_search(search_data: dict):
         # Get total count
         total = await db.listings.count_documents(mongo_query)
         
+        # No listing carries every token - relax to any-token matching
+        if total == 0 and len(token_condition.get("search_tokens", {}).get("$all", [])) > 1:
+            mongo_query["search_tokens"] = {"$in": token_condition["search_tokens"]["$all"]}
+            cursor = db.listings.find(mongo_query).sort("created_at", -1).limit(limit)
+            async for listing in cursor:
+                listing['_id'] = str(listing['_id'])
+                results.append(listing)
+            total = await db.listings.count_documents(mongo_query)
+        
         return {
             "results": results,
             "total": total,
@@ -7135,8 +6836,6 @@ async def get_personalized_recommendations(user_id: str, limit: int = 10):
         
         # Use AI to analyze user preferences and generate recommendations
         if interacted_items:
-            chat = await get_ai_chat()
-            
             # Create user profile for AI
             user_categories = [item.get("category", "") for item in interacted_items]
             user_price_ranges = [item.get("price", 0) for item in interacted_items]
@@ -7155,13 +6854,14 @@ async def get_personalized_recommendations(user_id: str, limit: int = 10):
             Example: ["wireless gaming mouse", "mechanical keyboards", "gaming headsets"]
             """
             
-            user_message = UserMessage(text=profile_prompt.strip())
-            ai_response = await chat.send_message(user_message)
+            # Keyed on the normalized profile prompt so users with the same profile share a response
+            ai_response = await llm_gateway_service.complete("recommendations", profile_prompt)
             
             # Parse AI recommendations
             try:
-                import json
-                recommendation_queries = json.loads(ai_response.strip())
+                recommendation_queries = json.loads(ai_response)
+                if not isinstance(recommendation_queries, list):
+                    raise ValueError("Unexpected recommendations format")
             except:
                 # Fallback to category-based recommendations
                 recommendation_queries = list(set(user_categories))[:3]
@@ -7280,7 +6980,7 @@ async def create_review(review_data: dict):
             "user_id": review_data.get("user_id"),
             "user_name": review_data.get("user_name"),
             "user_avatar": review_data.get("user_avatar"),
-            "rating": review_data.get("rating", 5),
+            "rating": normalize_rating(review_data.get("rating", 5)),
             "title": review_data.get("title", ""),
             "content": review_data.get("content", ""),
             "technical_details": review_data.get("technical_details", {}),  # Catalyst-specific
@@ -7292,64 +6992,60 @@ async def create_review(review_data: dict):
             "images": review_data.get("images", [])
         }
         
-        await db.reviews.insert_one(review)
+        if review["rating"] is None:
+            raise HTTPException(status_code=400, detail="Rating must be between 1 and 5")
         
-        # Update listing average rating
-        await update_listing_rating(review["listing_id"])
+        # Insert and apply the rating to the listing aggregates
+        await review_service.create_review(review)
         
         return {"message": "Review created successfully", "review_id": review["id"]}
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to create review: {str(e)}")
 
 @app.get("/api/reviews/listing/{listing_id}")
-async def get_listing_reviews(listing_id: str, sort_by: str = "newest", limit: int = 20):
-    """Get reviews for a specific catalyst listing"""
+async def get_listing_reviews(listing_id: str, sort_by: str = "newest", limit: int = 20, cursor: str = None):
+    """Get reviews for a specific catalyst listing (keyset-paginated via next_cursor)"""
     try:
-        # Build sort criteria
-        sort_criteria = []
-        if sort_by == "newest":
-            sort_criteria = [("created_at", -1)]
-        elif sort_by == "oldest":
-            sort_criteria = [("created_at", 1)]
-        elif sort_by == "highest":
-            sort_criteria = [("rating", -1)]
-        elif sort_by == "lowest":
-            sort_criteria = [("rating", 1)]
-        elif sort_by == "helpful":
-            sort_criteria = [("helpful_count", -1)]
-        else:
-            sort_criteria = [("created_at", -1)]
+        limit = max(1, min(limit, 100))
+        page = await review_service.list_reviews(listing_id, sort_by, limit, cursor)
         
-        # Get reviews
-        cursor = db.reviews.find({"listing_id": listing_id}).sort(sort_criteria).limit(limit)
-        reviews = []
-        
-        async for review in cursor:
-            review['_id'] = str(review['_id'])
-            reviews.append(review)
-        
-        # Calculate rating statistics
-        if reviews:
-            ratings = [r["rating"] for r in reviews]
-            avg_rating = sum(ratings) / len(ratings)
-            rating_counts = {1: 0, 2: 0, 3: 0, 4: 0, 5: 0}
-            for rating in ratings:
-                rating_counts[rating] += 1
-        else:
-            avg_rating = 0
-            rating_counts = {1: 0, 2: 0, 3: 0, 4: 0, 5: 0}
+        # Rating statistics come from the listing aggregates, not from this page
+        summary = await review_service.get_summary(listing_id)
         
         return {
-            "reviews": reviews,
-            "average_rating": avg_rating,
-            "total_reviews": len(reviews),
-            "rating_distribution": rating_counts
+            "reviews": page["reviews"],
+            "next_cursor": page["next_cursor"],
+            **summary
         }
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch reviews: {str(e)}")
 
+@app.delete("/api/reviews/{review_id}")
+async def delete_review(review_id: str, current_user: dict = Depends(get_current_user)):
+    """Delete a review (author or admin) and remove it from the listing rating"""
+    try:
+        review = await db.reviews.find_one({"id": review_id}, {"_id": 0, "user_id": 1})
+        if not review:
+            raise HTTPException(status_code=404, detail="Review not found")
+        
+        is_admin = current_user.get("role") == "admin" or current_user.get("user_role") in ["Admin", "Admin-Manager"]
+        if review.get("user_id") != current_user.get("id") and not is_admin:
+            raise HTTPException(status_code=403, detail="Not allowed to delete this review")
+        
+        if not await review_service.delete_review(review_id):
+            raise HTTPException(status_code=404, detail="Review not found")
+        
+        return {"message": "Review deleted successfully"}
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to delete review: {str(e)}")
+
 @app.post("/api/reviews/{review_id}/helpful")
 async def mark_review_helpful(review_id: str, user_data: dict):
     """Mark a review as helpful"""
@@ -7402,84 +7098,6 @@ async def add_seller_response(review_id: str, response_data: dict):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to add response: {str(e)}")
 
-async def update_listing_rating(listing_id: str):
-    """Update listing's average rating based on reviews"""
-    try:
-        # Get all reviews for this listing
-        cursor = db.reviews.find({"listing_id": listing_id})
-        reviews = await cursor.to_list(length=None)
-        
-        if reviews:
-            avg_rating = sum(r["rating"] for r in reviews) / len(reviews)
-            total_reviews = len(reviews)
-        else:
-            avg_rating = 0
-            total_reviews = 0
-        
-        # Update listing
-        await db.listings.update_one(
-            {"id": listing_id},
-            {"$set": {"average_rating": avg_rating, "review_count": total_reviews}}
-        )
-        
-    except Exception as e:
-        print(f"Error updating listing rating: {e}")
-
-@app.get("/api/user/{user_id}/favorites")
-async def get_user_favorites(user_id: str):
-    """Get user's favorite catalysts"""
-    try:
-        favorites = await db.user_favorites.find({"user_id": user_id}).to_list(length=50)
-        
-        # Get full listing details for each favorite
-        favorite_listings = []
-        for fav in favorites:
-            listing = await db.listings.find_one({"id": fav["item_id"]})
-            if listing:
-                listing['_id'] = str(listing['_id'])
-                favorite_listings.append(listing)
-        
-        return {"favorites": favorite_listings}
-        
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to fetch favorites: {str(e)}")
-
-@app.post("/api/user/{user_id}/favorites/{listing_id}")
-async def add_to_favorites(user_id: str, listing_id: str):
-    """Add catalyst to user's favorites"""
-    try:
-        # Check if already in favorites
-        existing = await db.user_favorites.find_one({"user_id": user_id, "item_id": listing_id})
-        if existing:
-            return {"message": "Already in favorites"}
-        
-        favorite = {
-            "id": str(uuid.uuid4()),
-            "user_id": user_id,
-            "item_id": listing_id,
-            "created_at": datetime.utcnow().isoformat()
-        }
-        
-        await db.user_favorites.insert_one(favorite)
-        return {"message": "Added to favorites"}
-        
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to add favorite: {str(e)}")
-
-@app.delete("/api/user/{user_id}/favorites/{listing_id}")
-async def remove_from_favorites(user_id: str, listing_id: str):
-    """Remove catalyst from user's favorites"""
-    try:
-        result = await db.user_favorites.delete_one({"user_id": user_id, "item_id": listing_id})
-        
-        if result.deleted_count > 0:
-            return {"message": "Removed from favorites"}
-        else:
-            return {"message": "Not found in favorites"}
-        
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to remove favorite: {str(e)}")
-
 # ============================================================================
 # SYSTEM NOTIFICATIONS MANAGEMENT - FOR GREEN TOAST NOTIFICATIONS
 # ============================================================================
@@ -7522,6 +7140,7 @@ async def create_system_notification(notification_data: dict):
         }
         
         await db.system_notifications.insert_one(notification)
+        notification_service.invalidate_system_notifications()
         
         return {"message": "System notification created successfully", "notification_id": notification["id"]}
         
@@ -7558,6 +7177,7 @@ async def update_system_notification(notification_id: str, notification_data: di
         if result.matched_count == 0:
             raise HTTPException(status_code=404, detail="Notification not found")
         
+        notification_service.invalidate_system_notifications()
         return {"message": "System notification updated successfully"}
         
     except Exception as e:
@@ -7572,6 +7192,7 @@ async def delete_system_notification(notification_id: str):
         if result.deleted_count == 0:
             raise HTTPException(status_code=404, detail="System notification not found")
         
+        notification_service.invalidate_system_notifications()
         return {"message": "System notification deleted successfully"}
     except HTTPException:
         raise
@@ -7600,6 +7221,10 @@ async def cleanup_system_notifications_from_user_notifications(current_user: dic
             })
             cleanup_count += result.deleted_count
         
+        # Unread counters are rebuilt lazily on the next unread-count read
+        if cleanup_count:
+            await db.notification_counters.delete_many({})
+        
         return {
             "message": f"Cleanup completed successfully",
             "notifications_removed": cleanup_count,
@@ -7612,35 +7237,8 @@ async def cleanup_system_notifications_from_user_notifications(current_user: dic
 async def get_user_system_notifications(user_id: str):
     """Get active system notifications for a specific user"""
     try:
-        current_time = datetime.utcnow().isoformat()
-        
-        # Get all active notifications
-        query = {
-            "is_active": True,
-            "$or": [
-                {"expires_at": {"$exists": False}},
-                {"expires_at": None},
-                {"expires_at": {"$gt": current_time}}
-            ]
-        }
-        
-        notifications = await db.system_notifications.find(query).sort("created_at", -1).to_list(length=50)
-        
-        # Filter notifications for this user
-        user_notifications = []
-        for notif in notifications:
-            if (notif["target_users"] == "all" or 
-                (notif["target_users"] == "specific_ids" and user_id in notif.get("user_ids", []))):
-                
-                # Check if user has already seen this notification
-                seen = await db.notification_views.find_one({
-                    "user_id": user_id,
-                    "notification_id": notif["id"]
-                })
-                
-                if not seen:
-                    notif['_id'] = str(notif['_id'])
-                    user_notifications.append(notif)
+        # Cached active list filtered by target, seen-state from a single $in read
+        user_notifications = await notification_service.get_unseen_system_notifications(user_id)
         
         return {"notifications": user_notifications}
         
@@ -7651,27 +7249,12 @@ async def get_user_system_notifications(user_id: str):
 async def mark_system_notification_viewed(user_id: str, notification_id: str):
     """Mark a system notification as viewed by a user"""
     try:
-        view_record = {
-            "id": str(uuid.uuid4()),
-            "user_id": user_id,
-            "notification_id": notification_id,
-            "viewed_at": datetime.utcnow().isoformat()
-        }
-        
-        # Check if already viewed
-        existing = await db.notification_views.find_one({
-            "user_id": user_id,
-            "notification_id": notification_id
-        })
+        # Upsert so the view is recorded once, without a read-then-insert race
+        first_view = await notification_service.mark_system_notification_viewed(user_id, notification_id)
         
-        if not existing:
-            await db.notification_views.insert_one(view_record)
-            
+        if first_view:
             # Increment display count
-            await db.system_notifications.update_one(
-                {"id": notification_id},
-                {"$inc": {"display_count": 1}}
-            )
+            counter_aggregator.increment("system_notifications", notification_id, "display_count")
         
         return {"message": "Notification marked as viewed"}
         
@@ -7683,10 +7266,7 @@ async def track_system_notification_click(user_id: str, notification_id: str):
     """Track when a user clicks on a system notification"""
     try:
         # Increment click count
-        await db.system_notifications.update_one(
-            {"id": notification_id},
-            {"$inc": {"click_count": 1}}
-        )
+        counter_aggregator.increment("system_notifications", notification_id, "click_count")
         
         return {"message": "Notification click tracked"}
         
@@ -7886,15 +7466,7 @@ async def get_bought_items(user_id: str):
             
             seller_name = "Unknown"
             if seller_id:
-                # Try to find user by id field first, then by _id (same as profile endpoint)
-                seller = await db.users.find_one({"id": seller_id})
-                if not seller:
-                    # Try with _id in case it's stored differently
-                    try:
-                        from bson import ObjectId
-                        seller = await db.users.find_one({"_id": ObjectId(seller_id)})
-                    except:
-                        pass
+                seller = await db.users.find_one({"id": await resolve_user_id(seller_id)})
                 seller_name = seller.get("username", "Unknown") if seller else "Unknown"
             
             # Generate unique item ID based on tender and listing
@@ -7942,15 +7514,7 @@ async def get_bought_items(user_id: str):
                 seller_id = order.get("seller_id")
                 seller_name = "Unknown"
                 if seller_id:
-                    # Try to find user by id field first, then by _id (same as profile endpoint)
-                    seller = await db.users.find_one({"id": seller_id})
-                    if not seller:
-                        # Try with _id in case it's stored differently
-                        try:
-                            from bson import ObjectId
-                            seller = await db.users.find_one({"_id": ObjectId(seller_id)})
-                        except:
-                            pass
+                    seller = await db.users.find_one({"id": await resolve_user_id(seller_id)})
                     seller_name = seller.get("username", "Unknown") if seller else "Unknown"
                 
                 # Generate unique item ID based on order and listing
@@ -8590,10 +8154,7 @@ async def update_ad(ad_id: str, ad_data: dict):
 async def track_ad_click(ad_id: str):
     """Track ad click for analytics"""
     try:
-        await db.ads.update_one(
-            {"id": ad_id},
-            {"$inc": {"click_count": 1}}
-        )
+        counter_aggregator.increment("ads", ad_id, "click_count")
         return {"message": "Click tracked successfully"}
     except Exception as e:
         logger.error(f"Error tracking ad click: {str(e)}")
@@ -8603,10 +8164,7 @@ async def track_ad_click(ad_id: str):
 async def track_ad_impression(ad_id: str):
     """Track ad impression for analytics"""
     try:
-        await db.ads.update_one(
-            {"id": ad_id},
-            {"$inc": {"impression_count": 1}}
-        )
+        counter_aggregator.increment("ads", ad_id, "impression_count")
         return {"message": "Impression tracked successfully"}
     except Exception as e:
         logger.error(f"Error tracking ad impression: {str(e)}")
@@ -8617,32 +8175,6 @@ async def track_ad_impression(ad_id: str):
 # END ADS MANAGEMENT ENDPOINTS
 # ============================================================================
 
-# ============================================================================
-# STARTUP EVENT
-# ============================================================================
-
-@app.on_event("startup")
-async def startup_event():
-    """Initialize application on startup"""
-    try:
-        # Test database connection
-        await client.admin.command('ping')
-        print("✅ Connected to MongoDB successfully")
-        
-        # Test AI service
-        try:
-            api_key = os.environ.get('EMERGENT_LLM_KEY')
-            if api_key:
-                print("✅ AI service configured successfully")
-            else:
-                print("⚠️ AI service not configured - search will use fallback mode")
-        except Exception as e:
-            print(f"⚠️ AI service initialization warning: {e}")
-            
-    except Exception as e:
-        print(f"❌ Failed to connect to MongoDB: {e}")
-        raise
-
 # Run server
 if __name__ == "__main__":
     import uvicorn
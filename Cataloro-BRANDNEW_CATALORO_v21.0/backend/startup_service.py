@@ -0,0 +1,128 @@
+"""
+Startup Service for Cataloro Marketplace
+Concurrent, time-bounded service initialization with per-component readiness state
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class StartupStep:
+    name: str
+    run: Callable[[], Awaitable[Any]]
+    timeout: float
+    # Readiness waits for critical steps; the rest may finish after traffic is served
+    critical: bool = True
+    # Failed or timed-out attempts are retried with exponential backoff
+    retries: int = 2
+    retry_delay: float = 1.0
+
+
+class StartupCoordinator:
+    """
+    Runs groups of independent startup steps concurrently, each under its own
+    timeout, and keeps the outcome of every step for the readiness endpoint.
+    A step that returns False (e.g. Redis unreachable, running in fallback mode)
+    is recorded as "degraded", which still counts as ready. A step that still
+    fails after its retries is "failed"; a failed critical step keeps the worker
+    not-ready, with the error visible in get_status().
+    """
+
+    READY_STATES = ("ready", "degraded")
+
+    def __init__(self):
+        self.components: Dict[str, Dict[str, Any]] = {}
+        self.import_ms: Optional[float] = None
+        self.startup_ms: Optional[float] = None
+        self._started_at: Optional[float] = None
+        self._background: List[asyncio.Task] = []
+
+    def begin(self, import_started: Optional[float] = None):
+        """import_started: time.perf_counter() taken at the top of the application module"""
+        self._started_at = time.perf_counter()
+        if import_started is not None:
+            self.import_ms = round((self._started_at - import_started) * 1000, 1)
+
+    def finish(self):
+        self.startup_ms = round((time.perf_counter() - self._started_at) * 1000, 1)
+        slowest = sorted(
+            (c for c in self.components.values() if c["duration_ms"] is not None),
+            key=lambda c: c["duration_ms"], reverse=True
+        )[:5]
+        logger.info(
+            f"⏱️ Startup hook finished in {self.startup_ms}ms (imports {self.import_ms}ms); slowest: "
+            + ", ".join(f"{c['name']}={c['duration_ms']}ms" for c in slowest)
+        )
+
+    async def run(self, steps: List[StartupStep]) -> bool:
+        """Run steps concurrently; True if every step ended ready or degraded"""
+        self._register(steps)
+        results = await asyncio.gather(*(self._run_step(step) for step in steps))
+        return all(results)
+
+    def run_in_background(self, steps: List[StartupStep]):
+        """Start steps without waiting for them; their state shows up in get_status()"""
+        # Registered right away so critical steps hold back readiness before the task starts
+        self._register(steps)
+        self._background.append(asyncio.create_task(self.run(steps)))
+
+    def _register(self, steps: List[StartupStep]):
+        for step in steps:
+            if step.name not in self.components:
+                self.components[step.name] = {
+                    "name": step.name, "status": "pending", "critical": step.critical,
+                    "duration_ms": None, "error": None, "attempts": 0
+                }
+
+    async def _run_step(self, step: StartupStep) -> bool:
+        component = self.components[step.name]
+        started = time.perf_counter()
+        for attempt in range(step.retries + 1):
+            component["status"] = "starting" if attempt == 0 else "retrying"
+            component["attempts"] = attempt + 1
+            try:
+                result = await asyncio.wait_for(step.run(), step.timeout)
+                component["status"] = "degraded" if result is False else "ready"
+                component["error"] = None
+                break
+            except asyncio.TimeoutError:
+                component["error"] = f"did not finish within {step.timeout}s"
+            except Exception as e:
+                component["error"] = str(e)
+            logger.warning(f"⚠️ Startup step {step.name} attempt {attempt + 1} failed: {component['error']}")
+            if attempt < step.retries:
+                await asyncio.sleep(step.retry_delay * 2 ** attempt)
+        else:
+            component["status"] = "failed"
+        component["duration_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        return component["status"] in self.READY_STATES
+
+    def is_ready(self) -> bool:
+        return self.startup_ms is not None and all(
+            c["status"] in self.READY_STATES for c in self.components.values() if c["critical"]
+        )
+
+    def get_status(self) -> Dict[str, Any]:
+        return {
+            "ready": self.is_ready(),
+            "import_ms": self.import_ms,
+            "startup_ms": self.startup_ms,
+            "components": {name: dict(c) for name, c in self.components.items()}
+        }
+
+    async def stop(self):
+        """Cancel background steps that are still running"""
+        for task in self._background:
+            task.cancel()
+        await asyncio.gather(*self._background, return_exceptions=True)
+        self._background = []
+
+
+# Global startup coordinator instance
+startup_coordinator = StartupCoordinator()
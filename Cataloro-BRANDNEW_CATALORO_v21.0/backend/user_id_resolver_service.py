@@ -0,0 +1,228 @@
+"""
+User ID Resolver Service for Cataloro Marketplace
+Canonicalizes legacy user ids (ObjectId strings, historical aliases) to the users.id field
+"""
+
+import logging
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+from pymongo import UpdateOne
+
+from index_registry import ensure_collection_indexes
+
+logger = logging.getLogger(__name__)
+
+MIGRATION_NAME = "user_id_aliases_v1"
+
+# Historical ids that referenced accounts before canonical ids existed
+LEGACY_ALIASES = {
+    "admin_user_1": ["68bff934bdb9d78bad2b925c", "admin", "sash_admin"],
+    "68bfff790e4e46bc28d43631": ["demo_user", "demo_user_1", "user"]
+}
+
+
+class UserIdResolver:
+    """
+    Maps any user id a client or old document may carry to the canonical users.id
+    through the `user_id_aliases` collection ({alias, user_id}). Results are kept in
+    a bounded LRU, so a warm lookup costs nothing and a cold one a single indexed read.
+    """
+
+    def __init__(self, db, max_entries: int = None):
+        self.db = db
+        self.max_entries = max_entries or int(os.environ.get('USER_ID_RESOLVER_CACHE_SIZE', 10000))
+        # Answers that can change when another worker migrates or registers aliases
+        # (ids without an alias, alias lists) expire; alias -> canonical hits do not
+        self.miss_ttl = float(os.environ.get('USER_ID_RESOLVER_MISS_TTL', 60))
+        self._canonical: "OrderedDict[str, str]" = OrderedDict()
+        self._unaliased: "OrderedDict[str, float]" = OrderedDict()  # id -> expiry (monotonic)
+        self._associated: "OrderedDict[str, tuple]" = OrderedDict()  # canonical -> (expiry, ids)
+        self.stats = {"hits": 0, "misses": 0}
+
+    async def ensure_indexes(self):
+        await ensure_collection_indexes(self.db, "user_id_aliases")
+
+    def _remember(self, cache: OrderedDict, key: str, value):
+        cache[key] = value
+        cache.move_to_end(key)
+        while len(cache) > self.max_entries:
+            cache.popitem(last=False)
+
+    def _cached(self, user_id: str) -> Optional[str]:
+        cached = self._canonical.get(user_id)
+        if cached is not None:
+            self._canonical.move_to_end(user_id)
+            return cached
+        expires_at = self._unaliased.get(user_id)
+        if expires_at is not None:
+            if expires_at > time.monotonic():
+                return user_id
+            del self._unaliased[user_id]
+        return None
+
+    def _remember_resolution(self, user_id: str, canonical: str):
+        if canonical == user_id:
+            self._remember(self._unaliased, user_id, time.monotonic() + self.miss_ttl)
+        else:
+            self._unaliased.pop(user_id, None)
+            self._remember(self._canonical, user_id, canonical)
+
+    async def resolve(self, user_id: str) -> str:
+        """Canonical id for user_id (unknown ids are returned unchanged)"""
+        if not user_id:
+            return user_id
+        cached = self._cached(user_id)
+        if cached is not None:
+            self.stats["hits"] += 1
+            return cached
+
+        self.stats["misses"] += 1
+        alias = await self.db.user_id_aliases.find_one({"alias": user_id}, {"user_id": 1})
+        canonical = alias["user_id"] if alias else user_id
+        self._remember_resolution(user_id, canonical)
+        return canonical
+
+    async def resolve_many(self, user_ids: Iterable[str]) -> Dict[str, str]:
+        """Map each id to its canonical id with at most one alias query"""
+        result = {}
+        missing = []
+        for user_id in set(filter(None, user_ids)):
+            cached = self._cached(user_id)
+            if cached is not None:
+                self.stats["hits"] += 1
+                result[user_id] = cached
+            else:
+                missing.append(user_id)
+
+        if missing:
+            self.stats["misses"] += len(missing)
+            aliases = await self.db.user_id_aliases.find(
+                {"alias": {"$in": missing}}, {"alias": 1, "user_id": 1}
+            ).to_list(length=None)
+            found = {alias["alias"]: alias["user_id"] for alias in aliases}
+            for user_id in missing:
+                canonical = found.get(user_id, user_id)
+                self._remember_resolution(user_id, canonical)
+                result[user_id] = canonical
+
+        return result
+
+    async def associated_ids(self, user_id: str) -> List[str]:
+        """Canonical id plus every alias that points at it (for matching legacy foreign keys)"""
+        canonical = await self.resolve(user_id)
+        cached = self._associated.get(canonical)
+        if cached is not None and cached[0] > time.monotonic():
+            return list(cached[1])
+
+        aliases = await self.db.user_id_aliases.find({"user_id": canonical}, {"alias": 1}).to_list(length=None)
+        ids = [canonical] + [alias["alias"] for alias in aliases if alias["alias"] != canonical]
+        self._remember(self._associated, canonical, (time.monotonic() + self.miss_ttl, ids))
+        return list(ids)
+
+    async def register_alias(self, alias: str, user_id: str):
+        if not alias or alias == user_id:
+            return
+        await self.db.user_id_aliases.update_one(
+            {"alias": alias},
+            {"$set": {"alias": alias, "user_id": user_id, "created_at": datetime.utcnow()}},
+            upsert=True
+        )
+        self._remember_resolution(alias, user_id)
+        self._associated.pop(user_id, None)
+
+    async def forget_user(self, user_id: str):
+        """Drop a deleted user's aliases and cache entries"""
+        await self.db.user_id_aliases.delete_many({"user_id": user_id})
+        for alias in [a for a, canonical in self._canonical.items() if canonical == user_id]:
+            del self._canonical[alias]
+        self._associated.pop(user_id, None)
+
+    async def forget_users(self, user_ids: List[str]):
+        """Set-based forget_user for many deleted users"""
+        await self.db.user_id_aliases.delete_many({"user_id": {"$in": user_ids}})
+        deleted = set(user_ids)
+        for alias in [a for a, canonical in self._canonical.items() if canonical in deleted]:
+            del self._canonical[alias]
+        for user_id in user_ids:
+            self._associated.pop(user_id, None)
+
+    async def migrate(self, batch_size: int = 500) -> Optional[Dict[str, int]]:
+        """
+        One-time migration: stamp an `id` on users that only have an _id and register
+        every user's ObjectId string (and the historical aliases) as an alias of it.
+        Returns None if the migration already ran.
+        """
+        if await self.db.migrations.find_one({"name": MIGRATION_NAME}):
+            return None
+
+        stamped = 0
+        operations = []
+        alias_operations = []
+        async for user in self.db.users.find({}, {"id": 1}):
+            object_id = str(user["_id"])
+            if not user.get("id"):
+                operations.append(UpdateOne({"_id": user["_id"]}, {"$set": {"id": object_id}}))
+            elif user["id"] != object_id:
+                alias_operations.append(UpdateOne(
+                    {"alias": object_id},
+                    {"$set": {"alias": object_id, "user_id": user["id"], "created_at": datetime.utcnow()}},
+                    upsert=True
+                ))
+
+            if len(operations) >= batch_size:
+                await self.db.users.bulk_write(operations, ordered=False)
+                stamped += len(operations)
+                operations = []
+            if len(alias_operations) >= batch_size:
+                await self.db.user_id_aliases.bulk_write(alias_operations, ordered=False)
+                alias_operations = []
+
+        for canonical, aliases in LEGACY_ALIASES.items():
+            for alias in aliases:
+                alias_operations.append(UpdateOne(
+                    {"alias": alias},
+                    {"$setOnInsert": {"alias": alias, "user_id": canonical, "created_at": datetime.utcnow()}},
+                    upsert=True
+                ))
+
+        if operations:
+            await self.db.users.bulk_write(operations, ordered=False)
+            stamped += len(operations)
+        if alias_operations:
+            await self.db.user_id_aliases.bulk_write(alias_operations, ordered=False)
+
+        aliases = await self.db.user_id_aliases.count_documents({})
+        await ensure_collection_indexes(self.db, "users")
+        await self.db.migrations.insert_one({"name": MIGRATION_NAME, "completed_at": datetime.utcnow()})
+
+        self._canonical.clear()
+        self._unaliased.clear()
+        self._associated.clear()
+        logger.info(f"🪪 User id migration stamped {stamped} ids, {aliases} aliases registered")
+        return {"stamped_ids": stamped, "aliases": aliases}
+
+    def get_stats(self) -> Dict[str, int]:
+        return {
+            **self.stats,
+            "cached_ids": len(self._canonical),
+            "cached_unaliased_ids": len(self._unaliased),
+            "cached_associations": len(self._associated)
+        }
+
+
+# Global user id resolver instance
+user_id_resolver = None
+
+async def init_user_id_resolver(db):
+    """Initialize user id resolver"""
+    global user_id_resolver
+    user_id_resolver = UserIdResolver(db)
+    return user_id_resolver
+
+def get_user_id_resolver():
+    """Get user id resolver instance"""
+    return user_id_resolver
@@ -6,12 +6,16 @@ Real-time bidding, messaging, notifications, and live updates
 import asyncio
 import json
 import logging
+import os
 import time
 from datetime import datetime
-from typing import Dict, List, Set, Optional, Any
+from typing import Dict, Set, Optional, Any
 from dataclasses import dataclass, asdict
 import socketio
-from collections import defaultdict
+from collections import OrderedDict, defaultdict
+from cluster_bus_service import create_cluster_bus
+from offline_queue_service import OfflineMessageQueue
+from conversation_service import ConversationService
 
 logger = logging.getLogger(__name__)
 
@@ -36,8 +40,76 @@ class UserSession:
             "user_role": self.user_role
         }
 
+class RoomUpdateCoalescer:
+    """
+    Merges pending field updates per room and flushes them as one delta frame,
+    at most `max_rate` frames per second per room (latest value wins).
+    """
+    
+    def __init__(self, emit, max_rate: float = 4.0):
+        self.emit = emit  # async (room, changes, merged_count)
+        self.interval = 1.0 / max_rate if max_rate > 0 else 0.0
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        self._merged: Dict[str, int] = defaultdict(int)
+        self._last_flush: Dict[str, float] = {}
+        self._scheduled: Dict[str, asyncio.Task] = {}
+        self.stats = {"updates": 0, "frames": 0}
+    
+    def queue(self, room: str, changes: Dict[str, Any]):
+        self._pending.setdefault(room, {}).update(changes)
+        self._merged[room] += 1
+        self.stats["updates"] += 1
+        if room not in self._scheduled:
+            delay = max(0.0, self._last_flush.get(room, 0.0) + self.interval - time.monotonic())
+            self._scheduled[room] = asyncio.create_task(self._flush_after(room, delay))
+    
+    async def _flush_after(self, room: str, delay: float):
+        try:
+            if delay:
+                await asyncio.sleep(delay)
+        finally:
+            self._scheduled.pop(room, None)
+        changes = self._pending.pop(room, None)
+        merged = self._merged.pop(room, 0)
+        if not changes:
+            return
+        self._last_flush[room] = time.monotonic()
+        self.stats["frames"] += 1
+        try:
+            await self.emit(room, changes, merged)
+        except Exception as e:
+            logger.error(f"Room update flush error ({room}): {e}")
+        # Forget rooms that have gone quiet so the map stays bounded
+        cutoff = time.monotonic() - max(self.interval * 10, 60)
+        for stale in [r for r, at in self._last_flush.items() if at < cutoff and r not in self._scheduled]:
+            del self._last_flush[stale]
+    
+    async def close(self):
+        for task in list(self._scheduled.values()):
+            task.cancel()
+        self._scheduled.clear()
+        self._pending.clear()
+        self._merged.clear()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "pending_rooms": len(self._pending),
+            "max_rate": round(1.0 / self.interval, 2) if self.interval else None
+        }
+
+
 class WebSocketService:
-    def __init__(self, db):
+    # Seconds between cluster stats heartbeats; remote entries expire after 3 missed beats
+    HEARTBEAT_INTERVAL = 5
+    # Seconds between coalesced presence diff frames
+    PRESENCE_FLUSH_INTERVAL = 0.5
+    # Most recently active conversations whose partners a newly connected user follows
+    PRESENCE_PARTNER_LIMIT = 200
+    # Listing -> seller lookups kept for presence interests (least recently used dropped)
+    LISTING_SELLER_CACHE_SIZE = 10000
+    
+    def __init__(self, db, bus=None):
         self.db = db
         self.sio = socketio.AsyncServer(
             cors_allowed_origins="*",
@@ -54,8 +126,29 @@ class WebSocketService:
         self.active_auctions: Dict[str, Dict] = {}  # listing_id -> auction_data
         self.bidding_rooms: Dict[str, Set[str]] = defaultdict(set)  # listing_id -> set of session_ids
         
-        # Message queues for offline users
-        self.offline_messages: Dict[str, List[Dict]] = defaultdict(list)  # user_id -> messages
+        # Durable, bounded queue for events sent to offline users
+        self.offline_queue = OfflineMessageQueue(db)
+        self.conversations = ConversationService(db)
+        
+        # Cross-worker fan-out (Redis pub/sub, or in-process stand-in for tests)
+        self.bus = bus or create_cluster_bus()
+        self.worker_id = self.bus.worker_id
+        self.remote_presence: Dict[str, Dict[str, str]] = defaultdict(dict)  # worker -> user_id -> username
+        self.remote_stats: Dict[str, Dict] = {}  # worker -> last heartbeat stats
+        self._heartbeat_task: Optional[asyncio.Task] = None
+        
+        # Interest-scoped presence: only partners, watchers and sellers hear status changes
+        self.presence_interests: Dict[str, Set[str]] = defaultdict(set)  # local user_id -> watched user_ids
+        self.presence_audience: Dict[str, Set[str]] = defaultdict(set)  # user_id -> local users interested in it
+        self.listing_sellers: Dict[str, Optional[str]] = OrderedDict()  # listing_id -> seller_id (LRU)
+        self._presence_frames: Dict[str, Dict[str, Dict]] = defaultdict(dict)  # local user_id -> user_id -> change
+        self._presence_task: Optional[asyncio.Task] = None
+        
+        # Listing-room updates are merged and flushed as delta frames at a bounded rate
+        self.room_updates = RoomUpdateCoalescer(
+            self._emit_room_delta,
+            max_rate=float(os.environ.get('WEBSOCKET_ROOM_MAX_RATE', 4))
+        )
         
         # Register event handlers
         self._register_event_handlers()
@@ -86,9 +179,13 @@ class WebSocketService:
                     user_role=user_data.get("user_role", "buyer")
                 )
                 
+                is_first_session = not self.user_sessions.get(user_data["user_id"])
                 self.active_sessions[sid] = session
                 self.user_sessions[user_data["user_id"]].add(sid)
                 
+                # Personal room so any worker can reach this user
+                await self._join_room(sid, self._user_room(user_data["user_id"]))
+                
                 # Send connection confirmation
                 await self.sio.emit('connection_confirmed', {
                     'user_id': user_data["user_id"],
@@ -99,8 +196,11 @@ class WebSocketService:
                 # Deliver offline messages
                 await self._deliver_offline_messages(user_data["user_id"], sid)
                 
-                # Notify other users about online status
-                await self._broadcast_user_status(user_data["user_id"], "online")
+                # Notify interested users (on every worker) about online status
+                if is_first_session:
+                    await self._load_presence_interests(user_data["user_id"])
+                    await self._publish_presence(user_data["user_id"], user_data["username"], "online")
+                    self._queue_presence_change(user_data["user_id"], user_data["username"], "online")
                 
                 logger.info(f"✅ User connected: {user_data['username']} ({sid})")
                 return True
@@ -125,7 +225,10 @@ class WebSocketService:
                     if not self.user_sessions[session.user_id]:
                         del self.user_sessions[session.user_id]
                         # Notify about offline status
-                        await self._broadcast_user_status(session.user_id, "offline")
+                        await self._publish_presence(session.user_id, session.username, "offline")
+                        if not self.is_user_online(session.user_id):
+                            self._queue_presence_change(session.user_id, session.username, "offline")
+                        self._drop_presence_interests(session.user_id)
                     
                     del self.active_sessions[sid]
                     
@@ -207,19 +310,22 @@ class WebSocketService:
                 # Store in database
                 await self._store_message(message)
                 
-                # Send to recipient if online
-                recipient_sessions = self.user_sessions.get(recipient_id, set())
-                if recipient_sessions:
-                    for recipient_sid in recipient_sessions:
-                        await self.sio.emit('new_message', message, room=recipient_sid)
+                # Conversation partners follow each other's presence
+                await self._add_presence_interest(session.user_id, recipient_id)
+                await self._add_presence_interest(recipient_id, session.user_id)
+                
+                # Send to recipient if online on any worker
+                recipient_online = self.is_user_online(recipient_id)
+                if recipient_online:
+                    await self.cluster_emit('new_message', message, room=self._user_room(recipient_id))
                 else:
                     # Store for offline delivery
-                    self.offline_messages[recipient_id].append(message)
+                    await self.offline_queue.enqueue(recipient_id, 'message', message)
                 
                 # Confirm delivery to sender
                 await self.sio.emit('message_sent', {
                     'message_id': message['id'],
-                    'delivered': bool(recipient_sessions)
+                    'delivered': recipient_online
                 }, room=sid)
                 
             except Exception as e:
@@ -279,23 +385,40 @@ class WebSocketService:
                     auction['bid_count'] += 1
                     auction['last_bid_time'] = datetime.utcnow()
                 
-                # Broadcast bid to all watchers
-                room_name = f"listing:{listing_id}"
-                await self.sio.emit('new_bid', {
+                # Keep auction state in sync on the other workers
+                await self.bus.publish({
+                    "kind": "auction",
+                    "listing_id": listing_id,
+                    "auction": self.active_auctions[listing_id]
+                })
+                
+                # Acknowledge the bidder immediately
+                await self.sio.emit('bid_accepted', {
                     'listing_id': listing_id,
-                    'bid': bid,
-                    'auction_status': self.active_auctions[listing_id]
-                }, room=room_name)
+                    'bid': bid
+                }, room=sid)
+                
+                # Watchers get a coalesced delta frame
+                auction = self.active_auctions[listing_id]
+                self.room_updates.queue(f"listing:{listing_id}", {
+                    'current_high_bid': auction['current_high_bid'],
+                    'high_bidder': auction['high_bidder'],
+                    'bid_count': auction['bid_count'],
+                    'last_bid': {
+                        'id': bid['id'],
+                        'amount': bid['amount'],
+                        'bidder_username': bid['bidder_username'],
+                        'timestamp': bid['timestamp']
+                    }
+                })
                 
                 # Notify listing owner
-                listing = await self.db.listings.find_one({"id": listing_id})
-                if listing:
-                    seller_sessions = self.user_sessions.get(listing.get('seller_id'), set())
-                    for seller_sid in seller_sessions:
-                        await self.sio.emit('bid_received', {
-                            'listing_id': listing_id,
-                            'bid': bid
-                        }, room=seller_sid)
+                seller_id = await self._get_listing_seller(listing_id)
+                if seller_id:
+                    await self.cluster_emit('bid_received', {
+                        'listing_id': listing_id,
+                        'bid': bid
+                    }, room=self._user_room(seller_id))
                 
             except Exception as e:
                 logger.error(f"Place bid error: {e}")
@@ -315,6 +438,13 @@ class WebSocketService:
                 if sid in self.active_sessions:
                     self.active_sessions[sid].rooms.add(room_name)
                     self.room_members[room_name].add(sid)
+                    
+                    # Watchers follow the seller, and the seller follows its watchers
+                    seller_id = await self._get_listing_seller(listing_id)
+                    watcher_id = self.active_sessions[sid].user_id
+                    if seller_id and seller_id != watcher_id:
+                        await self._add_presence_interest(watcher_id, seller_id)
+                        await self._add_presence_interest(seller_id, watcher_id)
                 
                 # Send current auction status
                 if listing_id in self.active_auctions:
@@ -365,6 +495,19 @@ class WebSocketService:
                                 'last_activity': session.last_activity.isoformat()
                             })
                 
+                # Users connected to other workers
+                local_user_ids = set(self.user_sessions)
+                for presence in self.remote_presence.values():
+                    for user_id, username in presence.items():
+                        if user_id not in local_user_ids:
+                            local_user_ids.add(user_id)
+                            online_users.append({
+                                'user_id': user_id,
+                                'username': username,
+                                'user_role': None,
+                                'last_activity': None
+                            })
+                
                 await self.sio.emit('online_users', {
                     'users': online_users,
                     'total_count': len(online_users)
@@ -410,31 +553,218 @@ class WebSocketService:
             self.room_members[room_name].discard(sid)
     
     async def _deliver_offline_messages(self, user_id: str, sid: str):
-        """Deliver queued offline messages"""
-        if user_id in self.offline_messages:
-            messages = self.offline_messages[user_id]
-            for message in messages:
-                await self.sio.emit('offline_message', message, room=sid)
-            # Clear delivered messages
-            del self.offline_messages[user_id]
-    
-    async def _broadcast_user_status(self, user_id: str, status: str):
-        """Broadcast user online/offline status"""
+        """Deliver queued offline messages in a single coalesced emit"""
         try:
-            user = await self.db.users.find_one({"id": user_id})
-            if user:
-                status_update = {
-                    'user_id': user_id,
-                    'username': user.get('username', 'Unknown'),
-                    'status': status,
-                    'timestamp': datetime.utcnow().isoformat()
-                }
-                
-                # Broadcast to all connected users
-                await self.sio.emit('user_status_update', status_update)
-                
+            messages = await self.offline_queue.drain(user_id)
+            if messages:
+                await self.sio.emit('offline_messages', {
+                    'messages': messages,
+                    'count': len(messages)
+                }, room=sid)
+                # Only delivered messages leave the queue; a failed emit keeps them for the next connect
+                await self.offline_queue.ack(user_id, [message['id'] for message in messages])
         except Exception as e:
-            logger.error(f"Broadcast user status error: {e}")
+            logger.error(f"Deliver offline messages error: {e}")
+    
+    # Interest-scoped presence
+    async def _load_presence_interests(self, user_id: str):
+        """Seed a newly connected user's interests with their recent conversation partners"""
+        try:
+            # One indexed read on conversations (participants, updated_at)
+            conversations = await self.db.conversations.find(
+                {"participants": user_id}, {"_id": 0, "participants": 1}
+            ).sort("updated_at", -1).limit(self.PRESENCE_PARTNER_LIMIT).to_list(length=self.PRESENCE_PARTNER_LIMIT)
+        except Exception as e:
+            logger.error(f"Load presence interests error: {e}")
+            return
+        
+        for conversation in conversations:
+            for partner_id in conversation.get("participants", []):
+                if partner_id and partner_id != user_id:
+                    self._subscribe_presence(user_id, partner_id)
+    
+    async def _get_listing_seller(self, listing_id: str) -> Optional[str]:
+        if listing_id in self.listing_sellers:
+            self.listing_sellers.move_to_end(listing_id)
+            return self.listing_sellers[listing_id]
+        listing = await self.db.listings.find_one({"id": listing_id}, {"seller_id": 1})
+        seller_id = listing.get("seller_id") if listing else None
+        self.listing_sellers[listing_id] = seller_id
+        if len(self.listing_sellers) > self.LISTING_SELLER_CACHE_SIZE:
+            self.listing_sellers.popitem(last=False)
+        return seller_id
+    
+    async def _add_presence_interest(self, subscriber_id: str, target_id: str):
+        """Make subscriber follow target's presence, on whichever worker holds the subscriber"""
+        if self.user_sessions.get(subscriber_id):
+            self._subscribe_presence(subscriber_id, target_id)
+        else:
+            await self.bus.publish({"kind": "interest", "subscriber": subscriber_id, "target": target_id})
+    
+    def _subscribe_presence(self, subscriber_id: str, target_id: str):
+        if target_id in self.presence_interests[subscriber_id]:
+            return
+        self.presence_interests[subscriber_id].add(target_id)
+        self.presence_audience[target_id].add(subscriber_id)
+        
+        # Tell the subscriber if the target is already online
+        username = self._get_online_username(target_id)
+        if username:
+            self._presence_frames[subscriber_id][target_id] = {
+                'user_id': target_id,
+                'username': username,
+                'status': 'online',
+                'timestamp': datetime.utcnow().isoformat()
+            }
+    
+    def _drop_presence_interests(self, user_id: str):
+        for target_id in self.presence_interests.pop(user_id, set()):
+            audience = self.presence_audience.get(target_id)
+            if audience:
+                audience.discard(user_id)
+                if not audience:
+                    del self.presence_audience[target_id]
+        self._presence_frames.pop(user_id, None)
+    
+    def _get_online_username(self, user_id: str) -> Optional[str]:
+        """Username of an online user from the local session cache or remote presence"""
+        for sid in self.user_sessions.get(user_id, ()):
+            if sid in self.active_sessions:
+                return self.active_sessions[sid].username
+        for presence in self.remote_presence.values():
+            if user_id in presence:
+                return presence[user_id]
+        return None
+    
+    def _queue_presence_change(self, user_id: str, username: str, status: str):
+        """Record a status change for the next diff frame of every interested local user"""
+        change = {
+            'user_id': user_id,
+            'username': username,
+            'status': status,
+            'timestamp': datetime.utcnow().isoformat()
+        }
+        for subscriber_id in self.presence_audience.get(user_id, ()):
+            # Latest status wins within a frame
+            self._presence_frames[subscriber_id][user_id] = change
+    
+    async def _flush_presence_frames(self):
+        """Emit one coalesced presence_update per interested local user"""
+        frames, self._presence_frames = self._presence_frames, defaultdict(dict)
+        for subscriber_id, changes in frames.items():
+            if changes and self.user_sessions.get(subscriber_id):
+                await self.sio.emit('presence_update', {
+                    'changes': list(changes.values())
+                }, room=self._user_room(subscriber_id))
+    
+    async def _presence_loop(self):
+        while True:
+            await asyncio.sleep(self.PRESENCE_FLUSH_INTERVAL)
+            try:
+                await self._flush_presence_frames()
+            except Exception as e:
+                logger.error(f"Presence flush error: {e}")
+    
+    # Cross-worker fan-out
+    @staticmethod
+    def _user_room(user_id: str) -> str:
+        return f"user:{user_id}"
+    
+    async def start_cluster(self):
+        """Connect to the cluster bus and start publishing heartbeats"""
+        await self.bus.start(self._handle_bus_message)
+        if self._heartbeat_task is None or self._heartbeat_task.done():
+            self._heartbeat_task = asyncio.create_task(self._heartbeat_loop())
+        if self._presence_task is None or self._presence_task.done():
+            self._presence_task = asyncio.create_task(self._presence_loop())
+        logger.info(f"✅ WebSocket cluster bus: {self.bus.backend} (connected={self.bus.connected})")
+    
+    async def stop_cluster(self):
+        """Announce shutdown to the other workers and disconnect from the bus"""
+        for task in (self._heartbeat_task, self._presence_task):
+            if task:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._heartbeat_task = None
+        self._presence_task = None
+        await self.room_updates.close()
+        await self.bus.publish({"kind": "worker_down"})
+        await self.bus.stop()
+    
+    async def cluster_emit(self, event: str, data: Any, room: str = None):
+        """Emit locally and on every other worker (room=None broadcasts to everyone)"""
+        await self.sio.emit(event, data, room=room)
+        await self.bus.publish({"kind": "emit", "event": event, "data": data, "room": room})
+    
+    async def _publish_presence(self, user_id: str, username: str, status: str):
+        await self.bus.publish({
+            "kind": "presence",
+            "user_id": user_id,
+            "username": username,
+            "status": status
+        })
+    
+    def is_user_online(self, user_id: str) -> bool:
+        """Whether the user has a live connection on any worker"""
+        if self.user_sessions.get(user_id):
+            return True
+        return any(user_id in presence for presence in self.remote_presence.values())
+    
+    def _local_stats(self) -> Dict:
+        return {
+            "connections": len(self.active_sessions),
+            "users": {user_id: self.active_sessions[next(iter(sids))].username
+                      for user_id, sids in self.user_sessions.items() if sids},
+            "rooms": [room for room, members in self.room_members.items() if members],
+            "active_auctions": len(self.active_auctions)
+        }
+    
+    async def _heartbeat_loop(self):
+        while True:
+            try:
+                await self.bus.publish({"kind": "stats", "stats": self._local_stats(), "sent_at": time.time()})
+                self._expire_remote_workers()
+            except Exception as e:
+                logger.error(f"WebSocket heartbeat error: {e}")
+            await asyncio.sleep(self.HEARTBEAT_INTERVAL)
+    
+    def _expire_remote_workers(self):
+        cutoff = time.time() - self.HEARTBEAT_INTERVAL * 3
+        for worker in [w for w, stats in self.remote_stats.items() if stats["received_at"] < cutoff]:
+            self.remote_stats.pop(worker, None)
+            self.remote_presence.pop(worker, None)
+    
+    async def _handle_bus_message(self, message: Dict):
+        """Apply a message published by another worker"""
+        kind = message.get("kind")
+        worker = message.get("worker")
+        
+        if kind == "emit":
+            await self.sio.emit(message["event"], message["data"], room=message.get("room"))
+        elif kind == "presence":
+            if message["status"] == "online":
+                self.remote_presence[worker][message["user_id"]] = message.get("username", "Unknown")
+            else:
+                self.remote_presence[worker].pop(message["user_id"], None)
+            # A user still connected through another worker stays online
+            if message["status"] == "online" or not self.is_user_online(message["user_id"]):
+                self._queue_presence_change(message["user_id"], message.get("username", "Unknown"), message["status"])
+        elif kind == "interest":
+            if self.user_sessions.get(message["subscriber"]):
+                self._subscribe_presence(message["subscriber"], message["target"])
+        elif kind == "stats":
+            stats = message["stats"]
+            self.remote_stats[worker] = {**stats, "received_at": time.time()}
+            # Heartbeats carry the full user list, healing any missed presence deltas
+            self.remote_presence[worker] = dict(stats.get("users", {}))
+        elif kind == "auction":
+            self.active_auctions[message["listing_id"]] = message["auction"]
+        elif kind == "worker_down":
+            self.remote_stats.pop(worker, None)
+            self.remote_presence.pop(worker, None)
     
     async def _store_message(self, message: Dict):
         """Store message in database"""
@@ -450,7 +780,8 @@ class WebSocketService:
                 "read": False
             }
             
-            await self.db.user_messages.insert_one(db_message)
+            await self.conversations.record_message(db_message)
+            message['conversation_id'] = db_message['conversation_id']
             
         except Exception as e:
             logger.error(f"Store message error: {e}")
@@ -507,42 +838,65 @@ class WebSocketService:
     async def send_notification(self, user_id: str, notification: Dict):
         """Send real-time notification to a user"""
         try:
-            sessions = self.user_sessions.get(user_id, set())
-            if sessions:
-                for sid in sessions:
-                    await self.sio.emit('notification', notification, room=sid)
+            if self.is_user_online(user_id):
+                await self.cluster_emit('notification', notification, room=self._user_room(user_id))
             else:
                 # Store for offline delivery
-                self.offline_messages[user_id].append({
-                    'type': 'notification',
-                    'data': notification,
-                    'timestamp': datetime.utcnow().isoformat()
-                })
+                await self.offline_queue.enqueue(user_id, 'notification', notification)
                 
         except Exception as e:
             logger.error(f"Send notification error: {e}")
     
     async def broadcast_listing_update(self, listing_id: str, update_data: Dict):
-        """Broadcast listing updates to all watchers"""
+        """Broadcast listing updates to all watchers (coalesced with other pending updates)"""
         try:
-            room_name = f"listing:{listing_id}"
-            await self.sio.emit('listing_update', {
-                'listing_id': listing_id,
-                'update': update_data,
-                'timestamp': datetime.utcnow().isoformat()
-            }, room=room_name)
+            self.room_updates.queue(f"listing:{listing_id}", update_data)
             
         except Exception as e:
             logger.error(f"Broadcast listing update error: {e}")
     
+    async def _emit_room_delta(self, room: str, changes: Dict[str, Any], merged: int):
+        """Emit one compact listing_delta frame carrying only the fields that changed"""
+        await self.cluster_emit('listing_delta', {
+            'listing_id': room.split(':', 1)[1],
+            'changes': changes,
+            'merged_updates': merged,
+            'timestamp': datetime.utcnow().isoformat()
+        }, room=room)
+    
     async def get_connection_stats(self) -> Dict:
-        """Get WebSocket connection statistics"""
+        """Get WebSocket connection statistics aggregated across all workers"""
+        self._expire_remote_workers()
+        local = self._local_stats()
+        workers = {self.worker_id: local}
+        workers.update(self.remote_stats)
+        
+        unique_users = set()
+        rooms = set()
+        for stats in workers.values():
+            unique_users.update(stats.get("users", {}))
+            rooms.update(stats.get("rooms", []))
+        
         return {
-            "total_connections": len(self.active_sessions),
-            "unique_users": len(self.user_sessions),
-            "active_rooms": len(self.room_members),
+            "worker_id": self.worker_id,
+            "bus_backend": self.bus.backend,
+            "bus_connected": self.bus.connected,
+            "bus_stats": self.bus.stats,
+            "worker_count": len(workers),
+            "total_connections": sum(stats.get("connections", 0) for stats in workers.values()),
+            "unique_users": len(unique_users),
+            "active_rooms": len(rooms),
             "active_auctions": len(self.active_auctions),
-            "offline_message_queues": len(self.offline_messages),
+            "offline_queue": await self.offline_queue.get_stats(),
+            "room_updates": self.room_updates.get_stats(),
+            "workers": {
+                worker: {
+                    "connections": stats.get("connections", 0),
+                    "unique_users": len(stats.get("users", {})),
+                    "rooms": len(stats.get("rooms", []))
+                }
+                for worker, stats in workers.items()
+            },
             "connected_users": [
                 session.to_dict() for session in self.active_sessions.values()
             ]
@@ -551,12 +905,22 @@ class WebSocketService:
 # Global WebSocket service instance
 websocket_service = None
 
-async def init_websocket_service(db):
-    """Initialize WebSocket service"""
+async def init_websocket_service(db, bus=None):
+    """Initialize WebSocket service and join the worker cluster"""
     global websocket_service
-    websocket_service = WebSocketService(db)
+    websocket_service = WebSocketService(db, bus=bus)
+    try:
+        await websocket_service.offline_queue.ensure_indexes()
+    except Exception as e:
+        logger.warning(f"⚠️ Offline queue index creation failed: {e}")
+    await websocket_service.start_cluster()
     return websocket_service
 
+async def cleanup_websocket_service():
+    """Leave the worker cluster"""
+    if websocket_service:
+        await websocket_service.stop_cluster()
+
 def get_websocket_service():
     """Get WebSocket service instance"""
     return websocket_service
\ No newline at end of file
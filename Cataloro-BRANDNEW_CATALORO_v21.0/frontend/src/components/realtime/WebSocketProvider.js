@@ -70,22 +70,23 @@ export const WebSocketProvider = ({ children }) => {
         setOnlineUsers(data.users || []);
       });
 
-      socketInstance.on('user_status_update', (data) => {
-        if (data.status === 'online') {
-          setOnlineUsers(prev => {
-            const exists = prev.some(user => user.user_id === data.user_id);
-            if (!exists) {
-              return [...prev, {
-                user_id: data.user_id,
-                username: data.username,
-                last_activity: data.timestamp
+      socketInstance.on('presence_update', (data) => {
+        // Coalesced diff frame: status changes of users we share a conversation or listing with
+        const changes = data.changes || [];
+        setOnlineUsers(prev => {
+          let next = prev;
+          changes.forEach(change => {
+            next = next.filter(user => user.user_id !== change.user_id);
+            if (change.status === 'online') {
+              next = [...next, {
+                user_id: change.user_id,
+                username: change.username,
+                last_activity: change.timestamp
               }];
             }
-            return prev;
           });
-        } else {
-          setOnlineUsers(prev => prev.filter(user => user.user_id !== data.user_id));
-        }
+          return next;
+        });
       });
 
       socketInstance.on('notification', (notification) => {
@@ -100,6 +101,20 @@ export const WebSocketProvider = ({ children }) => {
         }
       });
 
+      socketInstance.on('offline_messages', (data) => {
+        // Events queued while offline arrive in one batch, oldest first
+        const queued = (data.messages || []).map(entry => (
+          entry.type === 'message' ? {
+            type: 'message',
+            title: `New message from ${entry.data.sender_username}`,
+            message: entry.data.message,
+            timestamp: entry.timestamp,
+            data: entry.data
+          } : { ...entry.data, timestamp: entry.data.timestamp || entry.timestamp }
+        ));
+        setNotifications(prev => [...queued.reverse(), ...prev].slice(0, 50));
+      });
+
       socketInstance.on('new_message', (message) => {
         setNotifications(prev => [{
           type: 'message',
@@ -110,21 +125,32 @@ export const WebSocketProvider = ({ children }) => {
         }, ...prev.slice(0, 49)]);
       });
 
-      socketInstance.on('new_bid', (bidData) => {
-        const { listing_id, bid, auction_status } = bidData;
-        
+      socketInstance.on('listing_delta', (frame) => {
+        // Coalesced listing-room frame: only the fields that changed since the last frame
+        const { listing_id, changes } = frame;
+
         setLiveAuctions(prev => ({
           ...prev,
-          [listing_id]: auction_status
+          [listing_id]: { ...(prev[listing_id] || {}), ...changes }
         }));
 
-        setNotifications(prev => [{
-          type: 'bid',
-          title: 'New Bid Placed',
-          message: `€${bid.amount} bid on ${bid.listing_id}`,
-          timestamp: bid.timestamp,
-          data: bidData
-        }, ...prev.slice(0, 49)]);
+        if (changes.last_bid) {
+          setNotifications(prev => [{
+            type: 'bid',
+            title: 'New Bid Placed',
+            message: `€${changes.last_bid.amount} bid on ${listing_id}`,
+            timestamp: changes.last_bid.timestamp,
+            data: frame
+          }, ...prev.slice(0, 49)]);
+        }
+      });
+
+      socketInstance.on('bid_accepted', (ack) => {
+        console.log('✅ Bid accepted:', ack);
+      });
+
+      socketInstance.on('bid_rejected', (ack) => {
+        console.warn('⚠️ Bid rejected:', ack.reason);
       });
 
       socketInstance.on('bid_received', (bidData) => {
@@ -144,11 +170,6 @@ export const WebSocketProvider = ({ children }) => {
         }));
       });
 
-      socketInstance.on('listing_update', (updateData) => {
-        // Handle real-time listing updates
-        console.log('📋 Listing updated:', updateData);
-      });
-
       socketInstance.on('error', (error) => {
         console.error('❌ WebSocket error:', error);
       });
@@ -175,15 +175,42 @@ const PDFExportCenter = ({ showToast }) => {
         options: customOptions
       };
 
-      const response = await fetch(`${backendUrl}/api/admin/export-pdf`, {
+      const authHeaders = {
+        'Content-Type': 'application/json',
+        'Authorization': `Bearer ${localStorage.getItem('token')}`
+      };
+
+      // Queue the export job, then poll until the document is ready
+      const submitResponse = await fetch(`${backendUrl}/api/admin/exports/comprehensive`, {
         method: 'POST',
-        headers: {
-          'Content-Type': 'application/json',
-          'Authorization': `Bearer ${localStorage.getItem('token')}`
-        },
+        headers: authHeaders,
         body: JSON.stringify(exportData)
       });
 
+      if (!submitResponse.ok) {
+        throw new Error(`Export failed: ${submitResponse.statusText}`);
+      }
+
+      let job = await submitResponse.json();
+      // Stop polling after 5 minutes rather than waiting on a job that may never finish
+      const pollDeadline = Date.now() + 5 * 60 * 1000;
+      while (job.status === 'queued' || job.status === 'running') {
+        if (Date.now() > pollDeadline) {
+          throw new Error('Export is taking too long, please try again later');
+        }
+        await new Promise(resolve => setTimeout(resolve, 1000));
+        const statusResponse = await fetch(`${backendUrl}/api/exports/jobs/${job.job_id}`, { headers: authHeaders });
+        if (!statusResponse.ok) {
+          throw new Error(`Export failed: ${statusResponse.statusText}`);
+        }
+        job = await statusResponse.json();
+      }
+
+      if (job.status !== 'completed') {
+        throw new Error(job.error || 'Export failed');
+      }
+
+      const response = await fetch(`${backendUrl}${job.download_url}`, { headers: authHeaders });
       if (!response.ok) {
         throw new Error(`Export failed: ${response.statusText}`);
       }